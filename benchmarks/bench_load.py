@@ -0,0 +1,73 @@
+"""Cold-load time of `commands.json` vs. its binary snapshot.
+
+    python benchmarks/bench_load.py [records ...]    (default: 100000 1000000)
+
+Writes a synthetic database to a temporary folder and times `json.load` on
+its own, `CommandStore.load()` parsing the JSON, writing the snapshot, and
+`CommandStore.load()` from the snapshot. Needs a few GB of memory at 1M.
+"""
+
+import gc
+import json
+import os
+import sys
+import tempfile
+
+from common import make_commands, timed
+
+import snapshot
+import store
+
+
+def cold_load(path, use_snapshot):
+    snapshot.ENABLED = use_snapshot
+    try:
+        db = store.CommandStore(path)
+        db.load()
+        return db.records
+    finally:
+        snapshot.ENABLED = True
+
+
+def run(n, folder):
+    path = os.path.join(folder, f"commands_{n}.json")
+    items = make_commands(n)
+    for pos, item in enumerate(items, 1):
+        item["id"], item["rev"] = pos, 0
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(items, f, indent=4)
+    del items
+    gc.collect()
+
+    def plain():
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    stamp = os.stat(path)
+    stamp = (stamp.st_mtime_ns, stamp.st_size)
+    snap = snapshot.snapshot_path(path)
+    t_plain, _ = timed(plain)
+    t_json, records = timed(lambda: cold_load(path, False))
+    t_write, _ = timed(lambda: snapshot.write(snap, snapshot.columns(records), stamp))
+    t_snap, loaded = timed(lambda: cold_load(path, True), repeat=3)
+    assert loaded == records
+
+    print(
+        f"{n} records: JSON {stamp[1] / 2**20:.0f} MiB, "
+        f"snapshot {os.path.getsize(snap) / 2**20:.0f} MiB"
+    )
+    print(f"  json.load             {t_plain:6.2f}s")
+    print(f"  load() from JSON      {t_json:6.2f}s")
+    print(f"  write snapshot        {t_write:6.2f}s  (background, after a rewrite)")
+    print(f"  load() from snapshot  {t_snap:6.2f}s  ({t_json / t_snap:.1f}x faster)")
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [100_000, 1_000_000]
+    with tempfile.TemporaryDirectory() as folder:
+        for n in sizes:
+            run(n, folder)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""First query of a fresh process: loading the database vs. the mapped index.
+
+    python benchmarks/bench_mapped.py [records] [query ...]
+
+Publishes `commands.json.idx` the way Quick Add does (load, then
+`ensure_index()`), then times a cold `rank()` through a new `CommandStore`
+three ways, and reports the Python heap each one leaves behind (tracemalloc;
+the mapped pages are shared page cache, not heap).
+"""
+
+import gc
+import json
+import os
+import sys
+import tempfile
+import threading
+import tracemalloc
+
+from common import make_commands, timed
+
+import snapshot
+import store
+
+
+def wait_for_caches():
+    for thread in threading.enumerate():
+        if thread.name == "snapshot":
+            thread.join()
+
+
+def first_query(path, queries, load):
+    db = store.CommandStore(path)
+    if load:
+        db.load()
+    return [db.rank(q) for q in queries], db
+
+
+def measure(fn):
+    """Wall time, then (in a second, traced run) the heap still held afterwards."""
+    gc.collect()
+    seconds, (results, _) = timed(fn)
+    del _
+    gc.collect()
+    tracemalloc.start()
+    kept = fn()
+    heap = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    return seconds, heap, results
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    queries = sys.argv[2:] or ["git", "open panel", "toglpanel"]
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "commands.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(make_commands(n), f, indent=4)
+
+        publish, _ = timed(lambda: store.CommandStore(path).ensure_index())
+        wait_for_caches()
+        print(
+            f"{n} records: JSON {os.path.getsize(path) / 2**20:.0f} MiB, "
+            f"index {os.path.getsize(path + '.idx') / 2**20:.0f} MiB "
+            f"(published in {publish:.2f}s)"
+        )
+
+        runs = {}
+        snapshot.ENABLED = False
+        runs["load JSON + rank"] = measure(lambda: first_query(path, queries, True))
+        snapshot.ENABLED = True
+        runs["load snapshot + rank"] = measure(lambda: first_query(path, queries, True))
+        runs["rank mapped index"] = measure(lambda: first_query(path, queries, False))
+        expected = runs["load JSON + rank"][2]
+        for name, (seconds, heap, results) in runs.items():
+            assert results == expected, name
+            print(f"  {name:<22} {seconds:6.2f}s  {heap / 2**20:7.1f} MiB heap")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Resident size of the in-memory model: JSON dicts vs. `record.Record`.
+
+    python benchmarks/bench_memory.py [records]
+
+Parses the same synthetic `commands.json` text both ways and reports what
+stays allocated afterwards (tracemalloc), i.e. what a long-running process
+such as Quick Add keeps for the records alone.
+"""
+
+import gc
+import json
+import sys
+import tracemalloc
+
+from common import make_commands, timed
+
+import record
+
+
+def load_records(text):
+    """What `CommandStore.load` does."""
+    with record.gc_paused():
+        return record.from_dicts(json.loads(text))
+
+
+def resident(build):
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size, result
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    text = json.dumps(make_commands(n), indent=4)
+
+    dicts, _ = resident(lambda: json.loads(text))
+    records, _ = resident(lambda: load_records(text))
+    t_dicts, _ = timed(lambda: json.loads(text))
+    t_records, _ = timed(lambda: load_records(text))
+
+    print(f"{n} records ({len(text) / 2**20:.0f} MiB of JSON)")
+    for name, size, seconds in [("dicts", dicts, t_dicts), ("Record", records, t_records)]:
+        print(
+            f"{name:>7}: {size / 2**20:7.1f} MiB resident, {size / n:6.0f} B/record, "
+            f"load {seconds:.2f}s"
+        )
+    print(f"  saved: {(1 - records / dicts) * 100:.0f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""Per-keystroke search latency: linear scan vs. trigram index, and `rank()`.
+
+    python benchmarks/bench_search.py [records]
+
+Simulates typing each query one character at a time (as `update_list`
+does) and reports the mean and worst per-keystroke time for the top 50:
+first for a plain substring match, then for `CommandStore.rank()` with its
+index, both as Quick Add runs it per keystroke (verbatim tier only) and
+with the fuzzy tiers it adds once typing pauses. Fails if the verbatim
+tier averages more than `KEYSTROKE_BUDGET` per keystroke.
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+
+from common import make_commands
+
+import snapshot
+import store
+from search_index import TrigramIndex
+
+QUERIES = ["git switch-branch", "toggle sidebar", "ctrl+shift", "rename layer 12", "zzz"]
+# Few or no verbatim hits: these fall through to the fuzzy tiers
+FUZZY_QUERIES = ["gco", "opn pnel", "toglpanel"]
+LIMIT = 50
+# Mean per-keystroke budget for Quick Add's verbatim `rank()` (500k records)
+KEYSTROKE_BUDGET = 0.025
+
+
+def linear(texts, query):
+    out = []
+    for idx, text in enumerate(texts):
+        if query in text:
+            out.append(idx)
+            if len(out) >= LIMIT:
+                break
+    return out
+
+
+def indexed(index, texts, query):
+    candidates = index.candidates(query)
+    if candidates is None:
+        candidates = range(len(texts))
+    out = []
+    for idx in candidates:
+        if query in texts[idx]:
+            out.append(idx)
+            if len(out) >= LIMIT:
+                break
+    return out
+
+
+def keystrokes(fn, queries=QUERIES):
+    times = []
+    for query in queries:
+        for n in range(1, len(query) + 1):
+            start = time.perf_counter()
+            fn(query[:n])
+            times.append(time.perf_counter() - start)
+    return times
+
+
+def report(name, times):
+    print(
+        f"{name:>14}: mean {sum(times) / len(times) * 1000:7.3f} ms, "
+        f"worst {max(times) * 1000:7.3f} ms over {len(times)} keystrokes"
+    )
+    return sum(times) / len(times)
+
+
+def ranked(items):
+    """Per-keystroke `rank()` through an indexed store, as Quick Add searches."""
+    snapshot.ENABLED = False
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "commands.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(items, f)
+        db = store.CommandStore(path)
+        db.ensure_index()
+    print("rank() per keystroke (Refiner cold for each query):")
+    for queries in (QUERIES, FUZZY_QUERIES):
+        for fuzzy, name in ((False, "keystroke"), (True, "after pause")):
+
+            def search(query):
+                if len(query) == 1:
+                    db._refiner.sets.clear()
+                return db.rank(query, LIMIT, fuzzy=fuzzy)
+
+            mean = report(name, keystrokes(search, queries))
+            if not fuzzy:
+                assert mean <= KEYSTROKE_BUDGET, f"rank() over budget: {mean * 1000:.1f} ms"
+        print(f"{'':>14}  ({', '.join(queries)})")
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    items = make_commands(n)
+    texts = [store.search_string(item) for item in items]
+
+    start = time.perf_counter()
+    index = TrigramIndex(texts)
+    build = time.perf_counter() - start
+
+    for query in QUERIES:
+        for k in range(1, len(query) + 1):
+            assert linear(texts, query[:k]) == indexed(index, texts, query[:k]), query[:k]
+
+    print(f"{n} records, index built in {build:.2f}s ({len(index.postings)} trigrams)")
+    for name, fn in [
+        ("linear scan", lambda q: linear(texts, q)),
+        ("trigram index", lambda q: indexed(index, texts, q)),
+    ]:
+        report(name, keystrokes(fn))
+    ranked(items)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Cold import time of the Quick Add service, from `python -X importtime`.
+
+    python benchmarks/bench_startup.py [module] [runs]
+
+Imports `module` (default `quick_add`) in fresh interpreters, reports the
+best total and the slowest imports of that run, and exits with status 1 if
+any dashboard/harvester library was pulled in, so the service's boot
+stays limited to what the hotkey loop needs.
+"""
+
+import os
+import subprocess
+import sys
+
+from common import SRC_DIR
+
+# Libraries that belong to the dashboard and harvester, never to the service
+FORBIDDEN = ("streamlit", "pandas", "requests", "lxml", "html5lib", "bs4")
+SHOW = 12
+
+
+def import_times(module):
+    """`[(package, self_us, cumulative_us, depth)]` for one fresh import of `module`."""
+    env = dict(os.environ, PYTHONPATH=SRC_DIR)
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=SRC_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        own, cumulative, name = line[len("import time:") :].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(own), int(cumulative), depth))
+    if proc.returncode:
+        tail = [line for line in proc.stderr.splitlines() if not line.startswith("import time:")]
+        raise RuntimeError("\n".join(tail[-5:]) or f"exit status {proc.returncode}")
+    return rows
+
+
+def main():
+    module = sys.argv[1] if len(sys.argv) > 1 else "quick_add"
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    try:
+        samples = [import_times(module) for _ in range(runs)]
+    except RuntimeError as e:
+        print(f"import {module} failed:\n{e}")
+        return 2
+
+    # Top-level rows have no indentation and cover everything imported beneath them
+    totals = [sum(cum for _, _, cum, depth in rows if depth == 0) for rows in samples]
+    best = samples[totals.index(min(totals))]
+    print(f"import {module}: best {min(totals) / 1000:.1f} ms over {runs} runs")
+    print(f"{'self ms':>8} {'cum ms':>8}  package")
+    for name, own, cum, _ in sorted(best, key=lambda row: row[1], reverse=True)[:SHOW]:
+        print(f"{own / 1000:8.1f} {cum / 1000:8.1f}  {name}")
+
+    loaded = {name.split(".")[0] for name, _, _, _ in best}
+    heavy = [name for name in FORBIDDEN if name in loaded]
+    if heavy:
+        print(f"FAIL: {module} imports {', '.join(heavy)} at startup")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
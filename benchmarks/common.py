@@ -0,0 +1,51 @@
+"""Shared helpers for the benchmark scripts (synthetic data, timing)."""
+
+import os
+import random
+import sys
+import time
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+SOFTWARE = ["Windows", "Git", "VS Code", "Chrome", "Terminal", "Obsidian", "Docker", "Blender"]
+CATEGORIES = ["Hotkey", "CMD", "Run Panel", "PowerShell", "Snippet", "Workflow"]
+VERBS = ["open", "close", "toggle", "show", "create", "delete", "rename", "switch", "find", "run"]
+NOUNS = ["panel", "terminal", "branch", "window", "file", "tab", "layer", "sidebar", "commit"]
+TAGS = ["import", "nav", "edit", "view", "git", "file", "window", "code", "shell", "media"]
+
+
+def make_commands(n, seed=1):
+    rng = random.Random(seed)
+    items = []
+    for i in range(n):
+        soft = rng.choice(SOFTWARE)
+        verb, noun = rng.choice(VERBS), rng.choice(NOUNS)
+        if rng.random() < 0.5:
+            cmd = "+".join(rng.sample(["ctrl", "alt", "shift", "win"], rng.randint(1, 2)))
+            cmd += f" + {chr(97 + i % 26)}"
+            cat = "Hotkey"
+        else:
+            cmd = f"{soft.split()[0].lower()} {verb}-{noun} --id {i}"
+            cat = rng.choice(CATEGORIES)
+        items.append(
+            {
+                "command": cmd,
+                "software": soft,
+                "description": f"{verb.title()} {noun} {rng.randint(0, 9999)}",
+                "category": cat,
+                "tags": rng.sample(TAGS, rng.randint(0, 3)),
+            }
+        )
+    return items
+
+
+def timed(fn, repeat=1):
+    """Best wall time of `repeat` runs, in seconds, and the last result."""
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
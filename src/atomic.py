@@ -0,0 +1,178 @@
+"""Crash- and reader-safe file replacement, and a cross-process write lock.
+
+`replace()` is the one way the tools rewrite a file: the new contents go to
+a uniquely named temp file in the same folder, are fsynced, and are then
+renamed over the target, so a reader sees either the old file or the new
+one and never a prefix of it, and a crash leaves at worst a stray temp file.
+
+`FileLock` is an advisory lock on `<path>.lock` (`flock` on POSIX, a locked
+byte via `msvcrt` on Windows). Every process that writes `commands.json` or
+its journal holds it for the whole read-modify-write, so the harvester,
+dashboard, CLI and Quick Add never interleave their writes.
+"""
+
+import os
+import stat
+import sys
+import tempfile
+import threading
+import time
+
+# How long a writer waits for another process's lock before giving up
+LOCK_TIMEOUT = 30
+# Windows refuses to rename over a file another process has open; retry this long
+REPLACE_RETRY = 1.0
+
+if sys.platform == "win32":
+    import msvcrt
+
+    def _try_lock(fd):
+        try:
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            return False
+
+    def _unlock(fd):
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+else:
+    import fcntl
+
+    def _try_lock(fd):
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except BlockingIOError:
+            return False
+
+    def _unlock(fd):
+        fcntl.flock(fd, fcntl.LOCK_UN)
+
+
+class LockTimeout(TimeoutError):
+    """Another process held the lock for longer than the timeout."""
+
+
+def lock_path(path):
+    return path + ".lock"
+
+
+class FileLock:
+    """Exclusive advisory lock on `lock_path(path)`, re-entrant within a process.
+
+    Threads of one process serialise on an in-process lock first, so only
+    the outermost `acquire()` touches the file.
+    """
+
+    def __init__(self, path, timeout=LOCK_TIMEOUT):
+        self.path = lock_path(path)
+        self.timeout = timeout
+        self._fd = None
+        self._depth = 0
+        self._local = threading.RLock()
+
+    def acquire(self):
+        self._local.acquire()
+        if self._depth == 0:
+            try:
+                self._fd = self._lock_file()
+            except BaseException:
+                self._local.release()
+                raise
+        self._depth += 1
+        return self
+
+    def _lock_file(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        deadline = time.monotonic() + self.timeout
+        delay = 0.001
+        while not _try_lock(fd):
+            if time.monotonic() >= deadline:
+                os.close(fd)
+                raise LockTimeout(f"{self.path} is held by another process")
+            time.sleep(delay)
+            delay = min(delay * 2, 0.05)
+        return fd
+
+    def release(self):
+        self._depth -= 1
+        if self._depth == 0:
+            fd, self._fd = self._fd, None
+            try:
+                _unlock(fd)
+            finally:
+                os.close(fd)
+        self._local.release()
+
+    def __enter__(self):
+        return self.acquire()
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+def fsync_dir(folder):
+    """Make a rename in `folder` durable (a no-op where directories can't be opened)."""
+    try:
+        fd = os.open(folder, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _rename(src, dest):
+    deadline = time.monotonic() + REPLACE_RETRY
+    while True:
+        try:
+            os.replace(src, dest)
+            return
+        except PermissionError:
+            if sys.platform != "win32" or time.monotonic() >= deadline:
+                raise
+            time.sleep(0.02)
+
+
+def replace(path, write, binary=False, encoding="utf-8"):
+    """Atomically replace `path` with what `write(f)` writes to a temp file.
+
+    The temp file lives next to `path` (so the rename never crosses file
+    systems) under a unique name (so two writers never share one), and is
+    removed if `write` fails. Returns `write`'s result.
+    """
+    folder = os.path.dirname(os.path.abspath(path))
+    os.makedirs(folder, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix=".tmp", dir=folder)
+    try:
+        mode = "wb" if binary else "w"
+        with os.fdopen(fd, mode, **({} if binary else {"encoding": encoding})) as f:
+            result = write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        # mkstemp creates the file owner-only; keep the permissions readers expect
+        try:
+            os.chmod(tmp, stat.S_IMODE(os.stat(path).st_mode))
+        except FileNotFoundError:
+            os.chmod(tmp, 0o644)
+        _rename(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+    fsync_dir(folder)
+    return result
+
+
+def write_bytes(path, data):
+    """`replace()` for contents already in memory."""
+    return replace(path, lambda f: f.write(data), binary=True)
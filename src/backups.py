@@ -0,0 +1,361 @@
+"""Deduplicated, compressed point-in-time backups of `commands.json`.
+
+A snapshot is a small manifest listing the content hashes of the file's
+chunks; the chunks themselves are stored once each, zlib-compressed, under
+`objects/`. Chunk boundaries are content-defined (see `split()`), so an
+edit only changes the chunks around it and a backup of a 100 MB database
+after a one-line change adds a few KB instead of another 100 MB.
+
+    data/backups/objects/ab/abcdef...   compressed chunk, named by sha256
+    data/backups/snapshots/<id>.json    {"created", "label", "size", "sha256", "chunks"}
+
+`prune()` thins old snapshots (keep the newest few, then one per hour, day
+and week) and `collect()` deletes chunks no snapshot references.
+`migrate()` turns the whole-file copies older versions left in
+`data/backups/` (`commands_backup_20240101_120000.json`) into snapshots
+dated by their names. From the command line:
+
+    python src/backups.py list
+    python src/backups.py restore <id> [path/to/commands.json]
+    python src/backups.py prune
+"""
+
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+import zlib
+from datetime import datetime
+
+import atomic
+import store
+
+# Chunks are cut at the end of a line that only closes an object (`    },`),
+# at least MIN_CHUNK bytes in, when a hash of the bytes since the previous
+# such line (i.e. of the record it closes) is divisible by BOUNDARY; never
+# more than MAX_CHUNK bytes. Hashing whole records rather than a fixed
+# window matters: the tail of most records (`"tags": [...]`) is identical.
+MIN_CHUNK = 16 * 1024
+MAX_CHUNK = 256 * 1024
+BOUNDARY = 64
+_CUT = re.compile(rb"\n[ \t]*},?\r?\n")
+
+COMPRESS_LEVEL = 6
+
+# How many snapshots survive `prune()`: the newest `last`, plus the newest
+# snapshot of each of the latest `hourly` hours, `daily` days, `weekly` weeks
+RETENTION = {"last": 10, "hourly": 48, "daily": 30, "weekly": 26}
+_BUCKETS = {"hourly": "%Y-%m-%d %H", "daily": "%Y-%m-%d", "weekly": "%G-W%V"}
+
+# Chunks written this recently are never collected: a backup running in
+# another process may have stored them without having written its manifest yet
+GRACE = 3600
+
+_ID_TIME = "%Y%m%d_%H%M%S_%f"
+
+# A whole-file copy from before snapshots: <label>_<YYYYmmdd_HHMMSS>.json
+_LEGACY = re.compile(r"(.+)_(\d{8}_\d{6})\.json")
+
+
+class BackupError(RuntimeError):
+    """Unknown snapshot, or one whose chunks are missing or damaged."""
+
+
+def split(data):
+    """`(start, end)` offsets of the content-defined chunks of `data`."""
+    spans, start, size = [], 0, len(data)
+    search, crc = _CUT.search, zlib.crc32
+    while start < size:
+        end = min(start + MAX_CHUNK, size)
+        cut = end
+        prev = pos = start + MIN_CHUNK
+        while True:
+            m = search(data, pos, end)
+            if m is None:
+                break
+            pos = m.end()
+            if crc(data[prev:pos]) % BOUNDARY == 0:
+                cut = pos
+                break
+            # The newline ending this match may start the next one
+            prev = pos = pos - 1
+        spans.append((start, cut))
+        start = cut
+    return spans
+
+
+def keep(snapshots, retention=RETENTION):
+    """The subset of `snapshots` (each with a `created` timestamp) that `retention` keeps."""
+    newest = sorted(snapshots, key=lambda s: s["created"], reverse=True)
+    kept = {id(s) for s in newest[: retention.get("last", 0)]}
+    for bucket, fmt in _BUCKETS.items():
+        seen = set()
+        for snap in newest:
+            if len(seen) >= retention.get(bucket, 0):
+                break
+            key = datetime.fromtimestamp(snap["created"]).strftime(fmt)
+            if key not in seen:
+                seen.add(key)
+                kept.add(id(snap))
+    return [s for s in snapshots if id(s) in kept]
+
+
+class BackupStore:
+    """Snapshots and chunk objects under `root`."""
+
+    def __init__(self, root=store.BACKUP_DIR):
+        self.root = root
+        self.objects = os.path.join(root, "objects")
+        self.snapshots = os.path.join(root, "snapshots")
+
+    # --- OBJECTS ---
+    def _object_path(self, digest):
+        return os.path.join(self.objects, digest[:2], digest)
+
+    def _put(self, chunk):
+        """Store `chunk` unless an identical one exists. Returns (digest, bytes written)."""
+        digest = hashlib.sha256(chunk).hexdigest()
+        path = self._object_path(digest)
+        if os.path.exists(path):
+            # Refresh the mtime so `collect()` treats a re-used chunk as new
+            try:
+                os.utime(path)
+                return digest, 0
+            except OSError:
+                pass
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = zlib.compress(chunk, COMPRESS_LEVEL)
+        atomic.write_bytes(path, data)
+        return digest, len(data)
+
+    def _get(self, digest):
+        try:
+            with open(self._object_path(digest), "rb") as f:
+                chunk = zlib.decompress(f.read())
+        except (OSError, zlib.error) as e:
+            raise BackupError(f"chunk {digest} is missing or damaged: {e}") from None
+        if hashlib.sha256(chunk).hexdigest() != digest:
+            raise BackupError(f"chunk {digest} is damaged")
+        return chunk
+
+    # --- SNAPSHOTS ---
+    def _manifest_path(self, snap_id):
+        return os.path.join(self.snapshots, snap_id + ".json")
+
+    def manifest(self, snap_id):
+        try:
+            with open(self._manifest_path(snap_id), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise BackupError(f"no snapshot {snap_id!r}") from None
+
+    def list(self):
+        """`{"id", "created", "label", "size"}` per snapshot, oldest first."""
+        try:
+            names = os.listdir(self.snapshots)
+        except FileNotFoundError:
+            return []
+        found = []
+        for name in names:
+            snap_id, ext = os.path.splitext(name)
+            if ext != ".json":
+                continue
+            try:
+                man = self.manifest(snap_id)
+            except (BackupError, ValueError):
+                continue
+            found.append(
+                {
+                    "id": snap_id,
+                    "created": man["created"],
+                    "label": man.get("label", ""),
+                    "size": man.get("size", 0),
+                }
+            )
+        return sorted(found, key=lambda s: (s["created"], s["id"]))
+
+    def latest(self):
+        snaps = self.list()
+        return snaps[-1]["id"] if snaps else None
+
+    def snapshot(self, path, label="commands_backup", created=None):
+        """Back up the file at `path`. Returns the snapshot id, or None if there is no file.
+
+        If the file is byte-for-byte the latest snapshot, that snapshot's id
+        is returned and nothing is written. `created` backdates the snapshot.
+        """
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        digest = hashlib.sha256(data).hexdigest()
+        latest = self.latest()
+        if latest is not None and self.manifest(latest).get("sha256") == digest:
+            return latest
+        view = memoryview(data)
+        chunks = [self._put(view[start:end])[0] for start, end in split(data)]
+        now = time.time() if created is None else created
+        manifest = {
+            "created": now,
+            "label": label,
+            "size": len(data),
+            "sha256": digest,
+            "chunks": chunks,
+        }
+        os.makedirs(self.snapshots, exist_ok=True)
+        base = f"{datetime.fromtimestamp(now).strftime(_ID_TIME)}_{label}"
+        snap_id, n = base, 1
+        while os.path.exists(self._manifest_path(snap_id)):
+            n += 1
+            snap_id = f"{base}_{n}"
+        atomic.write_bytes(self._manifest_path(snap_id), json.dumps(manifest).encode("utf-8"))
+        return snap_id
+
+    def read(self, snap_id):
+        """The backed-up file contents, verified against the snapshot's checksum."""
+        man = self.manifest(snap_id)
+        data = b"".join(self._get(digest) for digest in man["chunks"])
+        if hashlib.sha256(data).hexdigest() != man["sha256"]:
+            raise BackupError(f"snapshot {snap_id!r} does not match its checksum")
+        return data
+
+    def restore(self, snap_id, dest=store.DB_FILE):
+        """Replace `dest` with the contents of snapshot `snap_id`. Returns the bytes written.
+
+        A journal next to `dest` is ignored from then on, since its header no
+        longer matches the restored file.
+        """
+        data = self.read(snap_id)
+        with atomic.FileLock(dest):
+            atomic.write_bytes(dest, data)
+        return len(data)
+
+    def legacy(self):
+        """Paths of the whole-file `.json` copies in `root`, oldest first."""
+        try:
+            names = os.listdir(self.root)
+        except FileNotFoundError:
+            return []
+        found = []
+        for name in names:
+            path = os.path.join(self.root, name)
+            # Dotfiles are exports in progress (see `SqliteStore.backup()`)
+            if name.startswith(".") or not name.endswith(".json") or not os.path.isfile(path):
+                continue
+            found.append((self._legacy_info(name, path)[1], name, path))
+        return [path for _, _, path in sorted(found)]
+
+    @staticmethod
+    def _legacy_info(name, path):
+        """`(label, created)` of a legacy copy, from its name or else its mtime."""
+        m = _LEGACY.fullmatch(name)
+        if m:
+            try:
+                return m.group(1), datetime.strptime(m.group(2), "%Y%m%d_%H%M%S").timestamp()
+            except ValueError:
+                pass
+        return os.path.splitext(name)[0], os.path.getmtime(path)
+
+    def migrate(self):
+        """Snapshot every legacy copy (dated by its name), then delete it. Returns the ids."""
+        migrated = []
+        for path in self.legacy():
+            label, created = self._legacy_info(os.path.basename(path), path)
+            snap_id = self.snapshot(path, label, created)
+            if snap_id is None:
+                continue
+            os.remove(path)
+            migrated.append(snap_id)
+        return migrated
+
+    # --- RETENTION ---
+    def prune(self, retention=RETENTION):
+        """Delete the snapshots `retention` does not keep, then unused chunks.
+
+        Returns the ids of the deleted snapshots.
+        """
+        snaps = self.list()
+        kept = {s["id"] for s in keep(snaps, retention)}
+        removed = []
+        for snap in snaps:
+            if snap["id"] not in kept:
+                try:
+                    os.remove(self._manifest_path(snap["id"]))
+                    removed.append(snap["id"])
+                except FileNotFoundError:
+                    pass
+        if removed:
+            self.collect()
+        return removed
+
+    def collect(self, grace=GRACE):
+        """Delete chunks no snapshot references (older than `grace` seconds). Returns a count."""
+        used = set()
+        for snap in self.list():
+            try:
+                used.update(self.manifest(snap["id"])["chunks"])
+            except BackupError:
+                pass
+        cutoff = time.time() - grace
+        removed = 0
+        if not os.path.isdir(self.objects):
+            return 0
+        for sub in os.listdir(self.objects):
+            folder = os.path.join(self.objects, sub)
+            if not os.path.isdir(folder):
+                continue
+            for digest in os.listdir(folder):
+                path = os.path.join(folder, digest)
+                if digest in used:
+                    continue
+                try:
+                    if os.path.getmtime(path) < cutoff:
+                        os.remove(path)
+                        removed += 1
+                except OSError:
+                    pass
+        return removed
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    usage = "Usage: backups.py list | restore <id> [commands.json] | prune"
+    if not argv or argv[0] not in ("list", "restore", "prune"):
+        print(usage)
+        return 2
+    backups = BackupStore(store.BACKUP_DIR)
+    backups.migrate()
+    if argv[0] == "list":
+        for snap in backups.list():
+            when = datetime.fromtimestamp(snap["created"]).strftime("%Y-%m-%d %H:%M:%S")
+            print(f"{snap['id']}  {when}  {snap['size']:>12,} bytes  {snap['label']}")
+    elif argv[0] == "restore":
+        if len(argv) < 2:
+            print(usage)
+            return 2
+        dest = argv[2] if len(argv) > 2 else store.DB_FILE
+        try:
+            # The file being replaced is itself kept, so a restore can be
+            # undone; journaled edits are folded in first or they'd be lost
+            try:
+                before = store.CommandStore(dest).backup("before_restore", backups.root)
+            except store.UnreadableDatabase:
+                before = backups.snapshot(dest, "before_restore")
+            size = backups.restore(argv[1], dest)
+        except BackupError as e:
+            print(f"Restore failed: {e}")
+            return 1
+        print(f"Restored {argv[1]} ({size:,} bytes) to {dest}")
+        if before:
+            print(f"Previous contents saved as {before}")
+    else:
+        removed = backups.prune()
+        print(f"Pruned {len(removed)} snapshots")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,78 @@
+"""The derived files kept next to `commands.json` for other processes.
+
+`snapshot.py` (columns for fast cold loads) and `mapped_index.py` (a
+trigram index searchable in place) are both rebuilt from the records of
+the main file whenever a store holds exactly that file. `Caches` decides
+which of them are stale and writes them in background threads.
+"""
+
+import threading
+
+import mapped_index
+import snapshot
+from journal import Journal
+
+
+class Caches:
+    """The snapshot and mapped index of the database file at `path`."""
+
+    def __init__(self, path):
+        self.snap_path = snapshot.snapshot_path(path)
+        self.index_path = mapped_index.index_path(path)
+        self._mapped = None
+
+    def records(self, stamp):
+        """Records of the snapshot if it was built from the file with `stamp`, else None."""
+        if not snapshot.ENABLED:
+            return None
+        return snapshot.read(self.snap_path, stamp)
+
+    def save(self, records, stamp, index=None, texts=None):
+        """Write the snapshot, and the mapped index of `index`, for the file with `stamp`.
+
+        `records` must be exactly that file. Columns, search strings and
+        postings are taken here; encoding and writing happen in daemon
+        threads named "snapshot", so a process exiting mid-write leaves
+        only a stale cache behind. Files already matching `stamp` are kept.
+        Only a store that has a trigram index (Quick Add) passes one:
+        building one from scratch would cost seconds on every write.
+        """
+        if not snapshot.wanted(stamp):
+            return
+        want_snap = snapshot.stamp_of(self.snap_path) != stamp
+        want_index = (
+            index is not None
+            and texts is not None
+            and len(index) == len(texts) == len(records)
+            and mapped_index.stamp_of(self.index_path) != stamp
+        )
+        if not (want_snap or want_index):
+            return
+        body = snapshot.columns(records)
+        if body is None:
+            return
+        jobs = []
+        if want_snap:
+            jobs.append((snapshot.write, (self.snap_path, body, stamp)))
+        if want_index:
+            postings = {gram: ids[:] for gram, ids in index.postings.items()}
+            args = (self.index_path, stamp, list(texts), body, postings, list(index.deleted))
+            jobs.append((mapped_index.write, args))
+        for target, args in jobs:
+            threading.Thread(target=target, args=args, name="snapshot", daemon=True).start()
+
+    def mapped(self, stamp, journal_path):
+        """The `mapped_index.MappedIndex` of the file with `stamp`, if nothing is journaled.
+
+        None when there is no such index, or when operations journaled
+        since the last compaction are missing from it.
+        """
+        if not snapshot.ENABLED:
+            return None
+        mapped = self._mapped
+        if mapped is None or mapped.stamp != stamp:
+            mapped = self._mapped = mapped_index.open_index(self.index_path, stamp)
+        if mapped is None:
+            return None
+        ops, _, _ = Journal(journal_path).read(stamp)
+        return None if ops else mapped
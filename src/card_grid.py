@@ -0,0 +1,175 @@
+"""Virtualized card grid for the Quick Add Cards tab.
+
+Only rows inside the visible part of the canvas (plus a little overscan)
+have widgets. Cards and group headers come from pools that are re-filled
+and moved as the view scrolls, so the widget count depends on the window
+height rather than on the number of records.
+"""
+
+import tkinter as tk
+from bisect import bisect_left, bisect_right
+from tkinter import ttk
+
+HEADER_HEIGHT = 34
+ROW_HEIGHT = 118
+COLUMNS = 2
+PAD = 5
+
+# Rows rendered above and below the viewport so fast scrolling has no gaps
+OVERSCAN = 2
+
+
+# --- LAYOUT ---
+def layout(groups, columns=COLUMNS):
+    """Flatten `[(title, items)]` into rows and the y offset of each row.
+
+    A row is `(title, None)` for a group header or `(None, items)` for up to
+    `columns` cards. Returns `(rows, tops, total_height)`.
+    """
+    rows, tops, y = [], [], 0
+    for title, items in groups:
+        rows.append((title, None))
+        tops.append(y)
+        y += HEADER_HEIGHT
+        for n in range(0, len(items), columns):
+            rows.append((None, items[n : n + columns]))
+            tops.append(y)
+            y += ROW_HEIGHT
+    return rows, tops, y
+
+
+def visible(tops, top, bottom, overscan=OVERSCAN):
+    """Row numbers intersecting the `[top, bottom)` band, widened by `overscan`."""
+    first = max(bisect_right(tops, top) - 1 - overscan, 0)
+    last = min(bisect_left(tops, bottom) + overscan, len(tops))
+    return range(first, last)
+
+
+# --- WIDGET ---
+class CardGrid:
+    """Scrollable grid drawing `[(title, items)]` groups with recycled widgets.
+
+    `build(parent)` creates an empty card widget and `fill(card, item)`
+    points it at a record; both are called far less often than there are
+    records, and `fill` must fully overwrite whatever a previous item set.
+    `on_end()`, if given, is called once per content when the last row
+    comes into view, so the owner can page in more cards.
+    """
+
+    def __init__(self, parent, build, fill, bg, header_fg, header_font, on_end=None):
+        self.build = build
+        self.fill = fill
+        self.on_end = on_end
+        self._ended = False
+        self.bg = bg
+        self.header_fg = header_fg
+        self.header_font = header_font
+
+        self.canvas = tk.Canvas(parent, bg=bg, highlightthickness=0)
+        self.scrollbar = ttk.Scrollbar(parent, orient="vertical", command=self.canvas.yview)
+        self.canvas.configure(yscrollcommand=self._on_scroll)
+        self.canvas.bind("<Configure>", lambda e: self._schedule(relayout=True))
+
+        self.rows, self.tops, self.height = [], [], 0
+        # (row, column) -> (canvas window id, widget); column -1 is a header
+        self.shown = {}
+        self.free_cards = []
+        self.free_headers = []
+        self._pending = None
+        self._relayout = False
+
+    def pack(self):
+        self.canvas.pack(side="left", fill="both", expand=True)
+        self.scrollbar.pack(side="right", fill="y")
+
+    def set_groups(self, groups, keep_view=False):
+        """Show new content, reusing every existing widget.
+
+        The view goes back to the top unless `keep_view` (a further page of
+        the same results).
+        """
+        self.rows, self.tops, self.height = layout(groups)
+        self._ended = False
+        for key in list(self.shown):
+            self._release(key)
+        self.canvas.configure(scrollregion=(0, 0, 0, self.height))
+        if not keep_view:
+            self.canvas.yview_moveto(0)
+        self._render()
+
+    def widget_count(self):
+        return len(self.shown) + len(self.free_cards) + len(self.free_headers)
+
+    # --- RENDERING ---
+    def _on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        self._schedule()
+
+    def _schedule(self, relayout=False):
+        self._relayout = self._relayout or relayout
+        if self._pending is None:
+            self._pending = self.canvas.after_idle(self._render)
+
+    def _release(self, key):
+        win, widget = self.shown.pop(key)
+        self.canvas.itemconfigure(win, state="hidden")
+        (self.free_headers if key[1] < 0 else self.free_cards).append((win, widget))
+
+    def _acquire(self, header):
+        free = self.free_headers if header else self.free_cards
+        if free:
+            win, widget = free.pop()
+            self.canvas.itemconfigure(win, state="normal")
+            return win, widget
+        if header:
+            widget = tk.Label(
+                self.canvas, bg=self.bg, fg=self.header_fg, font=self.header_font, anchor="w"
+            )
+        else:
+            widget = self.build(self.canvas)
+        return self.canvas.create_window(0, 0, window=widget, anchor="nw"), widget
+
+    def _geometry(self, key, width):
+        row, col = key
+        y = self.tops[row]
+        if col < 0:
+            return (PAD * 2, y + PAD * 2), width - PAD * 4, HEADER_HEIGHT - PAD * 2
+        col_w = (width - PAD * (COLUMNS + 1)) // COLUMNS
+        x = PAD + col * (col_w + PAD)
+        return (x, y + PAD), col_w, ROW_HEIGHT - PAD * 2
+
+    def _render(self):
+        self._pending = None
+        relayout, self._relayout = self._relayout, False
+        width = max(self.canvas.winfo_width(), 1)
+        top = self.canvas.canvasy(0)
+        band = visible(self.tops, top, top + self.canvas.winfo_height())
+        wanted = set()
+        for row in band:
+            items = self.rows[row][1]
+            if items is None:
+                wanted.add((row, -1))
+            else:
+                wanted.update((row, col) for col in range(len(items)))
+
+        for key in [k for k in self.shown if k not in wanted]:
+            self._release(key)
+        for key in sorted(wanted):
+            fresh = key not in self.shown
+            if fresh:
+                self.shown[key] = self._acquire(key[1] < 0)
+                win, widget = self.shown[key]
+                title, items = self.rows[key[0]]
+                if key[1] < 0:
+                    widget.configure(text=title)
+                else:
+                    self.fill(widget, items[key[1]])
+            if fresh or relayout:
+                win = self.shown[key][0]
+                (x, y), w, h = self._geometry(key, width)
+                self.canvas.coords(win, x, y)
+                self.canvas.itemconfigure(win, width=w, height=h)
+
+        if self.on_end is not None and band and band.stop == len(self.rows) and not self._ended:
+            self._ended = True
+            self.on_end()
@@ -0,0 +1,182 @@
+"""Cross-process change notifications over localhost UDP.
+
+Quick Add already binds `127.0.0.1:49202` to stay single-instance; that
+socket doubles as the hub of a tiny change feed:
+
+- Any process that writes the database `publish()`es one datagram naming
+  the file, the kind of change and the affected record keys.
+- The hub stamps it with the next sequence number and relays it to every
+  `Subscriber` (dashboard, harvester, CLI).
+- Subscribers hand each message to a callback, which applies it as a
+  delta (e.g. `CommandStore.refresh()` replays just the new journal
+  lines). A skipped sequence number is reported as a gap so the receiver
+  can fall back to a full reload.
+
+Datagrams are fire-and-forget: without a hub nothing is delivered and
+every tool keeps working from disk as before.
+"""
+
+import json
+import os
+import socket
+import threading
+import time
+
+HOST = "127.0.0.1"
+PORT = 49202
+
+# Subscribers re-announce themselves this often; the hub forgets silent ones
+KEEPALIVE = 10.0
+EXPIRY = 3 * KEEPALIVE
+
+# Larger changes are sent without keys (receivers treat them as "many")
+MAX_KEYS = 200
+MAX_DATAGRAM = 64 * 1024
+
+
+def _send(sock, message, address):
+    try:
+        sock.sendto(json.dumps(message).encode("utf-8"), address)
+    except OSError:
+        pass
+
+
+def _decode(data):
+    try:
+        message = json.loads(data.decode("utf-8"))
+    except ValueError:
+        return None
+    return message if isinstance(message, dict) else None
+
+
+def publish(path, kind, keys=None, port=None, **extra):
+    """Announce a change to `path`, e.g. "journal" (deltas appended) or "rewrite".
+
+    `keys` lists the affected records when known; `extra` fields are passed
+    through to subscribers untouched.
+    """
+    if keys is not None:
+        keys = list(keys)
+    message = {
+        **extra,
+        "op": "pub",
+        "path": os.path.abspath(path),
+        "kind": kind,
+        "keys": keys if keys is not None and len(keys) <= MAX_KEYS else None,
+        "pid": os.getpid(),
+    }
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        _send(sock, message, (HOST, port or PORT))
+
+
+class Hub:
+    """Relay published changes to subscribers, on an already bound socket."""
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.seq = 0
+        self.subscribers = {}
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self):
+        while True:
+            try:
+                data, address = self.sock.recvfrom(MAX_DATAGRAM)
+            except ConnectionResetError:
+                # Windows reports an earlier send to a vanished subscriber here
+                continue
+            except OSError:
+                return
+            message = _decode(data)
+            if message is not None:
+                self.handle(message, address)
+
+    def handle(self, message, address):
+        now = time.monotonic()
+        if message.get("op") == "sub":
+            self.subscribers[address] = now
+            _send(self.sock, {"op": "hello", "seq": self.seq}, address)
+        elif message.get("op") == "pub":
+            self.seq += 1
+            message = dict(message, op="change", seq=self.seq)
+            for sub, seen in list(self.subscribers.items()):
+                if now - seen > EXPIRY:
+                    del self.subscribers[sub]
+                else:
+                    _send(self.sock, message, sub)
+
+
+class Subscriber:
+    """Receive relayed changes; `on_change(message)` runs on a daemon thread.
+
+    `message` carries `path`, `kind`, `keys` (None if unknown) and `pid`.
+    A missed sequence number, or a hub restart, arrives as
+    `{"kind": "gap"}`.
+    """
+
+    def __init__(self, on_change, port=None):
+        self.on_change = on_change
+        self.port = port or PORT
+        self.seq = None
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind((HOST, 0))
+        self.sock.settimeout(KEEPALIVE)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self.sock.close()
+
+    def _announce(self):
+        _send(self.sock, {"op": "sub", "pid": os.getpid()}, (HOST, self.port))
+
+    def _run(self):
+        announced = 0.0
+        while not self._stop.is_set():
+            if time.monotonic() - announced >= KEEPALIVE:
+                self._announce()
+                announced = time.monotonic()
+            try:
+                data, _ = self.sock.recvfrom(MAX_DATAGRAM)
+            except socket.timeout:
+                continue
+            except ConnectionResetError:
+                # No hub listening yet (Windows); keep announcing
+                continue
+            except OSError:
+                return
+            message = _decode(data)
+            if message is not None:
+                self.handle(message)
+
+    def handle(self, message):
+        seq = message.get("seq")
+        if message.get("op") == "hello":
+            # First contact, or the hub restarted and its numbering with it
+            if self.seq is not None and seq != self.seq:
+                self._deliver({"kind": "gap"})
+            self.seq = seq
+        elif message.get("op") == "change":
+            if self.seq is not None and seq != self.seq + 1:
+                self._deliver({"kind": "gap"})
+            self.seq = seq
+            self._deliver(message)
+
+    def _deliver(self, message):
+        try:
+            self.on_change(message)
+        except Exception:
+            pass
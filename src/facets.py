@@ -0,0 +1,163 @@
+"""Dictionary-encoded software/category/tags columns with posting lists.
+
+A handful of values ("Windows", "Hotkey", the "import" tag) repeat across
+most records. `FacetIndex` gives each distinct value of a field a small
+integer id, keeps one id per record for single-valued fields (an
+`array("I")` column) and, per id, the sorted positions of the records that
+carry it. Filters such as "software == Git" are then a dictionary lookup
+plus an intersection of posting lists, and the distinct values behind a
+dropdown come straight from the dictionary instead of a scan.
+
+Positions are list positions in the owning store; appends and in-place
+updates are applied incrementally, while deletes (which shift every later
+position) make the store drop and rebuild the index.
+"""
+
+from array import array
+from bisect import bisect_left, insort
+
+# Single-valued fields, and the value assumed when a record lacks one
+DEFAULTS = {"software": "General", "category": ""}
+# Multi-valued fields
+MULTI = ("tags",)
+FACETS = tuple(DEFAULTS) + MULTI
+
+
+def value_of(item, field):
+    """The facet value(s) of `item`, as `matches()` and the index see them."""
+    if field in MULTI:
+        values = item.get(field) or ()
+        return [str(v) for v in values] if isinstance(values, (list, tuple)) else [str(values)]
+    return str(item.get(field, DEFAULTS.get(field, "")))
+
+
+class Field:
+    """Dictionary and postings of one field."""
+
+    def __init__(self):
+        self.values = []  # id -> value
+        self.ids = {}  # value -> id
+        self.folded = {}  # value.lower() -> [ids]
+        self.postings = []  # id -> sorted positions
+
+    def encode(self, value):
+        vid = self.ids.get(value)
+        if vid is None:
+            vid = self.ids[value] = len(self.values)
+            self.values.append(value)
+            self.folded.setdefault(value.lower(), []).append(vid)
+            self.postings.append(array("I"))
+        return vid
+
+    def lookup(self, value):
+        """Sorted positions whose value equals `value`, ignoring case."""
+        ids = self.folded.get(str(value).lower(), ())
+        if len(ids) == 1:
+            return self.postings[ids[0]]
+        return sorted(pos for vid in ids for pos in self.postings[vid])
+
+    def counts(self):
+        """`{value: records}` for every value in use."""
+        return {v: len(p) for v, p in zip(self.values, self.postings) if p}
+
+
+class FacetIndex:
+    def __init__(self, items=()):
+        self.fields = {field: Field() for field in FACETS}
+        # Single-valued columns: per record, the id of its value
+        self.columns = {field: array("I") for field in DEFAULTS}
+        self.size = 0
+        self._build(items if isinstance(items, list) else list(items))
+
+    def __len__(self):
+        return self.size
+
+    def _build(self, items):
+        # `add()` for a whole list, one field at a time with the lookups hoisted
+        for field, column in self.columns.items():
+            f, default = self.fields[field], DEFAULTS[field]
+            ids, postings = f.ids, f.postings
+            for pos, item in enumerate(items):
+                value = item.get(field, default)
+                vid = ids.get(value)
+                if vid is None:
+                    vid = f.encode(str(value))
+                column.append(vid)
+                postings[vid].append(pos)
+        for field in MULTI:
+            f = self.fields[field]
+            ids, postings = f.ids, f.postings
+            for pos, item in enumerate(items):
+                values = item.get(field)
+                if not values:
+                    continue
+                if type(values) is not list:
+                    values = value_of(item, field)
+                for value in values:
+                    vid = ids.get(value)
+                    if vid is None:
+                        vid = f.encode(str(value))
+                    posting = postings[vid]
+                    # A tag listed twice is filed once
+                    if not posting or posting[-1] != pos:
+                        posting.append(pos)
+        self.size = len(items)
+
+    def add(self, item):
+        pos = self.size
+        self.size += 1
+        for field, column in self.columns.items():
+            vid = self.fields[field].encode(value_of(item, field))
+            column.append(vid)
+            self.fields[field].postings[vid].append(pos)
+        for field in MULTI:
+            f = self.fields[field]
+            for vid in {f.encode(v) for v in value_of(item, field)}:
+                f.postings[vid].append(pos)
+
+    def update(self, pos, old, new):
+        """Re-file the record at `pos`, whose values changed from `old` to `new`."""
+        for field, column in self.columns.items():
+            f = self.fields[field]
+            vid = f.encode(value_of(new, field))
+            if vid != column[pos]:
+                self._move(f.postings[column[pos]], f.postings[vid], pos)
+                column[pos] = vid
+        for field in MULTI:
+            f = self.fields[field]
+            before = {f.encode(v) for v in value_of(old, field)}
+            after = {f.encode(v) for v in value_of(new, field)}
+            for vid in before - after:
+                self._move(f.postings[vid], None, pos)
+            for vid in after - before:
+                insort(f.postings[vid], pos)
+
+    @staticmethod
+    def _move(source, target, pos):
+        at = bisect_left(source, pos)
+        if at < len(source) and source[at] == pos:
+            del source[at]
+        if target is not None:
+            insort(target, pos)
+
+    def values(self, field):
+        """Distinct values currently in use, sorted."""
+        return sorted(self.fields[field].counts())
+
+    def positions(self, filters):
+        """Sorted positions matching every `field: value` (case-insensitive), or None.
+
+        None means a field is not indexed and the caller has to scan.
+        """
+        if any(field not in self.fields for field in filters):
+            return None
+        lists = sorted(
+            (self.fields[field].lookup(value) for field, value in filters.items()), key=len
+        )
+        if not lists:
+            return list(range(self.size))
+        result = lists[0]
+        for other in lists[1:]:
+            wanted = set(other)
+            result = [pos for pos in result if pos in wanted]
+        return list(result)
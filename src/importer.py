@@ -1,60 +1,45 @@
 import io
-import json
-import os
-import shutil
 import webbrowser
-from datetime import datetime
 
 import pandas as pd
 import requests
 import streamlit as st
 
+import query_api
+import store
+import tool_server
+
 # --- CONFIG ---
-PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-DB_FILE = os.path.join(PROJECT_ROOT, "data", "commands.json")
-BACKUP_DIR = os.path.join(PROJECT_ROOT, "data", "backups")
+PROJECT_ROOT = store.PROJECT_ROOT
+DB_FILE = store.DB_FILE
+BACKUP_DIR = store.BACKUP_DIR
 
 st.set_page_config(page_title="Web Harvester", page_icon="🕷️", layout="wide")
+tool_server.heartbeat(__file__)
 
 
 # --- FUNCTIONS ---
+@st.cache_resource
+def get_store():
+    # The resident Quick Add daemon already holds the data warm
+    db = query_api.connect() or store.open_store()
+    db.start_compactor()
+    # Apply other tools' writes as they are announced (see change_feed.py)
+    db.follow()
+    return db
+
+
 def load_db():
-    if os.path.exists(DB_FILE):
-        try:
-            with open(DB_FILE, "r") as f:
-                return json.load(f)
-        except Exception:
-            return []
-    return []
+    db = get_store()
+    db.refresh()
+    return db.records
 
 
 def save_db_smart(new_data):
-    if not os.path.exists(BACKUP_DIR):
-        os.makedirs(BACKUP_DIR)
-    shutil.copy(
-        DB_FILE,
-        os.path.join(BACKUP_DIR, f"backup_import_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"),
-    )
-
-    current_db = load_db()
-    existing_signatures = {
-        f"{item.get('software','').lower()}|{item['command'].lower().strip()}"
-        for item in current_db
-    }
-
-    added, skipped = 0, 0
-    for entry in new_data:
-        sig = f"{entry['software'].lower()}|{entry['command'].lower().strip()}"
-        if sig in existing_signatures:
-            skipped += 1
-            continue
-        current_db.append(entry)
-        existing_signatures.add(sig)
-        added += 1
-
-    with open(DB_FILE, "w") as f:
-        json.dump(current_db, f, indent=4)
-    return added, skipped
+    db = get_store()
+    db.backup("backup_import", BACKUP_DIR)
+    # New rows go to the journal in one write; duplicates are skipped
+    return db.bulk_upsert(new_data)
 
 
 st.title("🕷️ Web Command Harvester")
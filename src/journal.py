@@ -0,0 +1,145 @@
+"""Append-only write-ahead journal for `commands.json` mutations.
+
+The journal lives next to the database (`commands.json.journal`). Its first
+line is a header recording the `(mtime_ns, size)` of the main file it was
+started against; every following line is one operation:
+
+    {"op": "add", "record": {...}}
+    {"op": "update", "i": 12, "changes": {...}}
+    {"op": "delete", "i": 12}
+
+Once the main file is rewritten by compaction the header no longer matches,
+so a reader that catches the two files mid-swap simply ignores the journal
+instead of applying its operations twice. The header a compaction starts
+also names the file it compacted and how much of the old journal it
+folded in (`from`, `consumed`), so a reader that had replayed exactly that
+much already holds the new file's contents.
+"""
+
+import json
+import os
+
+import atomic
+
+SUFFIX = ".journal"
+
+
+def journal_path(db_path):
+    return db_path + SUFFIX
+
+
+def _header(base, parent=None, consumed=None):
+    fields = {"base": list(base) if base else None}
+    if parent:
+        fields.update({"from": list(parent), "consumed": consumed})
+    return (json.dumps(fields) + "\n").encode("utf-8")
+
+
+class Journal:
+    def __init__(self, path):
+        self.path = path
+        # Length of the header line; anything beyond it is pending work
+        self.header_len = 0
+
+    def size(self):
+        try:
+            return os.path.getsize(self.path)
+        except OSError:
+            return 0
+
+    def header(self):
+        """`(fields, length)` of the header line, or `(None, 0)` if there is none."""
+        try:
+            with open(self.path, "rb") as f:
+                line = f.readline()
+        except OSError:
+            return None, 0
+        try:
+            fields = json.loads(line)
+        except ValueError:
+            return None, 0
+        if not line.endswith(b"\n") or not isinstance(fields, dict):
+            return None, 0
+        return fields, len(line)
+
+    def read(self, base, offset=0):
+        """Read operations starting at byte `offset`.
+
+        Returns `(ops, end_offset, valid)`. `valid` is False when the journal
+        was started against a different main file (it has been compacted or
+        the database was replaced), in which case no operations are returned.
+        A torn final line from an interrupted write is skipped.
+        """
+        try:
+            with open(self.path, "rb") as f:
+                if offset == 0:
+                    self.header_len = 0
+                    try:
+                        stamp = json.loads(f.readline()).get("base")
+                    except (ValueError, AttributeError):
+                        stamp = False
+                    if stamp is False or (
+                        (tuple(stamp) if stamp else None) != (tuple(base) if base else None)
+                    ):
+                        f.seek(0, os.SEEK_END)
+                        return [], f.tell(), False
+                    offset = self.header_len = f.tell()
+                else:
+                    f.seek(offset)
+                data = f.read()
+        except OSError:
+            return [], 0, offset == 0
+
+        ops = []
+        consumed = 0
+        for line in data.splitlines(keepends=True):
+            if not line.endswith(b"\n"):
+                # Incomplete write still in flight (or torn by a crash)
+                break
+            consumed += len(line)
+            try:
+                ops.append(json.loads(line))
+            except ValueError:
+                continue
+        return ops, offset + consumed, True
+
+    def append(self, ops, base, reset=False):
+        """Append `ops` as single lines and fsync once. Returns the new end offset."""
+        payload = b"".join(
+            (json.dumps(op, separators=(",", ":")) + "\n").encode("utf-8") for op in ops
+        )
+        fresh = reset or self.size() == 0
+        with open(self.path, "wb" if fresh else "a+b") as f:
+            if fresh:
+                f.write(_header(base))
+                self.header_len = f.tell()
+            else:
+                # Terminate a torn line left by a crash so it can't swallow ours
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    f.write(b"\n")
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+            return f.tell()
+
+    def rebase(self, base, consumed, parent=None):
+        """Restart the journal against a freshly compacted main file.
+
+        Lines past `consumed` were appended by someone else after we last
+        read; they are carried over. `parent` is the stamp of the file that
+        was compacted, or None when the new file is not just that file plus
+        the journal (a full rewrite). Returns the offset of the first
+        carried-over line.
+        """
+        leftover = b""
+        try:
+            with open(self.path, "rb") as f:
+                f.seek(consumed)
+                leftover = f.read()
+        except OSError:
+            pass
+        header = _header(base, parent, consumed)
+        atomic.write_bytes(self.path, header + leftover)
+        self.header_len = len(header)
+        return self.header_len
@@ -0,0 +1,87 @@
+"""Incremental parsing of a top-level JSON array such as `commands.json`.
+
+`json.load` builds the whole document before returning anything, so a
+multi-hundred-MB file briefly exists twice (the parsed dicts plus whatever
+the caller converts them to) and nothing is usable until the last byte is
+read. `iter_array()` reads fixed-size chunks and decodes one element at a
+time, so memory is bounded by the chunk plus the largest element, and
+`iter_batches()` groups elements for callers that publish progress.
+"""
+
+import json
+import re
+
+CHUNK = 1024 * 1024
+BATCH = 20_000
+
+_WS = re.compile(r"[ \t\n\r]*").match
+
+
+class StreamError(ValueError):
+    """The file is not a JSON array (or is truncated)."""
+
+
+def iter_array(f, chunk=CHUNK):
+    """Yield the elements of the JSON array read from text file `f`."""
+    decode = json.JSONDecoder().raw_decode
+    buf, pos, eof = "", 0, False
+
+    def fill():
+        # Drop what was consumed and append the next chunk; False at end of file
+        nonlocal buf, pos, eof
+        data = f.read(chunk)
+        buf, pos = buf[pos:] + data, 0
+        eof = not data
+        return not eof
+
+    def skip_ws():
+        nonlocal pos
+        while True:
+            pos = _WS(buf, pos).end()
+            if pos < len(buf) or not fill():
+                return
+
+    skip_ws()
+    if pos >= len(buf) or buf[pos] != "[":
+        raise StreamError("expected a JSON array")
+    pos += 1
+    first = True
+    while True:
+        skip_ws()
+        if pos >= len(buf):
+            raise StreamError("unterminated JSON array")
+        if buf[pos] == "]":
+            return
+        if not first:
+            if buf[pos] != ",":
+                raise StreamError(f"expected ',' or ']' at offset {pos}")
+            pos += 1
+            skip_ws()
+        first = False
+        while True:
+            try:
+                value, end = decode(buf, pos)
+            except json.JSONDecodeError:
+                # Most likely the element runs past the buffer; read on
+                if eof or not fill():
+                    raise StreamError("truncated or invalid JSON element") from None
+                continue
+            if end == len(buf) and not eof and buf[pos] not in "{[\"":
+                # A bare number may continue in the next chunk
+                if fill():
+                    continue
+            pos = end
+            yield value
+            break
+
+
+def iter_batches(f, size=BATCH, chunk=CHUNK):
+    """`iter_array()` grouped into lists of up to `size` elements."""
+    batch = []
+    for value in iter_array(f, chunk):
+        batch.append(value)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
@@ -0,0 +1,77 @@
+"""Hotkey-to-paint timing for the Quick Add popup.
+
+Each popup records named checkpoints relative to the moment the hotkey
+fired (e.g. "visible", "first paint") and writes one line per popup to a
+size-capped rotating log, flagging popups that blew the latency budget:
+
+    data/logs/quick_add_latency.log
+"""
+
+import os
+import time
+
+import store
+
+LOG_FILE = os.path.join(store.DATA_DIR, "logs", "quick_add_latency.log")
+
+# Hotkey -> first results painted, in milliseconds
+BUDGET_MS = 150
+
+MAX_BYTES = 256 * 1024
+BACKUPS = 2
+
+
+def get_logger(path=LOG_FILE):
+    # Imported here: logging is the slowest import on the popup's boot path
+    # and nothing is logged until the first popup has painted
+    import logging
+    from logging.handlers import RotatingFileHandler
+
+    logger = logging.getLogger(f"commanddb.latency.{path}")
+    if not logger.handlers:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        handler = RotatingFileHandler(
+            path, maxBytes=MAX_BYTES, backupCount=BACKUPS, encoding="utf-8"
+        )
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+    return logger
+
+
+class LatencyTrace:
+    """Checkpoints of one popup, in milliseconds since `begin()`."""
+
+    def __init__(self, logger=None, budget_ms=BUDGET_MS):
+        self.logger = logger
+        self.budget_ms = budget_ms
+        self.start = None
+        self.marks = []
+
+    def begin(self, started=None):
+        """Start a trace; `started` is a `time.perf_counter()` taken when the hotkey fired."""
+        self.start = time.perf_counter() if started is None else started
+        self.marks = []
+
+    def mark(self, name):
+        if self.start is not None:
+            self.marks.append((name, (time.perf_counter() - self.start) * 1000))
+
+    def finish(self):
+        """Log the trace and close it. Returns the total in ms, or None if none was open."""
+        if self.start is None:
+            return None
+        self.start = None
+        total = self.marks[-1][1] if self.marks else 0.0
+        line = ", ".join(f"{name} {ms:.1f} ms" for name, ms in self.marks)
+        try:
+            logger = self.logger or get_logger()
+            if total > self.budget_ms:
+                logger.warning("%s (over %d ms budget)", line, self.budget_ms)
+            else:
+                logger.info("%s", line)
+        except OSError:
+            # Timing must never break the popup
+            pass
+        return total
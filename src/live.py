@@ -0,0 +1,94 @@
+"""Background threads that keep a store current and its journal short.
+
+`LiveStore` is mixed into both storage backends. It owns the threads; the
+backend decides what a change means:
+
+- `watch()` runs a `FileWatcher` on `watched_paths()` and calls
+  `_catch_up()` after every write to them.
+- `follow()` hands every `change_feed` message to `apply_change()`.
+- `start_compactor()` calls `compact()` every few seconds.
+"""
+
+import threading
+
+import change_feed
+from watcher import FileWatcher
+
+# Seconds between background compactions
+COMPACT_INTERVAL = 30
+
+
+class LiveStore:
+    """Watcher, change-feed subscriber and compactor of a store."""
+
+    _watcher = None
+    _feed = None
+    _compactor = None
+    _stop = None
+
+    def watched_paths(self):
+        raise NotImplementedError
+
+    def _catch_up(self, on_change):
+        """Apply whatever the watched files changed. Returns True if `on_change()` is due."""
+        return self.reload_in_background()
+
+    def watch(self, on_change=None):
+        """Keep the model current from a background file watcher.
+
+        `on_change()` is called from the watcher thread after every swap.
+        """
+
+        def changed():
+            if self._catch_up(on_change) and on_change is not None:
+                on_change()
+
+        if self._watcher is None:
+            self._watcher = FileWatcher(self.watched_paths(), changed, prime=True).start()
+        return self._watcher
+
+    @property
+    def watching(self):
+        return self._watcher is not None
+
+    def stop_watching(self):
+        if self._watcher is not None:
+            self._watcher.stop()
+            self._watcher = None
+
+    def follow(self, on_change=None):
+        """Apply changes from the cross-process feed as they arrive (see `change_feed`).
+
+        `on_change()` runs on the feed thread after each applied change.
+        """
+
+        def changed(message):
+            if self.apply_change(message) and on_change is not None:
+                on_change()
+
+        if self._feed is None:
+            self._feed = change_feed.Subscriber(changed).start()
+        return self._feed
+
+    def start_compactor(self, interval=COMPACT_INTERVAL):
+        """Compact in a daemon thread every `interval` seconds."""
+        if self._compactor is not None:
+            return
+        # One event per thread: a stopped loop still winding down can't be revived
+        stop = self._stop = threading.Event()
+
+        def loop():
+            while not stop.wait(interval):
+                try:
+                    self.compact()
+                except Exception:
+                    pass
+
+        self._compactor = threading.Thread(target=loop, name="compactor", daemon=True)
+        self._compactor.start()
+
+    def stop_compactor(self):
+        """Stop the compactor; `start_compactor()` may start a new one afterwards."""
+        if self._compactor is not None:
+            self._stop.set()
+            self._compactor = self._stop = None
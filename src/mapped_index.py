@@ -0,0 +1,238 @@
+"""Read-only search index that every process maps instead of parsing.
+
+Quick Add keeps a trigram index (see `search_index.py`) over the whole
+database. Whenever its model is exactly the main file (after the first load
+and after each compaction) it also writes that index, together with the
+records and their search strings, to `commands.json.idx`, laid out so other
+processes can `mmap` it and search it where it lies:
+
+    header     magic, Python version, (mtime_ns, size) of the JSON file,
+               counts and the offset of each section
+    texts      uint64 offsets, then the UTF-8 search strings
+    records    uint64 offsets, then one marshalled tuple per record
+    grams      uint64 offsets, then the sorted UTF-8 trigrams
+    postings   uint64 offsets, then uint32 record positions per trigram
+
+Opening it reads the header and nothing else, whatever the size of the
+database. A query binary-searches the gram table and gets its posting
+lists as views into the mapping; only candidate strings and the records
+returned are decoded. The pages live once in the OS page cache, shared by
+every process that maps the file, instead of once per process heap.
+
+Like the binary snapshot (and switched off with it, `COMMANDDB_SNAPSHOT=0`)
+the index is only used while its header matches the JSON file's stamp and
+the journal holds nothing on top of that file. On Windows a file that is
+mapped can't be replaced, so while a CLI session holds it open the index is
+left stale and readers fall back to loading.
+"""
+
+import marshal
+import mmap
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from collections.abc import Sequence
+from itertools import accumulate
+
+import atomic
+from record import KEYS, MISSING, Record
+from search_index import GRAM, trigrams
+
+MAGIC = b"CDBIDX01"
+# magic, Python major, minor (for marshal), little-endian?, (mtime_ns, size),
+# record count, gram count, offsets of the eight sections
+_HEADER = struct.Struct("<8sBBB5xqqQQ8Q")
+_ALIGN = 8
+_VERSION = (*sys.version_info[:2], sys.byteorder == "little")
+
+
+def index_path(path):
+    return path + ".idx"
+
+
+def stamp_of(path):
+    """The JSON stamp the index at `path` was built from, or None."""
+    try:
+        with open(path, "rb") as f:
+            head = f.read(_HEADER.size)
+    except OSError:
+        return None
+    if len(head) != _HEADER.size:
+        return None
+    fields = _HEADER.unpack(head)
+    if fields[0] != MAGIC or fields[1:4] != _VERSION:
+        return None
+    return fields[4:6]
+
+
+# --- WRITE ---
+def _record_blobs(body):
+    """One marshalled `(*values, extra, missing fields)` per record of `snapshot.columns()`."""
+    cols, extras, absent = body[: len(KEYS)], body[len(KEYS)], body[len(KEYS) + 1]
+    gone = {}
+    for key, positions in absent.items():
+        for n in positions:
+            gone.setdefault(n, []).append(key)
+    dumps = marshal.dumps
+    return [
+        dumps((*values, extras.get(n), tuple(gone.get(n, ()))))
+        for n, values in enumerate(zip(*cols))
+    ]
+
+
+def _positions(ids, deleted):
+    """Internal ids of a `TrigramIndex` posting list as record positions."""
+    if not deleted:
+        return ids
+    gone = set(deleted)
+    return array("I", [d - bisect_left(deleted, d) for d in ids if d not in gone])
+
+
+def write(path, stamp, texts, body, postings, deleted=()):
+    """Write the index for the JSON file with `stamp`. Returns False on failure.
+
+    `texts` are the search strings parallel to the records in `body` (see
+    `snapshot.columns()`); `postings` maps each trigram to the sorted
+    internal ids of a `TrigramIndex`, of which the sorted `deleted` ones are
+    tombstones. Like the snapshot this is a cache, so errors are swallowed.
+    """
+    deleted = list(deleted)
+    grams, lists = [], []
+    for gram in sorted(postings):
+        ids = _positions(postings[gram], deleted)
+        if len(ids):
+            grams.append(gram)
+            lists.append(ids)
+    sections = [
+        [text.encode("utf-8") for text in texts],
+        _record_blobs(body),
+        [gram.encode("utf-8") for gram in grams],
+        [ids.tobytes() for ids in lists],
+    ]
+
+    def dump(f):
+        f.write(bytes(_HEADER.size))
+        offsets = []
+        for blobs in sections:
+            at = array("Q", accumulate(map(len, blobs), initial=0))
+            for data in (at, b"".join(blobs)):
+                pad = -f.tell() % _ALIGN
+                f.write(bytes(pad))
+                offsets.append(f.tell())
+                f.write(data)
+        f.seek(0)
+        f.write(_HEADER.pack(MAGIC, *_VERSION, *stamp, len(texts), len(grams), *offsets))
+
+    try:
+        atomic.replace(path, dump, binary=True)
+    except (OSError, ValueError):
+        return False
+    return True
+
+
+# --- READ ---
+def _text(view):
+    return str(view, "utf-8")
+
+
+def _record(view):
+    cmd, soft, desc, cat, tags, rid, rev, extra, gone = marshal.loads(view)
+    item = Record.__new__(Record)
+    item.command = cmd
+    item.software = soft
+    item.description = desc
+    item.category = cat
+    item.tags = tags
+    item.id = rid
+    item.rev = rev
+    item.extra = extra
+    for key in gone:
+        setattr(item, key, MISSING)
+    return item
+
+
+class _Packed(Sequence):
+    """The items of one section, decoded on access."""
+
+    def __init__(self, at, blob, decode):
+        self._at, self._blob, self._decode = at, blob, decode
+
+    def __len__(self):
+        return len(self._at) - 1
+
+    def __getitem__(self, n):
+        if n < 0:
+            n += len(self)
+        if not 0 <= n < len(self):
+            raise IndexError(n)
+        return self._decode(self._blob[self._at[n] : self._at[n + 1]])
+
+
+class MappedIndex:
+    """Records, search strings and trigram postings of a mapped index file.
+
+    `records` and `texts` are sequences parallel to the store's positions,
+    and `candidates()` follows `TrigramIndex.candidates()`, so the pair can
+    be handed to `ranking.rank()` like a loaded store's.
+    """
+
+    def __init__(self, mapping, stamp, count, grams, offsets):
+        self.stamp = stamp
+        self._map = mapping
+        view = memoryview(mapping)
+
+        def section(n, ends, fmt=None):
+            at = view[offsets[n] : offsets[n] + 8 * (ends + 1)].cast("Q")
+            blob = view[offsets[n + 1] : offsets[n + 1] + at[-1]]
+            return at, blob if fmt is None else blob.cast(fmt)
+
+        self.texts = _Packed(*section(0, count), _text)
+        self.records = _Packed(*section(2, count), _record)
+        self._grams = _Packed(*section(4, grams), _text)
+        self._post_at, self._postings = section(6, grams, "I")
+
+    def __len__(self):
+        return len(self.texts)
+
+    def postings(self, gram):
+        """Sorted positions of the records containing `gram`, as a view (empty if none)."""
+        n = bisect_left(self._grams, gram)
+        if n == len(self._grams) or self._grams[n] != gram:
+            return ()
+        # Byte offsets; the postings section is a view of uint32s
+        start, end = self._post_at[n] // 4, self._post_at[n + 1] // 4
+        return self._postings[start:end]
+
+    def candidates(self, query):
+        """Sorted positions that may contain `query`, or None to scan everything."""
+        if len(query) < GRAM:
+            return None
+        lists = []
+        for gram in trigrams(query):
+            ids = self.postings(gram)
+            if not len(ids):
+                return ()
+            lists.append(ids)
+        return min(lists, key=len)
+
+
+def open_index(path, stamp):
+    """Map the index at `path` if it was built from the JSON file with `stamp`, else None."""
+    if stamp is None or stamp_of(path) != tuple(stamp):
+        return None
+    try:
+        with open(path, "rb") as f:
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    fields = _HEADER.unpack_from(mapping)
+    # The header may belong to a newer file than the one we checked; recheck
+    if fields[4:6] != tuple(stamp):
+        mapping.close()
+        return None
+    try:
+        return MappedIndex(mapping, tuple(stamp), *fields[6:8], fields[8:])
+    except (TypeError, ValueError, IndexError):
+        # Damaged; callers load the JSON instead
+        return None
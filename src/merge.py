@@ -0,0 +1,102 @@
+"""Three-way merge of an editor's changes into the live database.
+
+An editor (the dashboard table) loads a set of records, lets the user
+change them for a while, and then saves. Meanwhile other tools may have
+added, edited or deleted records. `plan()` compares
+
+    base     the records as the editor loaded them (with `id` and `rev`)
+    edited   the records as the editor wants them now
+    current  the live record for an id, or None if it is gone
+
+and works out what to write: fields only the editor changed are applied
+even if someone else changed other fields of the same record, records
+added elsewhere are left alone, and only a real clash (both sides changed
+a field to different values, or one side deleted a record the other
+edited) becomes a conflict, which is reported instead of overwritten.
+"""
+
+from record import content
+
+
+def _changed(old, new):
+    """Fields whose value differs between `old` and `new` (a missing field equals None)."""
+    return {
+        k
+        for k in set(old) | set(new)
+        if not k.startswith("_") and old.get(k) != new.get(k)
+    }
+
+
+class Plan:
+    def __init__(self):
+        self.updates = []  # (id, changes)
+        self.deletes = []  # ids
+        self.adds = []  # records
+        self.conflicts = []
+
+    def conflict(self, rid, reason, item, fields=(), ours=None, theirs=None):
+        self.conflicts.append(
+            {
+                "id": rid,
+                "command": item.get("command", ""),
+                "reason": reason,
+                "fields": sorted(fields),
+                "ours": ours,
+                "theirs": theirs,
+            }
+        )
+
+    def summary(self):
+        return {
+            "updated": len(self.updates),
+            "deleted": len(self.deletes),
+            "added": len(self.adds),
+            "conflicts": self.conflicts,
+        }
+
+
+def plan(base, edited, current):
+    """The writes that turn `base` into `edited` on top of `current(id)`."""
+    result = Plan()
+    originals = {item["id"]: item for item in base if item.get("id") is not None}
+    seen = set()
+    for item in edited:
+        rid = item.get("id")
+        if rid is None or rid not in originals or rid in seen:
+            # A new row (or a copy of one)
+            result.adds.append(content(item))
+            continue
+        seen.add(rid)
+        old = content(originals[rid])
+        ours = _changed(old, content(item))
+        if not ours:
+            continue
+        live = current(rid)
+        if live is None:
+            result.conflict(rid, "deleted elsewhere", item, ours, ours=content(item))
+            continue
+        if live.get("rev") != originals[rid].get("rev"):
+            theirs = content(live)
+            clash = {k for k in ours & _changed(old, theirs) if item.get(k) != theirs.get(k)}
+            if clash:
+                result.conflict(
+                    rid,
+                    "edited elsewhere",
+                    item,
+                    clash,
+                    ours={k: item.get(k) for k in clash},
+                    theirs={k: theirs.get(k) for k in clash},
+                )
+                continue
+        result.updates.append((rid, {k: item.get(k) for k in ours}))
+    for rid, item in originals.items():
+        if rid in seen:
+            continue
+        live = current(rid)
+        if live is None:
+            continue
+        if live.get("rev") != item.get("rev") and _changed(content(item), content(live)):
+            result.conflict(rid, "edited elsewhere, deleted here", item, theirs=content(live))
+            continue
+        result.deletes.append(rid)
+    return result
@@ -0,0 +1,342 @@
+"""Local query/mutation API served by the resident Quick Add process.
+
+Quick Add keeps the database, its search strings and the trigram index
+warm. `serve()` exposes that store on `127.0.0.1:49203` so the CLI and the
+dashboard can search and write through it instead of parsing
+`commands.json` themselves. The protocol is one JSON object per line in
+each direction:
+
+    {"op": "rank", "args": ["git st"], "kwargs": {"limit": 10}}
+    {"ok": true, "result": [[12, {...}], ...]}
+
+`connect()` returns a `RemoteStore` with the usual store API, or None when
+no daemon is running, so callers fall back to `store.open_store()`.
+
+Any local program (including a web page POSTing to localhost) can reach the
+port, so the first line of every connection must be `{"token": ...}` with
+the secret `serve()` writes to a user-only file under `data/run/`. Anything
+that is not a well-formed request (an HTTP request line, a bad token, an
+unknown op) closes the connection.
+"""
+
+import hmac
+import json
+import os
+import re
+import secrets
+import socket
+import socketserver
+import threading
+
+import ranking
+import record
+import store
+
+HOST = "127.0.0.1"
+PORT = 49203
+TOKEN_FILE = os.path.join(store.RUN_DIR, "query_api.token")
+
+# How long a client waits for the daemon before falling back to the file
+CONNECT_TIMEOUT = 0.2
+REQUEST_TIMEOUT = 30
+MAX_REQUEST = 16 * 1024 * 1024
+
+# Store methods callable over the wire
+QUERIES = ("rank", "find", "key_of", "version", "page", "count", "search", "values")
+MUTATIONS = (
+    "add",
+    "add_many",
+    "update",
+    "delete",
+    "bulk_upsert",
+    "replace_all",
+    "merge",
+    "backup",
+)
+
+
+# Backup labels end up in file names
+_LABEL = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+
+class RemoteError(RuntimeError):
+    """The daemon ran the request and it failed."""
+
+
+class ProtocolError(ValueError):
+    """A line that is not a request (or not an authorised one); the connection is closed."""
+
+
+def write_token(path=TOKEN_FILE):
+    """Create a fresh secret readable only by this user. Returns it."""
+    token = secrets.token_hex(32)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w", encoding="ascii") as f:
+        f.write(token)
+    os.chmod(tmp, 0o600)
+    os.replace(tmp, path)
+    return token
+
+
+def read_token(path=TOKEN_FILE):
+    try:
+        with open(path, encoding="ascii") as f:
+            return f.read().strip() or None
+    except (OSError, ValueError):
+        return None
+
+
+def _request(line):
+    """The `(op, args, kwargs)` on `line`, or ProtocolError."""
+    try:
+        request = json.loads(line)
+    except ValueError:
+        raise ProtocolError("not a JSON request") from None
+    if not isinstance(request, dict):
+        raise ProtocolError("not a JSON request")
+    op, args, kwargs = request.get("op"), request.get("args", []), request.get("kwargs", {})
+    if op not in QUERIES + MUTATIONS:
+        raise ProtocolError(f"unknown op {op!r}")
+    if not isinstance(args, list) or not isinstance(kwargs, dict):
+        raise ProtocolError("bad arguments")
+    return op, args, kwargs
+
+
+def _call(db, op, args, kwargs):
+    if op == "backup":
+        # Only the label comes from the wire; the backup folder is the daemon's own
+        if len(args) > 1 or set(kwargs) - {"prefix"}:
+            raise ValueError("only a backup label may be given")
+        prefix = args[0] if args else kwargs.get("prefix", "commands_backup")
+        if not isinstance(prefix, str) or not _LABEL.fullmatch(prefix):
+            raise ValueError("backup label must be 1-64 letters, digits, '_' or '-'")
+        return db.backup(prefix)
+    if op == "version":
+        return db.version
+    if op == "count":
+        return len(db)
+    if op == "search":
+        return list(db.search(*args, **kwargs))
+    return getattr(db, op)(*args, **kwargs)
+
+
+# --- SERVER ---
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        if not self._authenticate():
+            return
+        while True:
+            line = self.rfile.readline(MAX_REQUEST)
+            if not line:
+                return
+            try:
+                op, args, kwargs = _request(line)
+            except ProtocolError as e:
+                self._reply({"ok": False, "error": f"ProtocolError: {e}", "kind": "ProtocolError"})
+                return
+            try:
+                reply = {"ok": True, "result": _call(self.server.db, op, args, kwargs)}
+            except Exception as e:
+                reply = {"ok": False, "error": f"{type(e).__name__}: {e}", "kind": type(e).__name__}
+            self._reply(reply)
+
+    def _authenticate(self):
+        """The first line must carry the session token; anything else ends the connection."""
+        line = self.rfile.readline(1024)
+        try:
+            token = json.loads(line).get("token")
+        except (ValueError, AttributeError):
+            token = None
+        # Compared as bytes: `compare_digest` rejects str with non-ASCII characters
+        if not isinstance(token, str) or not hmac.compare_digest(
+            token.encode("utf-8"), self.server.token.encode("utf-8")
+        ):
+            self._reply({"ok": False, "error": "ProtocolError: bad token", "kind": "ProtocolError"})
+            return False
+        self._reply({"ok": True, "result": None})
+        return True
+
+    def _reply(self, reply):
+        data = json.dumps(reply, default=record.jsonable) + "\n"
+        self.wfile.write(data.encode("utf-8"))
+        self.wfile.flush()
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = False
+
+
+def serve(db, port=None, token_file=TOKEN_FILE):
+    """Serve `db` from a daemon thread. Returns the server, or None if the port is taken.
+
+    A new token is written to `token_file` once the port is ours (never
+    before, so a second instance can't lock clients out of the first).
+    """
+    try:
+        server = _Server((HOST, port if port is not None else PORT), _Handler)
+    except OSError:
+        return None
+    try:
+        server.token = write_token(token_file)
+    except OSError:
+        server.server_close()
+        return None
+    server.db = db
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# --- CLIENT ---
+class RemoteStore:
+    """Store API forwarded to the daemon over one persistent connection.
+
+    A dropped connection fails the current call (it is never retried, so a
+    write can't be applied twice) and is re-established on the next one.
+    """
+
+    def __init__(self, port=None, token=None):
+        self.port = port if port is not None else PORT
+        self.token = token
+        self.loaded = True
+        self.sock = self.file = None
+        self._lock = threading.Lock()
+
+    def _connect(self, timeout):
+        self.sock = socket.create_connection((HOST, self.port), timeout)
+        self.sock.settimeout(REQUEST_TIMEOUT)
+        self.file = self.sock.makefile("rb")
+        self.sock.sendall((json.dumps({"token": self.token}) + "\n").encode("utf-8"))
+        reply = json.loads(self.file.readline() or b"{}")
+        if not reply.get("ok"):
+            raise ConnectionRefusedError("Quick Add daemon rejected the session token")
+
+    def call(self, op, *args, **kwargs):
+        payload = json.dumps({"op": op, "args": args, "kwargs": kwargs}) + "\n"
+        with self._lock:
+            try:
+                if self.sock is None:
+                    self._connect(CONNECT_TIMEOUT)
+                self.sock.sendall(payload.encode("utf-8"))
+                line = self.file.readline()
+                if not line:
+                    raise ConnectionError("Quick Add daemon closed the connection")
+            except (OSError, ValueError):
+                self.close()
+                raise
+        reply = json.loads(line)
+        if not reply["ok"]:
+            if reply.get("kind") == "Conflict":
+                # Same exception as a local store, so callers handle both alike
+                raise store.Conflict(reply["error"].split(": ", 1)[-1])
+            raise RemoteError(reply["error"])
+        return reply["result"]
+
+    # --- READ ---
+    @property
+    def version(self):
+        return self.call("version")
+
+    @property
+    def records(self):
+        """Every record, fetched a page per request (see `store.read_all`)."""
+        return store.read_all(self)
+
+    def page(self, offset=0, limit=None, filters=None):
+        return self.call("page", offset, limit, filters)
+
+    def refresh(self):
+        """The daemon keeps itself current; kept for API parity."""
+        return False
+
+    def __len__(self):
+        return self.call("count")
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def rank(self, query, limit=ranking.LIMIT, cancelled=None, filters=None, fuzzy=True):
+        """`cancelled` can't cross the wire; the daemon ranks to the end."""
+        kwargs = {"filters": filters} if filters else {}
+        if not fuzzy:
+            kwargs["fuzzy"] = False
+        return [tuple(pair) for pair in self.call("rank", query, limit, **kwargs)]
+
+    def search(self, query, limit=None):
+        return [tuple(pair) for pair in self.call("search", query, limit)]
+
+    def find(self, item):
+        return self.call("find", item)
+
+    def key_of(self, record_id):
+        return self.call("key_of", record_id)
+
+    def values(self, field):
+        return self.call("values", field)
+
+    def ensure_index(self):
+        """The daemon's index is always warm; kept for API parity."""
+
+    def stream_load(self, on_progress=None, index=False):
+        """Nothing to load locally; kept for API parity."""
+        if on_progress is not None:
+            on_progress()
+        return False
+
+    # --- WRITE ---
+    def add(self, entry):
+        return self.call("add", entry)
+
+    def add_many(self, entries):
+        return self.call("add_many", entries)
+
+    def update(self, key, changes, rev=None):
+        return self.call("update", key, changes, rev)
+
+    def delete(self, key, rev=None):
+        return self.call("delete", key, rev)
+
+    def bulk_upsert(self, entries, overwrite=False):
+        return tuple(self.call("bulk_upsert", entries, overwrite))
+
+    def replace_all(self, records):
+        return self.call("replace_all", records)
+
+    def merge(self, base, edited):
+        return self.call("merge", base, edited)
+
+    def backup(self, prefix="commands_backup", backup_dir=store.BACKUP_DIR):
+        """Back up through the daemon, which always uses its own backup folder."""
+        if os.path.abspath(backup_dir) != os.path.abspath(store.BACKUP_DIR):
+            raise ValueError("the Quick Add daemon only backs up to its own backup folder")
+        return self.call("backup", prefix)
+
+    def start_compactor(self, interval=None):
+        """The daemon compacts its own journal; kept for API parity."""
+
+    def follow(self, on_change=None):
+        """Reads always hit the daemon's current state; kept for API parity."""
+
+    def close(self):
+        if self.sock is not None:
+            self.file.close()
+            self.sock.close()
+            self.sock = self.file = None
+
+
+def connect(port=None, token_file=TOKEN_FILE):
+    """`RemoteStore` for the running daemon, or None if there is none."""
+    token = read_token(token_file)
+    if token is None:
+        return None
+    remote = RemoteStore(port, token)
+    try:
+        # Also proves that whatever listens on the port speaks our protocol
+        if isinstance(remote.call("version"), int):
+            return remote
+    except (OSError, ValueError, KeyError, RemoteError):
+        pass
+    remote.close()
+    return None
@@ -1,71 +1,99 @@
+import atexit
+import importlib
 import importlib.util
-import json
 import os
-import shutil
 import socket
 import subprocess
 import sys
 import threading
 import time
 import tkinter as tk
-from datetime import datetime
-from tkinter import Listbox, messagebox, simpledialog, ttk
-
+from tkinter import Listbox, messagebox, ttk
 
 # --- 1. SELF-HEALING CHECK ---
-def check_deps():
-    required = [
-        "keyboard",
-        "pyperclip",
-        "pyautogui",
-        "pygetwindow",
-        "streamlit",
-        "pandas",
-        "requests",
-        "lxml",
-        "html5lib",
-        "beautifulsoup4",
-    ]
-    missing = [lib for lib in required if importlib.util.find_spec(lib) is None]
-    if missing:
+# Boot only checks what the hotkey loop needs; the dashboard and harvester
+# libraries are checked the first time their hotkey is pressed
+SERVICE_DEPS = ["keyboard", "pyperclip"]
+TOOL_DEPS = {
+    "visual_db.py": ["streamlit", "pandas"],
+    "importer.py": ["streamlit", "pandas", "requests", "lxml", "html5lib", "bs4"],
+}
+# Import name -> pip package, where they differ
+PIP_NAMES = {"bs4": "beautifulsoup4"}
+
+
+def check_deps(modules=SERVICE_DEPS, parent=None):
+    """Offer to install whichever `modules` are missing. Returns True once all are present."""
+    missing = [PIP_NAMES.get(m, m) for m in modules if importlib.util.find_spec(m) is None]
+    if not missing:
+        return True
+    root = parent
+    if root is None:
         root = tk.Tk()
         root.withdraw()
         root.attributes("-topmost", True)
-        if messagebox.askyesno(
-            "Setup Required", f"Install missing libraries?\n{', '.join(missing)}"
+    try:
+        if not messagebox.askyesno(
+            "Setup Required", f"Install missing libraries?\n{', '.join(missing)}", parent=root
         ):
-            try:
-                subprocess.check_call([sys.executable, "-m", "pip", "install", *missing])
-            except Exception:
-                sys.exit()
-        else:
-            sys.exit()
-        root.destroy()
+            return False
+        try:
+            subprocess.check_call([sys.executable, "-m", "pip", "install", *missing])
+        except Exception:
+            return False
+        importlib.invalidate_caches()
+        return True
+    finally:
+        if parent is None:
+            root.destroy()
 
 
-check_deps()
+if not check_deps():
+    sys.exit()
 
 # --- 2. IMPORTS ---
 import keyboard  # noqa: E402
 import pyperclip  # noqa: E402
 
-PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-DB_FILE = os.path.join(PROJECT_ROOT, "data", "commands.json")
-BACKUP_DIR = os.path.join(PROJECT_ROOT, "data", "backups")
-ASSETS_DIR = os.path.join(PROJECT_ROOT, "assets")
+import change_feed  # noqa: E402
+import latency  # noqa: E402
+import query_api  # noqa: E402
+import result_list  # noqa: E402
+import store  # noqa: E402
+import tool_server  # noqa: E402
 import utils  # noqa: E402
+from card_grid import CardGrid  # noqa: E402
+from scheduler import SearchScheduler  # noqa: E402
+
+PROJECT_ROOT = store.PROJECT_ROOT
+DB_FILE = store.DB_FILE
+BACKUP_DIR = store.BACKUP_DIR
+ASSETS_DIR = os.path.join(PROJECT_ROOT, "assets")
+
 
 # --- 3. SINGLE INSTANCE ---
-try:
-    _lock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-    _lock.bind(("127.0.0.1", 49202))
-except Exception:
-    sys.exit()
+def claim_instance():
+    """Bind the single-instance socket, or return None if another service holds it."""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        sock.bind(("127.0.0.1", change_feed.PORT))
+    except OSError:
+        sock.close()
+        return None
+    return sock
+
 
 # --- CONFIG ---
 HOTKEY_ADD = "ctrl+alt+a"
 HOTKEY_VISUAL = "ctrl+alt+v"
 HOTKEY_HARVEST = "ctrl+alt+h"
+MAX_RESULTS = 50
+# Cards ranked per page; scrolling to the last one asks for the next page
+CARD_PAGE = 120
+# Display strings kept for recently rendered records
+LABEL_CACHE = 4096
+# Gives released modifiers time to settle before the cleanup backspace
+CLEANUP_DELAY_MS = 50
 # DB_FILE and BACKUP_DIR are defined above
 
 # --- THEME ---
@@ -79,8 +107,21 @@ IN_FG = "black"
 class QuickAddWidget:
     def __init__(self):
         self.root = None
+        self.store = store.open_store()
         self.db_data = []
-        self.last_mtime = 0
+        self.filtered = []
+        # Rows currently in the Listbox, and display strings per record
+        self.rows = []
+        self.labels = {}
+        self._version = None
+        self.scheduler = None
+        self.card_scheduler = None
+        # Cards asked for so far, and whether the store may have more
+        self.card_limit = CARD_PAGE
+        self.card_more = False
+        # Hotkey -> visible -> first paint, see `latency.py`
+        self.trace = latency.LatencyTrace()
+        self._awaiting_paint = False
 
     def initialize_root(self):
         self.root = tk.Tk()
@@ -99,6 +140,20 @@ class QuickAddWidget:
         self.root.configure(bg=BG)
         self.root.attributes("-topmost", True)
 
+        # Matching runs on a worker; results are marshalled back via after()
+        self.scheduler = SearchScheduler(
+            self.run_search,
+            self.render_list,
+            lambda fn: self.root.after(0, fn),
+            settle=self.settle_search,
+        )
+        self.card_scheduler = SearchScheduler(
+            self.search_cards,
+            self.render_cards,
+            lambda fn: self.root.after(0, fn),
+            settle=self.settle_cards,
+        )
+
         # Center
         sw, sh = self.root.winfo_screenwidth(), self.root.winfo_screenheight()
         self.root.geometry(f"550x450+{int((sw/2)-275)}+{int((sh/2)-225)}")
@@ -133,27 +188,47 @@ class QuickAddWidget:
         self.root.protocol("WM_DELETE_WINDOW", self.close)
 
     def load_db(self):
-        if os.path.exists(DB_FILE):
-            mtime = os.path.getmtime(DB_FILE)
-            if mtime == self.last_mtime and self.db_data:
-                return
-
-            try:
-                with open(DB_FILE, "r") as f:
-                    self.db_data = json.load(f)
-                # Pre-compute search strings for performance
-                for item in self.db_data:
-                    item["_search_str"] = (
-                        f"{item['command']} {item['description']} {item.get('software','')} "
-                        f"{' '.join(item.get('tags',[]))}"
-                    ).lower()
-                self.last_mtime = mtime
-            except Exception:
-                self.db_data = []
-        else:
-            self.db_data = []
+        """Sync with the store. Returns True if the records changed since the last call."""
+        # With the watcher running, reloads already happened off this thread
+        if not self.store.watching:
+            self.store.refresh()
+        elif not self.store.loaded:
+            # First snapshot still being built; on_store_changed() follows
+            return False
+        self.db_data = self.store.records
+        if self.store.version == self._version:
+            return False
+        self._version = self.store.version
+        # Build the substring index once; adds keep it up to date incrementally
+        self.store.ensure_index()
+        return True
+
+    def on_store_changed(self):
+        # Tk thread, after the watcher swapped in a new snapshot: rebuild the
+        # derived views now so the next popup has nothing left to do
+        if not self.load_db():
+            return
+        self.update_software_list()
+        self.refresh_cards(immediate=True)
+        if self.root.state() != "withdrawn":
+            self.update_list(immediate=True)
+
+    def label(self, item):
+        # Keyed by identity; the stored item guards against a recycled id().
+        # Built lazily for rendered rows only, so a reload costs nothing here
+        hit = self.labels.get(id(item))
+        if hit is None or hit[0] is not item:
+            if len(self.labels) >= LABEL_CACHE:
+                # Mostly records replaced by edits and reloads; drop them all
+                self.labels.clear()
+            text = f"[{item.get('software','Gen')}] {item['description']}"
+            hit = self.labels[id(item)] = (item, text)
+        return hit[1]
+
+    def show(self, started=None):
+        """Pop up; `started` is the `perf_counter()` taken when the hotkey fired."""
+        self.trace.begin(started)
 
-    def show(self):
         # Workaround: 'suppress=True' is unreliable for Ctrl+Alt+A on some systems.
         # We manually clean up the typed character.
 
@@ -164,22 +239,35 @@ class QuickAddWidget:
             except Exception:
                 pass
 
-        # 2. Brief delay and backspace
-        time.sleep(0.05)
-        keyboard.send("backspace")
-
-        self.load_db()
+        # 2. Brief delay and backspace, without blocking the event loop
+        self.root.after(CLEANUP_DELAY_MS, self.reveal)
 
-        # Refresh lists
-        self.update_list()
-        self.update_software_list()
-        self.refresh_cards()
+    def reveal(self):
+        # The backspace must reach the previous window before we take focus
+        keyboard.send("backspace")
 
+        # 3. Appear first, with the last results still on screen
         self.root.deiconify()
         self.root.lift()
         self.root.attributes("-topmost", True)
         self.entry_search.focus_set()
         self.entry_search.selection_range(0, tk.END)
+        self.root.update_idletasks()
+        self.trace.mark("visible")
+
+        # 4. Populate on the next turn of the loop
+        self.root.after(0, self.populate)
+
+    def populate(self):
+        changed = self.load_db()
+        self.trace.mark("loaded")
+
+        # Refresh lists; cards and filters only when the data moved
+        self._awaiting_paint = True
+        self.update_list(immediate=True)
+        if changed:
+            self.update_software_list()
+            self.refresh_cards(immediate=True)
 
     def setup_cards(self):
         # Filter Frame
@@ -199,97 +287,84 @@ class QuickAddWidget:
             f_top, textvariable=self.card_search_var, bg=IN_BG, fg=IN_FG, relief="solid", bd=1
         ).pack(side="left", fill="x", expand=True, ipady=3)
 
-        # Scrollable Canvas
-        self.canvas = tk.Canvas(self.tab_cards, bg=BG, highlightthickness=0)
-        self.scrollbar = ttk.Scrollbar(self.tab_cards, orient="vertical", command=self.canvas.yview)
-        self.card_frame = tk.Frame(self.canvas, bg=BG)
-
-        self.card_frame.bind(
-            "<Configure>", lambda e: self.canvas.configure(scrollregion=self.canvas.bbox("all"))
+        # Virtualized grid: only cards in view have widgets
+        self.cards = CardGrid(
+            self.tab_cards,
+            self.build_card,
+            self.fill_card,
+            BG,
+            ACCENT,
+            ("Segoe UI", 10, "bold"),
+            on_end=self.more_cards,
         )
-
-        # Window inside canvas
-        self.canvas_window = self.canvas.create_window((0, 0), window=self.card_frame, anchor="nw")
-
-        # Resize frame to match canvas width
-        def on_canvas_configure(event):
-            self.canvas.itemconfig(self.canvas_window, width=event.width)
-
-        self.canvas.bind("<Configure>", on_canvas_configure)
-
-        self.canvas.configure(yscrollcommand=self.scrollbar.set)
-
-        self.canvas.pack(side="left", fill="both", expand=True)
-        self.scrollbar.pack(side="right", fill="y")
+        self.canvas = self.cards.canvas
+        self.cards.pack()
 
         # Mousewheel
         self.canvas.bind_all("<MouseWheel>", self._on_mousewheel)
 
         # Initial Population
         self.update_software_list()
-        self.refresh_cards()
+        self.refresh_cards(immediate=True)
 
     def update_software_list(self):
-        softwares = sorted(list({i.get("software", "General") for i in self.db_data}))
-        self.c_card_soft["values"] = ["All Software"] + softwares
+        self.c_card_soft["values"] = ["All Software"] + self.store.values("software")
         self.c_card_soft.current(0)
 
     def _on_mousewheel(self, event):
         if self.notebook.select() == str(self.tab_cards):
             self.canvas.yview_scroll(int(-1 * (event.delta / 120)), "units")
 
-    def refresh_cards(self, *args):
-        for w in self.card_frame.winfo_children():
-            w.destroy()
-
-        query = self.card_search_var.get().lower()
-        selected_soft = self.card_soft_var.get()
-
-        # Filter
-        filtered = []
-        for i in self.db_data:
-            # Software Filter
-            item_soft = i.get("software", "General")
-            if selected_soft != "All Software" and item_soft != selected_soft:
-                continue
-
-            # Text Filter
-            if query in (f"{i['command']} {i['description']} {item_soft}").lower():
-                filtered.append(i)
-
-        # Limit results for performance if showing "All"
-        if selected_soft == "All Software" and len(filtered) > 50 and not query:
-            tk.Label(
-                self.card_frame,
-                text=(
-                    f"Showing first 50 of {len(filtered)} items. "
-                    "Select a software or search to see more."
-                ),
-                bg=BG,
-                fg="#888",
-            ).pack(pady=10)
-            filtered = filtered[:50]
+    def refresh_cards(self, *args, immediate=False):
+        # A new query or filter starts over from the first page
+        self.card_limit = CARD_PAGE
+        self.submit_cards(immediate)
+
+    def more_cards(self):
+        # The grid reached its last row: rank one page further
+        if self.card_more:
+            self.card_more = False
+            self.card_limit += CARD_PAGE
+            self.submit_cards(immediate=True)
+
+    def submit_cards(self, immediate=False):
+        job = (self.card_search_var.get().lower(), self.card_soft_var.get(), self.card_limit)
+        self.card_scheduler.submit(job, immediate=immediate)
+
+    @staticmethod
+    def card_filters(selected_soft):
+        # Software Filter (a posting list lookup, see `facets.py`)
+        return None if selected_soft == "All Software" else {"software": selected_soft}
+
+    def search_cards(self, job, cancelled):
+        # Worker thread, like `run_search`: verbatim hits per keystroke
+        query, selected_soft, limit = job
+        filters = self.card_filters(selected_soft)
+        return self.store.rank(query, limit, cancelled, filters, fuzzy=False)
+
+    def settle_cards(self, job, results, cancelled):
+        query, selected_soft, limit = job
+        if len(results) >= limit or not query.strip():
+            return None
+        return self.store.rank(query, limit, cancelled, self.card_filters(selected_soft))
+
+    def render_cards(self, job, results):
+        query, _, limit = job
+        self.card_more = len(results) >= limit
 
         # Group
         grouped = {}
-        for item in filtered:
+        for _, item in results:
             soft = item.get("software", "General")
             if soft not in grouped:
                 grouped[soft] = []
             grouped[soft].append(item)
 
-        for soft in sorted(grouped.keys()):
-            tk.Label(
-                self.card_frame, text=soft, bg=BG, fg=ACCENT, font=("Segoe UI", 10, "bold")
-            ).pack(fill="x", padx=10, pady=(10, 5), anchor="w")
-
-            grid = tk.Frame(self.card_frame, bg=BG)
-            grid.pack(fill="x", padx=5)
-            grid.grid_columnconfigure(0, weight=1)
-            grid.grid_columnconfigure(1, weight=1)
-
-            for idx, item in enumerate(grouped[soft]):
-                self.create_card(grid, item, idx // 2, idx % 2)
+        # Ranked results keep the group of the best hit first
+        order = grouped if query.strip() else sorted(grouped.keys())
+        # Later pages extend what is on screen instead of jumping to the top
+        groups = [(soft, grouped[soft]) for soft in order]
+        self.cards.set_groups(groups, keep_view=limit > CARD_PAGE)
 
     def copy_and_show_feedback(self, text, widget):
         pyperclip.copy(text)
@@ -325,68 +400,30 @@ class QuickAddWidget:
         # Auto close after 1 second
         self.root.after(1000, top.destroy)
 
-    def create_card(self, parent, item, row, col):
+    def build_card(self, parent):
         card = tk.Frame(
             parent, bg="#1E1E1E", padx=8, pady=8, highlightbackground="#333", highlightthickness=1
         )
-        card.grid(row=row, column=col, sticky="ew", padx=5, pady=5)
 
         # Header
-        icon = utils.get_icon(item.get("software", ""))
-        tk.Label(
-            card,
-            text=f"{icon} {item['description']}",
-            bg="#1E1E1E",
-            fg="white",
-            font=("Segoe UI", 9, "bold"),
-            anchor="w",
-        ).pack(fill="x")
+        card.lbl_title = tk.Label(
+            card, bg="#1E1E1E", fg="white", font=("Segoe UI", 9, "bold"), anchor="w"
+        )
+        card.lbl_title.pack(fill="x")
 
         # Category
-        tk.Label(
-            card,
-            text=f"Type: {item['category']}",
-            bg="#1E1E1E",
-            fg="#666",
-            font=("Segoe UI", 7),
-            anchor="w",
-        ).pack(fill="x")
+        card.lbl_type = tk.Label(card, bg="#1E1E1E", fg="#666", font=("Segoe UI", 7), anchor="w")
+        card.lbl_type.pack(fill="x")
 
         # Command
-        cmd = item["command"]
-        if len(cmd) > 25:
-            cmd = cmd[:22] + "..."
-        tk.Label(card, text=cmd, bg="#1E1E1E", fg="#888", font=("Consolas", 8), anchor="w").pack(
-            fill="x", pady=5
-        )
+        card.lbl_cmd = tk.Label(card, bg="#1E1E1E", fg="#888", font=("Consolas", 8), anchor="w")
+        card.lbl_cmd.pack(fill="x", pady=5)
 
         # Buttons
         btns = tk.Frame(card, bg="#1E1E1E")
         btns.pack(fill="x")
 
-        cat = item["category"]
-        if cat == "Hotkey":
-            tk.Button(
-                btns,
-                text="⌨️ Keys",
-                bg="#00d2ff",
-                fg="black",
-                font=("Segoe UI", 8),
-                relief="flat",
-                command=lambda i=item: self.execute_item(i),
-            ).pack(side="left", fill="x", expand=True, padx=(0, 2))
-        elif cat in ["CMD", "Run Panel", "PowerShell", "Workflow"]:
-            tk.Button(
-                btns,
-                text="🚀 Run",
-                bg=ACCENT,
-                fg="black",
-                font=("Segoe UI", 8),
-                relief="flat",
-                command=lambda i=item: self.execute_item(i),
-            ).pack(side="left", fill="x", expand=True, padx=(0, 2))
-
-        btn_copy = tk.Button(
+        card.btn_copy = tk.Button(
             btns,
             text="📋",
             bg="#333",
@@ -395,10 +432,35 @@ class QuickAddWidget:
             relief="flat",
             width=3,
         )
-        btn_copy.configure(
-            command=lambda i=item, b=btn_copy: self.copy_and_show_feedback(i["command"], b)
+        card.btn_copy.pack(side="right")
+        card.btn_run = tk.Button(btns, fg="black", font=("Segoe UI", 8), relief="flat")
+        return card
+
+    def fill_card(self, card, item):
+        # Cards are recycled while scrolling: overwrite everything
+        icon = utils.get_icon(item.get("software", ""))
+        card.lbl_title.config(text=f"{icon} {item['description']}")
+        card.lbl_type.config(text=f"Type: {item['category']}")
+
+        cmd = item["command"]
+        if len(cmd) > 25:
+            cmd = cmd[:22] + "..."
+        card.lbl_cmd.config(text=cmd)
+
+        cat = item["category"]
+        if cat == "Hotkey":
+            card.btn_run.config(text="⌨️ Keys", bg="#00d2ff")
+        elif cat in ["CMD", "Run Panel", "PowerShell", "Workflow"]:
+            card.btn_run.config(text="🚀 Run", bg=ACCENT)
+        if cat == "Hotkey" or cat in ["CMD", "Run Panel", "PowerShell", "Workflow"]:
+            card.btn_run.config(command=lambda i=item: self.execute_item(i))
+            card.btn_run.pack(side="left", fill="x", expand=True, padx=(0, 2))
+        else:
+            card.btn_run.pack_forget()
+
+        card.btn_copy.configure(
+            command=lambda i=item, b=card.btn_copy: self.copy_and_show_feedback(i["command"], b)
         )
-        btn_copy.pack(side="right")
 
     def setup_add(self):
         f = tk.Frame(self.tab_add, bg=BG, padx=15, pady=15)
@@ -481,25 +543,35 @@ class QuickAddWidget:
             command=self.run_action,
         )
 
-    def update_list(self, *a):
-        q = self.s_var.get().lower()
-        self.list.delete(0, tk.END)
-        self.filtered = []
+    def update_list(self, *a, immediate=False):
+        # Debounced; stale queries are cancelled by the scheduler
+        self.scheduler.submit(self.s_var.get().lower(), immediate=immediate)
 
-        count = 0
-        MAX_RESULTS = 50
+    def run_search(self, q, cancelled):
+        # Verbatim hits only: fuzzy tiers scan everything, so they wait for a pause
+        return self.store.rank(q, MAX_RESULTS, cancelled, fuzzy=False)
 
-        for i in self.db_data:
-            # Use pre-computed search string
-            if q in i.get("_search_str", ""):
-                self.filtered.append(i)
-                self.list.insert(tk.END, f"[{i.get('software','Gen')}] {i['description']}")
-                count += 1
-                if count >= MAX_RESULTS:
-                    break
+    def settle_search(self, q, results, cancelled):
+        if len(results) >= MAX_RESULTS or not q.strip():
+            return None
+        return self.store.rank(q, MAX_RESULTS, cancelled)
 
-        if count >= MAX_RESULTS:
-            self.list.insert(tk.END, "... (Keep typing to refine search)")
+    def render_list(self, q, results):
+        self.filtered = [i for _, i in results]
+        rows = [self.label(i) for i in self.filtered]
+
+        if len(results) >= MAX_RESULTS:
+            rows.append("... (Keep typing to refine search)")
+
+        # Patch only the rows that changed since the last keystroke
+        result_list.sync(self.list, self.rows, rows)
+        self.rows = rows
+
+        if self._awaiting_paint:
+            self._awaiting_paint = False
+            self.list.update_idletasks()
+            self.trace.mark("first paint")
+            self.trace.finish()
 
     def show_details(self, e):
         sel = self.list.curselection()
@@ -538,6 +610,8 @@ class QuickAddWidget:
                 r = tk.Tk()
                 r.withdraw()
                 r.attributes("-topmost", True)
+                from tkinter import simpledialog
+
                 arg = simpledialog.askstring("Input", f"Command: {cmd}\nEnter argument:")
                 r.destroy()
                 if arg is None:
@@ -585,20 +659,9 @@ class QuickAddWidget:
         self.root.withdraw()
 
     def append_db(self, entry):
-        if not os.path.exists(BACKUP_DIR):
-            os.makedirs(BACKUP_DIR)
-        shutil.copy(
-            DB_FILE,
-            os.path.join(
-                BACKUP_DIR, f"backup_quick_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-            ),
-        )
         try:
-            with open(DB_FILE, "r") as f:
-                d = json.load(f)
-            d.append(entry)
-            with open(DB_FILE, "w") as f:
-                json.dump(d, f, indent=4)
+            self.store.add(entry)
+            self.load_db()
         except Exception as e:
             messagebox.showerror("Error", str(e))
 
@@ -613,19 +676,44 @@ def listen():
     print(f"  [2] Visual DB: {HOTKEY_VISUAL}")
     print(f"  [3] Harvester: {HOTKEY_HARVEST}")
 
-    # Helper to launch scripts using the current python executable
+    instance = claim_instance()
+    if instance is None:
+        sys.exit()
+
+    # One warm Streamlit server per script, reused by later presses
+    src_dir = os.path.dirname(os.path.abspath(__file__))
+    tools = tool_server.ToolServers(src_dir).start_reaper()
+    atexit.register(tools.stop)
+    ready = set()
+
     def launch(script):
-        path = os.path.join(os.path.dirname(os.path.abspath(__file__)), script)
-        if os.path.exists(path):
-            subprocess.Popen([sys.executable, "-m", "streamlit", "run", path])
+        if not os.path.exists(os.path.join(src_dir, script)):
+            return
+        if script not in ready:
+            if not check_deps(TOOL_DEPS.get(script, []), parent=widget.root):
+                return
+            ready.add(script)
+        tools.open(script)
 
     widget = QuickAddWidget()
     widget.initialize_root()
+    widget.store.start_compactor()
+    # The single-instance socket also relays change notifications between tools
+    change_feed.Hub(instance).start()
+    # Let the CLI and dashboard query this warm store instead of parsing the file
+    query_api.serve(widget.store)
+    # Reload in the background whenever another tool writes the database
+    widget.store.watch(lambda: widget.root.after(0, widget.on_store_changed))
 
     # Use suppress=False and manual cleanup since suppress=True is flaky
-    keyboard.add_hotkey(HOTKEY_ADD, lambda: widget.root.after(0, widget.show), suppress=False)
-    keyboard.add_hotkey(HOTKEY_VISUAL, lambda: launch("visual_db.py"))
-    keyboard.add_hotkey(HOTKEY_HARVEST, lambda: launch("importer.py"))
+    keyboard.add_hotkey(
+        HOTKEY_ADD,
+        lambda: widget.root.after(0, widget.show, time.perf_counter()),
+        suppress=False,
+    )
+    # Launch from the Tk thread, which may have to ask about missing libraries
+    keyboard.add_hotkey(HOTKEY_VISUAL, lambda: widget.root.after(0, launch, "visual_db.py"))
+    keyboard.add_hotkey(HOTKEY_HARVEST, lambda: widget.root.after(0, launch, "importer.py"))
 
     # Run Tkinter mainloop instead of keyboard.wait()
     widget.root.mainloop()
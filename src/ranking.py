@@ -0,0 +1,461 @@
+"""Shared ranking engine for every search surface.
+
+Queries are split into whitespace tokens. Every token must match at least
+one field of a record, either as a substring or as a fuzzy subsequence
+("gco" -> "git checkout"). Each token scores its best field, scaled by the
+field weight, with bonuses for prefix, word-start and consecutive hits.
+Only the best `limit` results are kept, in a bounded heap.
+
+When the strict pass finds fewer results than asked for, a second pass
+tolerates one typo per token (one query character may be skipped). Those
+fuzzy passes scan far more records than the verbatim one, so interactive
+callers can leave them out per keystroke (`fuzzy=False`) and ask for them
+once typing pauses (see `scheduler.py`).
+
+Typing usually extends the previous query, and an extended query can only
+match records that the shorter one could. `Refiner` remembers the candidate
+positions of recent queries so the next keystroke scans those instead of
+the whole database.
+"""
+
+import heapq
+import re
+import threading
+from array import array
+from collections import Counter, OrderedDict
+from itertools import islice, repeat
+
+LIMIT = 50
+
+# The verbatim tier fully scores at most this many hits per result asked
+# for, picked by a cheap pre-score (see `rank`)
+POOL_FACTOR = 4
+
+# Fuzzy pools larger than this are trimmed before full scoring
+POOL_CAP = 5000
+
+# Candidates checked per step of the verbatim scan (see `_verbatim`), and
+# how many hits it collects at most before trimming them
+SCAN_STEP = 4096
+SCAN_LIMIT = 5000
+
+FIELD_WEIGHTS = (("command", 4.0), ("description", 3.0), ("tags", 2.0), ("software", 1.0))
+
+CONTIGUOUS_BONUS = 16.0
+PREFIX_BONUS = 8.0
+WORD_BONUS = 4.0
+CONSECUTIVE_BONUS = 2.0
+ABBREVIATION_BONUS = 4.0
+GAP_PENALTY = 0.25
+LENGTH_PENALTY = 0.02
+TYPO_PENALTY = 0.5
+
+# How many candidates to score between `cancelled()` checks
+CANCEL_EVERY = 1024
+
+# Recent queries whose candidate positions `Refiner` keeps
+REFINE_SLOTS = 32
+
+_WORD_START = re.compile(r"(?:^|[^0-9a-z])([0-9a-z])")
+
+
+class Cancelled(Exception):
+    """Raised by `rank` when its `cancelled()` callback reports a newer query."""
+
+
+def tokenize(query):
+    return query.lower().split()
+
+
+def _text(value):
+    if isinstance(value, str):
+        return value.lower()
+    if isinstance(value, (list, tuple)):
+        return " ".join(map(str, value)).lower()
+    return str(value or "").lower()
+
+
+def field_texts(item):
+    """Lowercased `(weight, text)` pairs in field-weight order."""
+    get = item.get
+    return [(weight, _text(get(field))) for field, weight in FIELD_WEIGHTS]
+
+
+def _subsequence(token, text, prefer_words):
+    """Positions of `token`'s chars in `text`, or None. Optionally jumps to word starts."""
+    starts = None
+    positions, last = [], -1
+    for ch in token:
+        pos = text.find(ch, last + 1)
+        if pos < 0:
+            return None
+        if prefer_words and pos and text[pos - 1].isalnum():
+            if starts is None:
+                starts = [m.start(1) for m in _WORD_START.finditer(text)]
+            nxt = next((p for p in starts if p > last and text[p] == ch), None)
+            if nxt is not None:
+                pos = nxt
+        positions.append(pos)
+        last = pos
+    return positions
+
+
+def _abbreviates(positions, text):
+    """True if some word holds 2+ of `positions` spread over at least half of it.
+
+    Abbreviations pick letters across a word ("cfg" -> config, the "co" of
+    "gco" -> git checkout) where a plain prefix takes the first few.
+    """
+    words = {}
+    for pos in positions:
+        if text[pos].isalnum():
+            start = pos
+            while start and text[start - 1].isalnum():
+                start -= 1
+            words.setdefault(start, []).append(pos)
+    for start, hits in words.items():
+        if len(hits) < 2:
+            continue
+        end = hits[-1] + 1
+        while end < len(text) and text[end].isalnum():
+            end += 1
+        if 2 * (hits[-1] - hits[0] + 1) >= end - start:
+            return True
+    return False
+
+
+def score_token(token, text, typos=0):
+    """Score one query token against one field text; 0 means no match."""
+    if not token or not text:
+        return 0.0
+    pos = text.find(token)
+    if pos >= 0:
+        score = CONTIGUOUS_BONUS + 2.0 * len(token)
+        if pos == 0:
+            score += PREFIX_BONUS
+        elif not text[pos - 1].isalnum():
+            score += WORD_BONUS
+        return score - LENGTH_PENALTY * len(text)
+    if len(token) == 1:
+        return 0.0
+
+    positions = _subsequence(token, text, False)
+    if positions is not None:
+        positions = _subsequence(token, text, True) or positions
+    penalty = 0.0
+    if positions is None and typos and len(token) > 3:
+        # Skip the first character that cannot be placed and retry
+        last, kept = -1, []
+        for i, ch in enumerate(token):
+            pos = text.find(ch, last + 1)
+            if pos < 0:
+                kept = token[:i] + token[i + 1 :]
+                break
+            last = pos
+        if kept:
+            positions = _subsequence(kept, text, False)
+            if positions is not None:
+                positions = _subsequence(kept, text, True) or positions
+            penalty = TYPO_PENALTY
+    if positions is None:
+        return 0.0
+
+    score = 1.0
+    for i, pos in enumerate(positions):
+        if pos == 0 or not text[pos - 1].isalnum():
+            score += WORD_BONUS
+        if i and pos == positions[i - 1] + 1:
+            score += CONSECUTIVE_BONUS
+        elif i:
+            score -= GAP_PENALTY * (pos - positions[i - 1] - 1)
+    if positions[0] == 0:
+        score += PREFIX_BONUS / 2
+    if _abbreviates(positions, text):
+        score += ABBREVIATION_BONUS
+    score = max(score, 0.5) - LENGTH_PENALTY * len(text)
+    return max(score, 0.1) * (1.0 - penalty)
+
+
+def score_item(tokens, item, typos=0, fields=None):
+    """Total score of `item` for `tokens`; 0 if any token matches no field."""
+    fields = fields if fields is not None else field_texts(item)
+    total = 0.0
+    for token in tokens:
+        best = 0.0
+        for weight, text in fields:
+            s = score_token(token, text, typos)
+            if s:
+                best = max(best, weight * s)
+        if not best:
+            return 0.0
+        total += best
+    return total
+
+
+def _prefilter(tokens, typos):
+    """Cheap regex check on the combined search string before full scoring.
+
+    Each token must be a subsequence of the string (with one character
+    dropped in the typo pass); `[^c]*c` chains keep the match linear instead
+    of backtracking like `.*?` would.
+    """
+
+    def chain(token):
+        return "".join(f"[^{re.escape(ch)}]*{re.escape(ch)}" for ch in token)
+
+    parts = []
+    for token in tokens:
+        variants = [token]
+        if typos and len(token) > 3:
+            variants += [token[:i] + token[i + 1 :] for i in range(len(token))]
+        parts.append("(?=" + "|".join(chain(v) for v in variants) + ")")
+    return re.compile("".join(parts), re.S).match
+
+
+def _span_key(tokens):
+    """Cheap tightness estimate: total length of each token's leftmost subsequence."""
+    chains = [
+        re.compile(
+            "".join(f"{re.escape(ch)}[^{re.escape(n)}]*" for ch, n in zip(t, t[1:]))
+            + re.escape(t[-1]),
+            re.S,
+        )
+        for t in tokens
+    ]
+
+    def key(text):
+        total = 0
+        for chain in chains:
+            m = chain.search(text)
+            total += (m.end() - m.start()) if m else len(text)
+        return total
+
+    return key
+
+
+def _lenient(tokens):
+    """Match for every record that `tokens`, or any extension of them, could rank.
+
+    Each token minus one character must be a subsequence of the string.
+    That admits all three tiers of `rank`, and whatever passes for an
+    extended query also passes for the shorter one. Returns None when every
+    token is a single character (everything passes).
+    """
+    parts = []
+    for token in tokens:
+        if len(token) < 2:
+            continue
+        variants = dict.fromkeys(token[:i] + token[i + 1 :] for i in range(len(token)))
+        chains = ("".join(f"[^{re.escape(ch)}]*{re.escape(ch)}" for ch in v) for v in variants)
+        parts.append("(?=" + "|".join(chains) + ")")
+    return re.compile("".join(parts), re.S).match if parts else None
+
+
+class Refiner:
+    """Bounded LRU of recent queries and the positions they could match.
+
+    A query that extends a remembered one ("git" -> "git s") is filtered
+    from that query's positions; anything else (backspace, an edit in the
+    middle) starts from a full scan. `stamp` identifies the state of
+    `texts`: when it changes, every remembered set is dropped.
+    """
+
+    def __init__(self, slots=REFINE_SLOTS):
+        self.slots = slots
+        self.sets = OrderedDict()
+        self.stamp = None
+        # Quick Add searches from its worker and from the query API at once
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(query):
+        key = " ".join(tokenize(query))
+        return key + " " if key and query[-1:].isspace() else key
+
+    def candidates(self, query, texts, stamp=None):
+        """Sorted positions in `texts` that may match `query`, or None for all."""
+        with self._lock:
+            return self._candidates(query, texts, stamp)
+
+    def _candidates(self, query, texts, stamp):
+        if stamp != self.stamp:
+            self.sets.clear()
+            self.stamp = stamp
+        key = self._key(query)
+        if key in self.sets:
+            self.sets.move_to_end(key)
+            return self.sets[key]
+        check = _lenient(key.split())
+        if check is None:
+            return None
+        base = max((k for k in self.sets if key.startswith(k)), key=len, default=None)
+        pool = self.sets[base] if base is not None else None
+        if pool is None:
+            pool = range(len(texts))
+        found = array("I", [i for i in pool if check(texts[i])])
+        self.sets[key] = found
+        if len(self.sets) > self.slots:
+            self.sets.popitem(last=False)
+        return found
+
+
+def _placement(text, tokens):
+    """Cheap pre-score: where each token first starts a word, summed (lower is better).
+
+    A token found only inside words counts as lying past the end of the
+    text. Full scoring favours the same things: the command comes first in
+    the search string and word starts earn a bonus.
+    """
+    total = 0
+    for token in tokens:
+        pos = first = text.find(token)
+        while pos > 0 and text[pos - 1].isalnum():
+            pos = text.find(token, pos + 1)
+        total += pos if pos >= 0 else len(text) + first
+    return total
+
+
+def _earliest(candidates, texts, tokens, cap):
+    """The `cap` candidates with the lowest `_placement`, ties in candidate order.
+
+    Same picks as a stable `heapq.nsmallest(cap, candidates, key=...)`, but
+    the keys are counted instead of heap-sorted.
+    """
+    at = [_placement(texts[i], tokens) for i in candidates]
+    counts = Counter(at)
+    room = cap
+    for cut in sorted(counts):
+        if counts[cut] >= room:
+            break
+        room -= counts[cut]
+    kept = [i for i, pos in zip(candidates, at) if pos < cut]
+    kept += islice((i for i, pos in zip(candidates, at) if pos == cut), room)
+    return kept
+
+
+def pool_cap(limit):
+    """How many verbatim hits `rank` fully scores to find the best `limit`."""
+    return limit * POOL_FACTOR
+
+
+def _verbatim(tokens, pool, texts, cap):
+    """Positions in `pool` whose text holds every token, trimmed to `cap` by `_earliest`.
+
+    The scan stops after `SCAN_LIMIT` hits (a token that common, like "g",
+    is refined by the next keystroke anyway), or for a single token once
+    `cap` hits start with it, since no later hit could displace those.
+    """
+    lead = max(tokens, key=len)
+    rest = list(tokens)
+    rest.remove(lead)
+    hits, prefixed = [], 0
+    for start in range(0, len(pool), SCAN_STEP):
+        step = pool[start : start + SCAN_STEP]
+        found = [i for i in step if lead in texts[i]]
+        for token in rest:
+            found = [i for i in found if token in texts[i]]
+        hits += found
+        if cap:
+            if not rest:
+                prefixed += sum(map(str.startswith, map(texts.__getitem__, found), repeat(lead)))
+            if prefixed >= cap or len(hits) >= SCAN_LIMIT:
+                break
+    if cap and len(hits) > cap:
+        hits = _earliest(hits, texts, tokens, cap)
+    return hits
+
+
+def rank(
+    query,
+    items,
+    limit=LIMIT,
+    texts=None,
+    keys=None,
+    narrow=None,
+    cancelled=None,
+    scope=None,
+    fuzzy=True,
+):
+    """Best-first `[(key, item)]` for the records in `items`.
+
+    `texts` may hold each record's precomputed lowercase search string so
+    hopeless records are skipped before any Python scoring, and
+    `narrow(token)` may return candidate positions for a token (e.g. from a
+    trigram index), or None. `scope()` may return the sorted positions that
+    can match at all (see `Refiner`), or None; it is only called when a scan
+    is needed. `keys` defaults to list positions. An empty query keeps the
+    original order. If `cancelled()` turns true mid-way, `Cancelled` is
+    raised.
+
+    Records where every token appears verbatim are ranked first; fuzzy and
+    then typo-tolerant matches only fill the remaining slots (with no limit,
+    only when nothing matched verbatim), so common queries never pay for
+    subsequence scoring. Only `pool_cap(limit)` verbatim hits are fully
+    scored: those where the tokens start words earliest in the search
+    string (see `_placement`). `fuzzy=False` returns the verbatim tier alone.
+    """
+    keys = keys if keys is not None else range(len(items))
+    tokens = tokenize(query)
+    if not tokens:
+        pairs = zip(keys, items)
+        return [next(pairs) for _ in range(min(limit, len(items)))] if limit else list(pairs)
+    if texts is None:
+        texts = [" ".join(t for _, t in field_texts(item)) for item in items]
+
+    scanned = []
+
+    def everything():
+        # Positions a scan has to visit; `scope()` runs at most once
+        if not scanned:
+            found = scope() if scope is not None else None
+            scanned.append(range(len(texts)) if found is None else found)
+        return scanned[0]
+
+    # Tier 1: every token appears verbatim
+    pool = None
+    if narrow is not None:
+        for token in tokens:
+            found = narrow(token)
+            if found is not None and (pool is None or len(found) < len(pool)):
+                pool = found
+    if pool is None:
+        # An index only gives up on 1- and 2-character tokens, which no
+        # scope narrows either; a plain scan is cheaper than building one
+        pool = everything() if narrow is None else range(len(texts))
+    exact = _verbatim(tokens, pool, texts, limit and pool_cap(limit))
+    results = _top(tokens, items, exact, limit, 0, cancelled)
+
+    # Tier 2 and 3: fuzzy subsequences, then one typo per token
+    for typos in (0, 1) if fuzzy else ():
+        if limit and len(results) >= limit or not limit and results:
+            break
+        if cancelled is not None and cancelled():
+            raise Cancelled
+        taken = {order for _, order in results}
+        check = _prefilter(tokens, typos)
+        loose = [i for i in everything() if i not in taken and check(texts[i])]
+        if limit and len(loose) > POOL_CAP:
+            tight = _span_key(tokens)
+            loose = heapq.nsmallest(POOL_CAP, loose, key=lambda i: tight(texts[i]))
+        more = _top(tokens, items, loose, limit and limit - len(results), typos, cancelled)
+        results += more
+    return [(keys[order], items[order]) for _, order in results]
+
+
+def _top(tokens, items, candidates, limit, typos, cancelled=None):
+    """Bounded heap of `(score, order)` for the best `limit` candidates."""
+    heap = []
+    for n, order in enumerate(candidates):
+        if cancelled is not None and n % CANCEL_EVERY == 0 and cancelled():
+            raise Cancelled
+        score = score_item(tokens, items[order], typos)
+        if not score:
+            continue
+        # Ties keep the original order: earlier records win
+        entry = (score, -order)
+        if not limit or len(heap) < limit:
+            heapq.heappush(heap, entry)
+        elif entry > heap[0]:
+            heapq.heapreplace(heap, entry)
+    heap.sort(reverse=True)
+    return [(score, -neg) for score, neg in heap]
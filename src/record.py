@@ -0,0 +1,187 @@
+"""Compact in-memory form of one command.
+
+`commands.json` holds plain objects; the stores turn each into a `Record`:
+a `__slots__` class (no per-item dict), with software and category
+interned so repeated values share one string, and tags kept as a tuple of
+interned strings. Keys outside `FIELDS` live in a small `extra` dict.
+
+`Record` is a `MutableMapping`, so code written for the JSON schema
+(`item["command"]`, `item.get("tags", [])`, `dict(item)`, `==` against a
+dict) keeps working; `item["tags"]` hands out a fresh list.
+
+Besides the content `FIELDS` every record carries the store-managed `META`
+keys: a stable `id` that survives edits, reordering and other processes'
+writes, and `rev`, bumped by each update, for conditional writes.
+"""
+
+import gc
+import hashlib
+import secrets
+from collections.abc import MutableMapping
+from contextlib import contextmanager
+from sys import intern
+
+FIELDS = ("command", "software", "description", "category", "tags")
+META = ("id", "rev")
+KEYS = FIELDS + META
+_FIELDS = frozenset(KEYS)
+
+# Ids are integers below 2**53 so they survive a trip through a float column
+# (a pandas DataFrame with added rows). Files from before ids existed number
+# their records 1, 2, ...; new ids are drawn above that range.
+_ID_BITS = 52
+_ID_FLOOR = 1 << 32
+
+
+class _Missing:
+    """Marks a field the source object did not have (distinct from null)."""
+
+    __slots__ = ()
+
+    def __repr__(self):
+        return "MISSING"
+
+    def __reduce__(self):
+        return "MISSING"
+
+
+MISSING = _Missing()
+
+
+def _intern(value):
+    return intern(value) if type(value) is str else value
+
+
+def _tags(value):
+    if type(value) is not list:
+        return value
+    try:
+        return tuple(map(intern, value))
+    except TypeError:
+        return tuple([_intern(t) for t in value])
+
+
+def new_id():
+    """A fresh random record id."""
+    return _ID_FLOOR + secrets.randbelow((1 << _ID_BITS) - _ID_FLOOR)
+
+
+def derived_id(*parts):
+    """An id every process computes alike from `parts` (for records that lack one)."""
+    digest = hashlib.blake2b(repr(parts).encode("utf-8"), digest_size=8).digest()
+    return _ID_FLOOR + int.from_bytes(digest, "big") % ((1 << _ID_BITS) - _ID_FLOOR)
+
+
+def content(item):
+    """`item` without the `META` keys."""
+    return {k: v for k, v in item.items() if k not in META}
+
+
+class Record(MutableMapping):
+    __slots__ = KEYS + ("extra",)
+
+    def __init__(self, item=()):
+        self.command = self.software = self.description = MISSING
+        self.category = self.tags = MISSING
+        self.id = self.rev = MISSING
+        self.extra = None
+        self.update(item)
+
+    @classmethod
+    def from_dict(cls, item):
+        """Build from a JSON object without going through `__setitem__` (the load path)."""
+        rec = cls.__new__(cls)
+        get = item.get
+        rec.command = get("command", MISSING)
+        rec.description = get("description", MISSING)
+        value = get("software", MISSING)
+        rec.software = intern(value) if type(value) is str else value
+        value = get("category", MISSING)
+        rec.category = intern(value) if type(value) is str else value
+        rec.tags = _tags(get("tags", MISSING))
+        rec.id = get("id", MISSING)
+        rec.rev = get("rev", MISSING)
+        rec.extra = None if _FIELDS.issuperset(item) else {
+            k: v for k, v in item.items() if k not in _FIELDS
+        }
+        return rec
+
+    def to_dict(self):
+        return dict(self.items())
+
+    # --- MAPPING ---
+    def __getitem__(self, key):
+        if key in _FIELDS:
+            value = getattr(self, key)
+            if value is MISSING:
+                raise KeyError(key)
+            return list(value) if type(value) is tuple else value
+        if self.extra is not None and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key in ("software", "category"):
+            value = _intern(value)
+        elif key == "tags":
+            value = _tags(value)
+        elif key not in _FIELDS:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+            return
+        setattr(self, key, value)
+
+    def __delitem__(self, key):
+        if key in _FIELDS and getattr(self, key) is not MISSING:
+            setattr(self, key, MISSING)
+        elif self.extra is not None and key in self.extra:
+            del self.extra[key]
+        else:
+            raise KeyError(key)
+
+    def __iter__(self):
+        for key in KEYS:
+            if getattr(self, key) is not MISSING:
+                yield key
+        if self.extra:
+            yield from self.extra
+
+    def __len__(self):
+        return sum(getattr(self, key) is not MISSING for key in KEYS) + len(self.extra or ())
+
+    def __repr__(self):
+        return f"Record({self.to_dict()!r})"
+
+    def copy(self):
+        return Record.from_dict(self.to_dict())
+
+
+@contextmanager
+def gc_paused():
+    """Pause the cyclic GC while bulk-building objects that can't form cycles.
+
+    Parsing and converting hundreds of thousands of records otherwise
+    triggers a collection every few hundred allocations, which roughly
+    doubles the load time.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def from_dicts(items):
+    """`Record`s for a loaded JSON array; anything that is not an object is kept as is."""
+    with gc_paused():
+        return [Record.from_dict(item) if isinstance(item, dict) else item for item in items]
+
+
+def jsonable(obj):
+    """`default=` hook for `json.dump` so records serialise as plain objects."""
+    if isinstance(obj, Record):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
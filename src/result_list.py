@@ -0,0 +1,33 @@
+"""Minimal Listbox updates between consecutive result lists.
+
+Consecutive keystrokes mostly keep, drop or reorder a few rows, so the
+Quick Add result list is patched in place instead of being cleared and
+refilled: one `delete` and/or one `insert` Tcl call per changed block.
+"""
+
+from difflib import SequenceMatcher
+
+
+def edits(old, new):
+    """`(start, stop, rows)` patches turning `old` into `new`, last block first.
+
+    Each patch replaces `old[start:stop]` with `rows`; applying them in the
+    given order keeps earlier indices valid.
+    """
+    if old == new:
+        return []
+    opcodes = SequenceMatcher(None, old, new, autojunk=False).get_opcodes()
+    return [(i1, i2, new[j1:j2]) for tag, i1, i2, j1, j2 in reversed(opcodes) if tag != "equal"]
+
+
+def sync(listbox, old, new):
+    """Patch `listbox` (currently showing `old`) to show `new`. Returns the Tcl call count."""
+    calls = 0
+    for start, stop, rows in edits(old, new):
+        if stop > start:
+            listbox.delete(start, stop - 1)
+            calls += 1
+        if rows:
+            listbox.insert(start, *rows)
+            calls += 1
+    return calls
@@ -0,0 +1,121 @@
+"""Debounced, cancellable background search for the Quick Add widget.
+
+Keystrokes call `submit()` on the Tk thread. A single worker thread waits
+until typing pauses for `delay` seconds, runs the search, and hands the
+result back through `call_soon` (e.g. `root.after(0, ...)`) only if no
+newer query arrived in the meantime. Searches that are overtaken are told
+to stop through their `cancelled()` callback.
+
+An optional `settle` step runs once typing has paused for longer (`pause`
+seconds after the last keystroke): it gets the delivered result and may
+return a fuller one, so expensive work (fuzzy matching) is done once per
+pause instead of once per keystroke.
+"""
+
+import threading
+import time
+from functools import partial
+
+from ranking import Cancelled
+
+DEBOUNCE = 0.06
+PAUSE = 0.25
+
+
+def _raise(error):
+    raise error
+
+
+class SearchScheduler:
+    """`search(query, cancelled)` runs on the worker thread; `deliver(query,
+    result)` runs wherever `call_soon` schedules it (the Tk thread).
+    `settle(query, result, cancelled)` also runs on the worker and returns
+    a result to deliver in place of `result`, or None to keep it."""
+
+    def __init__(self, search, deliver, call_soon, delay=DEBOUNCE, settle=None, pause=PAUSE):
+        self.search = search
+        self.deliver = deliver
+        self.call_soon = call_soon
+        self.delay = delay
+        self.settle = settle
+        self.pause = pause
+        self.generation = 0
+        self._query = None
+        self._due = 0.0
+        self._typed = 0.0
+        # (query, result, generation) waiting for `settle`
+        self._settling = None
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, query, immediate=False):
+        with self._cond:
+            self.generation += 1
+            self._query = query
+            self._typed = time.monotonic()
+            self._due = self._typed + (0 if immediate else self.delay)
+            self._settling = None
+            self._cond.notify()
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+
+    def _next(self):
+        """Wait for the next due `(query, shown result or None, generation)`; None if stopped."""
+        while not self._stopped:
+            now = time.monotonic()
+            if self._query is not None:
+                if now >= self._due:
+                    query, self._query = self._query, None
+                    return query, None, self.generation
+                timeout = self._due - now
+            elif self._settling is not None:
+                due = self._typed + self.pause
+                if now >= due:
+                    job, self._settling = self._settling, None
+                    return job
+                timeout = due - now
+            else:
+                timeout = None
+            self._cond.wait(timeout)
+        return None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                job = self._next()
+            if job is None:
+                return
+            query, shown, gen = job
+
+            def cancelled(gen=gen):
+                return gen != self.generation
+
+            try:
+                if shown is None:
+                    result = self.search(query, cancelled)
+                else:
+                    result = self.settle(query, shown, cancelled)
+            except Cancelled:
+                continue
+            except Exception as error:
+                # A bug, not a race (the stores rank a consistent snapshot):
+                # raise it where the UI reports errors and keep the worker alive
+                self.call_soon(partial(_raise, error))
+                continue
+            if cancelled() or (shown is not None and result is None):
+                continue
+            if shown is None and self.settle is not None:
+                with self._cond:
+                    if gen == self.generation:
+                        self._settling = (query, result, gen)
+            self.call_soon(lambda q=query, r=result, g=gen: self._deliver(q, r, g))
+
+    def _deliver(self, query, result, gen):
+        # Re-check on the UI thread: a keystroke may have landed in between
+        if gen == self.generation:
+            self.deliver(query, result)
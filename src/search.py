@@ -1,14 +1,41 @@
-"""Interactive search and small CLI for editing `commands.json`."""
+"""Interactive search and small CLI for editing `commands.json`.
 
+Without arguments this starts the interactive prompt. `query` prints
+matches for scripts instead, one record at a time and without colours:
+
+    python src/search.py query git push --format tsv --limit 5 --software Git
+
+Exit status is 0 when something matched, 1 when nothing did and 2 for
+usage errors.
+"""
+
+import argparse
 import json
 import os
-import shutil
-from datetime import datetime
+import sys
+import threading
+
+import query_api
+import ranking
+import record
+import store
 
 # --- CONFIGURATION ---
-PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-DB_FILE = os.path.join(PROJECT_ROOT, "data", "commands.json")
-BACKUP_DIR = os.path.join(PROJECT_ROOT, "data", "backups")
+PROJECT_ROOT = store.PROJECT_ROOT
+DB_FILE = store.DB_FILE
+BACKUP_DIR = store.BACKUP_DIR
+
+# Resolved by `get_store()` on first use, so importing this module (the
+# tests, `--help`, a usage error) neither dials the daemon nor opens the file
+STORE = None
+
+
+def get_store():
+    """Talk to the running Quick Add daemon when there is one; parse the file otherwise."""
+    global STORE
+    if STORE is None:
+        STORE = query_api.connect() or store.open_store()
+    return STORE
 
 
 class Style:
@@ -27,34 +54,26 @@ def clear_screen():
 
 
 def load_data():
-    if not os.path.exists(DB_FILE):
-        return []
-    try:
-        with open(DB_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except Exception:
-        return []
+    db = get_store()
+    db.refresh()
+    return db.records
 
 
 def create_backup():
-    if not os.path.exists(DB_FILE):
-        return
-    if not os.path.exists(BACKUP_DIR):
-        os.makedirs(BACKUP_DIR)
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    dest = os.path.join(BACKUP_DIR, f"commands_backup_{timestamp}.json")
     try:
-        shutil.copy(DB_FILE, dest)
-        print(f"{Style.YELLOW}>> Backup created: {os.path.basename(dest)}{Style.RESET}")
+        snap_id = get_store().backup("commands_backup", BACKUP_DIR)
+        if snap_id:
+            print(f"{Style.YELLOW}>> Backup created: {snap_id}{Style.RESET}")
     except Exception as e:
         print(f"{Style.RED}Backup failed: {e}{Style.RESET}")
 
 
-def save_data(data):
-    create_backup()
+def save_data(mutate, backup=True):
+    """Apply `mutate(store)` to the store and report the outcome."""
+    if backup:
+        create_backup()
     try:
-        with open(DB_FILE, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=4)
+        mutate(get_store())
         print(f"\n{Style.GREEN}Database updated successfully.{Style.RESET}")
     except Exception as e:
         print(f"{Style.RED}Error saving file: {e}{Style.RESET}")
@@ -108,9 +127,16 @@ def add_command():
         "category": cat,
         "tags": tags_list,
     }
-    data = load_data()
-    data.append(new_entry)
-    save_data(data)
+    # Appends are journaled and cannot clobber existing data, so skip the full backup
+    save_data(lambda s: s.add(new_entry), backup=False)
+
+
+def delete_record(db, item):
+    """Delete `item` by id, unless another tool changed or removed it since it was listed."""
+    key = db.key_of(item.get("id"))
+    if key is None:
+        raise store.Conflict(f"{item.get('command', '')!r} was already deleted")
+    return db.delete(key, rev=item.get("rev"))
 
 
 def delete_command():
@@ -118,17 +144,9 @@ def delete_command():
     search_query = get_input("Search for command to delete: ")
     if search_query is None:
         return
-    data = load_data()
-    candidates = []
-    for index, item in enumerate(data):
-        software_field = item.get("software", "")
-        tags = item.get("tags", [])
-        searchable = (
-            f"{item.get('command','')} {item.get('description','')} "
-            f"{software_field} {' '.join(tags)}"
-        ).lower()
-        if search_query.lower() in searchable:
-            candidates.append((index, item))
+    db = get_store()
+    db.refresh()
+    candidates = db.rank(search_query)
     if not candidates:
         print(f"{Style.YELLOW}No matches found.{Style.RESET}")
         return
@@ -144,11 +162,9 @@ def delete_command():
     try:
         choice_idx = int(choice) - 1
         if 0 <= choice_idx < len(candidates):
-            real_index = candidates[choice_idx][0]
-            item_to_kill = data[real_index]
+            _, item_to_kill = candidates[choice_idx]
             print(f"Deleting: {item_to_kill.get('command','')}...")
-            del data[real_index]
-            save_data(data)
+            save_data(lambda s: delete_record(s, item_to_kill))
         else:
             print("Invalid selection.")
     except ValueError:
@@ -156,6 +172,13 @@ def delete_command():
 
 
 def search():
+    db = get_store()
+    db.start_compactor()
+    # Parse once in the background while the prompt is shown; queries typed
+    # meanwhile search the records read so far. After this a query only
+    # re-reads the file if its mtime/size changed, and $add/$del are applied
+    # to the snapshot in memory
+    threading.Thread(target=db.stream_load, kwargs={"index": True}, daemon=True).start()
     clear_screen()
     print(f"{Style.HEADER}{Style.BOLD}=== COMMAND CENTER ==={Style.RESET}")
     print(f"{Style.CYAN}Type '$help' for commands, or just type to search.{Style.RESET}\n")
@@ -188,27 +211,127 @@ def search():
             else:
                 print(f"{Style.RED}Unknown command: {query}. Try $help{Style.RESET}")
                 continue
-        data = load_data()
+        db.refresh()
         found = False
         print("")
-        for item in data:
+        for _, item in db.rank(query):
             software_field = item.get("software", "N/A")
             tags = item.get("tags", [])
-            searchable = (
-                f"{item.get('command','')} {item.get('description','')} "
-                f"{software_field} {' '.join(tags)}"
-            ).lower()
-            if query in searchable:
-                found = True
-                print(f"{Style.BOLD}CMD:  {Style.GREEN}{item.get('command','')}{Style.RESET}")
-                print(f"DESC: {item.get('description','')}")
-                print(f"SOFT: {Style.YELLOW}{software_field}{Style.RESET}")
-                print(f"TYPE: {Style.CYAN}[{item.get('category','')}] {Style.RESET}")
-                print(f"TAGS: {', '.join(tags)}")
-                print(f"{Style.BLUE}{'-'*40}{Style.RESET}")
+            found = True
+            print(f"{Style.BOLD}CMD:  {Style.GREEN}{item.get('command','')}{Style.RESET}")
+            print(f"DESC: {item.get('description','')}")
+            print(f"SOFT: {Style.YELLOW}{software_field}{Style.RESET}")
+            print(f"TYPE: {Style.CYAN}[{item.get('category','')}] {Style.RESET}")
+            print(f"TAGS: {', '.join(tags)}")
+            print(f"{Style.BLUE}{'-'*40}{Style.RESET}")
         if not found:
             print(f"{Style.RED}No results found.{Style.RESET}")
 
 
+# --- ONE-SHOT MODE ---
+FORMATS = ("ndjson", "json", "tsv")
+TSV_FIELDS = ("command", "description", "software", "category", "tags")
+
+EXIT_MATCH = 0
+EXIT_NO_MATCH = 1
+EXIT_USAGE = 2
+
+
+def find_matches(text, limit=ranking.LIMIT, filters=None):
+    """Yield matching records best-first; `limit=None` means all of them.
+
+    An empty `text` lists records in file order, a page at a time (see
+    `store.walk`), filtered by the store.
+    """
+    db = get_store()
+    if text.strip():
+        if db.loaded:
+            db.refresh()
+        # Otherwise `rank()` loads, or searches the shared mapped index in place
+        for _, item in db.rank(text, limit, filters=filters):
+            yield item
+        return
+    db.refresh()
+    yield from store.walk(db, filters, limit)
+
+
+def tsv_row(item):
+    cells = []
+    for field in TSV_FIELDS:
+        value = item.get(field, "")
+        if isinstance(value, list):
+            value = ",".join(str(v) for v in value)
+        cells.append(" ".join(str(value).split()))
+    return "\t".join(cells)
+
+
+def to_json(item):
+    return json.dumps(item, ensure_ascii=False, default=record.jsonable)
+
+
+def write_matches(items, fmt, out):
+    """Write each item to `out` as soon as it is produced. Returns the count."""
+    count = 0
+    for item in items:
+        if fmt == "tsv":
+            out.write(tsv_row(item) + "\n")
+        elif fmt == "json":
+            out.write(("[\n" if count == 0 else ",\n") + to_json(item))
+        else:
+            out.write(to_json(item) + "\n")
+        count += 1
+    if fmt == "json":
+        out.write("\n]\n" if count else "[]\n")
+    return count
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="search.py", description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="action", required=True)
+    query = commands.add_parser("query", help="print matches for scripts and pipes")
+    query.add_argument("text", nargs="*", help="search text; omit to list every record")
+    query.add_argument("--format", choices=FORMATS, default="ndjson")
+    query.add_argument(
+        "--limit", type=int, default=ranking.LIMIT, help="maximum matches, 0 for no limit"
+    )
+    query.add_argument("--software", help="only records for this software (any case)")
+    query.add_argument("--category", help="only records in this category (any case)")
+    return parser
+
+
+def run_query(args, out):
+    if args.limit < 0:
+        print("search.py query: --limit must be 0 or more", file=sys.stderr)
+        return EXIT_USAGE
+    filters = {
+        field: value
+        for field, value in (("software", args.software), ("category", args.category))
+        if value is not None
+    }
+    items = find_matches(" ".join(args.text), args.limit or None, filters)
+    return EXIT_MATCH if write_matches(items, args.format, out) else EXIT_NO_MATCH
+
+
+def main(argv=None, out=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        search()
+        return EXIT_MATCH
+    try:
+        args = build_parser().parse_args(argv)
+    except SystemExit as e:
+        return e.code
+    out = out or sys.stdout
+    try:
+        code = run_query(args, out)
+        out.flush()
+    except BrokenPipeError:
+        # The reader (e.g. `head`) has all it wanted; silence the final flush too
+        if out is sys.stdout:
+            os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return EXIT_MATCH
+    return code
+
+
 if __name__ == "__main__":
-    search()
+    sys.exit(main())
@@ -0,0 +1,144 @@
+"""Trigram inverted index used to narrow substring searches.
+
+Every document (a lowercase search string) is split into its distinct
+3-character substrings. A query can only match documents containing all of
+its own trigrams, so the rarest one gives a short candidate list; callers
+still verify each candidate with a plain `in` check, which keeps results
+identical to a linear scan.
+
+One- and two-character queries are looked up through the trigrams that
+contain them, so a rare pair of letters does not fall back to a full scan.
+
+Deleting a document leaves a tombstone instead of renumbering every
+posting list: internal ids stay put and are mapped to current positions
+(later documents shift down by one per earlier tombstone) on the way out.
+"""
+
+from array import array
+from bisect import bisect_left, bisect_right, insort
+
+GRAM = 3
+
+# Above this many postings a short query is common enough that a linear
+# scan reaches the result limit sooner than merging the posting lists.
+SHORT_UNION_LIMIT = 4096
+
+# Past this many tombstones callers should rebuild the index instead
+TOMBSTONE_LIMIT = 4096
+
+
+def trigrams(text):
+    return {text[i : i + GRAM] for i in range(len(text) - GRAM + 1)}
+
+
+class TrigramIndex:
+    def __init__(self, texts=()):
+        self.postings = {}
+        # 1- and 2-char substrings -> trigrams containing them
+        self.by_part = {}
+        # Documents too short to have any trigram
+        self.short_docs = []
+        # Internal ids handed out so far, and the sorted ones since deleted
+        self.size = 0
+        self.deleted = []
+        self._deleted = set()
+        for text in texts:
+            self.add(text)
+
+    def _posting(self, gram):
+        ids = self.postings.get(gram)
+        if ids is None:
+            ids = self.postings[gram] = array("I")
+            for part in {gram[0], gram[1], gram[2], gram[:2], gram[1:]}:
+                self.by_part.setdefault(part, set()).add(gram)
+        return ids
+
+    def __len__(self):
+        return self.size - len(self.deleted)
+
+    def _doc(self, pos):
+        """Internal id of the document at position `pos`."""
+        doc = pos
+        while True:
+            shifted = pos + bisect_right(self.deleted, doc)
+            if shifted == doc:
+                return doc
+            doc = shifted
+
+    def _positions(self, docs):
+        if not self.deleted:
+            return docs
+        gone, deleted = self._deleted, self.deleted
+        return [d - bisect_left(deleted, d) for d in docs if d not in gone]
+
+    def add(self, text):
+        """Index `text` as the next document. Ids stay sorted per posting list."""
+        doc = self.size
+        grams = trigrams(text)
+        postings = self.postings
+        for gram in grams:
+            ids = postings.get(gram)
+            if ids is None:
+                ids = self._posting(gram)
+            ids.append(doc)
+        if not grams:
+            self.short_docs.append(doc)
+        self.size += 1
+        return doc
+
+    def update(self, pos, old_text, new_text):
+        doc = self._doc(pos)
+        old, new = trigrams(old_text), trigrams(new_text)
+        for gram in old - new:
+            ids = self.postings.get(gram)
+            if ids is None:
+                continue
+            pos = bisect_left(ids, doc)
+            if pos < len(ids) and ids[pos] == doc:
+                del ids[pos]
+        for gram in new - old:
+            ids = self._posting(gram)
+            ids.insert(bisect_left(ids, doc), doc)
+        if not old and doc in self.short_docs:
+            self.short_docs.remove(doc)
+        if not new:
+            insort(self.short_docs, doc)
+
+    def delete(self, pos, text):
+        """Drop the document at `pos` (whose text is `text`); later positions shift down."""
+        doc = self._doc(pos)
+        for gram in trigrams(text):
+            ids = self.postings.get(gram)
+            if ids is None:
+                continue
+            at = bisect_left(ids, doc)
+            if at < len(ids) and ids[at] == doc:
+                del ids[at]
+        if not trigrams(text) and doc in self.short_docs:
+            self.short_docs.remove(doc)
+        insort(self.deleted, doc)
+        self._deleted.add(doc)
+
+    def candidates(self, query):
+        """Sorted positions that may contain `query`, or None to scan everything."""
+        if len(query) < GRAM:
+            docs = self._short_candidates(query)
+            return None if docs is None else self._positions(docs)
+        lists = []
+        for gram in trigrams(query):
+            ids = self.postings.get(gram)
+            if not ids:
+                return ()
+            lists.append(ids)
+        return self._positions(min(lists, key=len))
+
+    def _short_candidates(self, query):
+        if not query:
+            return None
+        lists = [self.postings[g] for g in self.by_part.get(query, ()) if self.postings.get(g)]
+        if sum(len(ids) for ids in lists) > SHORT_UNION_LIMIT:
+            return None
+        docs = set(self.short_docs)
+        for ids in lists:
+            docs.update(ids)
+        return sorted(docs)
@@ -0,0 +1,161 @@
+"""Binary snapshot of `commands.json` for fast cold loads.
+
+Parsing a large `commands.json` dominates the start-up of every tool. Next
+to it the store keeps `commands.json.snap`: the same records, already with
+their ids, stored column by column with `marshal`. Software, category and
+tag strings are interned, so marshal writes each distinct value once and
+references it afterwards (a string table for free), and loading gives back
+interned strings shared by all records, exactly as `Record.from_dict` does.
+
+    header   magic, Python version, (mtime_ns, size) of the JSON file, count
+    body     marshal of (commands, software, descriptions, categories, tags,
+             ids, revs, {pos: extra}, {field: positions without that field})
+
+A snapshot is only used while the header matches the JSON file's current
+stamp, so any other writer (a hand edit, a restore, an older version of the
+tools) just makes it stale and the JSON is parsed as before. The store
+writes a new one in a background thread after each rewrite and after a load
+that had to parse the JSON. Set `COMMANDDB_SNAPSHOT=0` to turn it off.
+"""
+
+import marshal
+import os
+import struct
+import sys
+
+import atomic
+from record import KEYS, MISSING, Record, gc_paused
+
+ENABLED = os.environ.get("COMMANDDB_SNAPSHOT", "1") != "0"
+# Smaller files parse in a few milliseconds; not worth a second file
+MIN_SIZE = 1 << 20
+
+MAGIC = b"CDBSNAP1"
+# magic, Python major, minor (marshal's format follows the interpreter), mtime_ns, size, count
+_HEADER = struct.Struct("<8sBBqqQ")
+
+
+def snapshot_path(path):
+    return path + ".snap"
+
+
+def wanted(stamp):
+    """Whether a JSON file with this `(mtime_ns, size)` stamp gets a snapshot."""
+    return ENABLED and stamp is not None and stamp[1] >= MIN_SIZE
+
+
+def _read_header(f):
+    head = f.read(_HEADER.size)
+    if len(head) != _HEADER.size:
+        return None
+    magic, major, minor, mtime_ns, size, count = _HEADER.unpack(head)
+    if magic != MAGIC or (major, minor) != sys.version_info[:2]:
+        return None
+    return (mtime_ns, size), count
+
+
+def stamp_of(path):
+    """The JSON stamp the snapshot at `path` was built from, or None."""
+    try:
+        with open(path, "rb") as f:
+            header = _read_header(f)
+    except OSError:
+        return None
+    return header[0] if header else None
+
+
+def columns(records):
+    """The snapshot body for `records`, or None if some item is not a `Record`.
+
+    Only references the records' values, so it is cheap to take under the
+    store lock; encoding and writing happen later, off it.
+    """
+    if any(type(item) is not Record for item in records):
+        return None
+    cols, absent = [], {}
+    for key in KEYS:
+        col = [getattr(item, key) for item in records]
+        if any(value is MISSING for value in col):
+            gone = [n for n, value in enumerate(col) if value is MISSING]
+            for n in gone:
+                col[n] = None
+            absent[key] = gone
+        cols.append(col)
+    extras = {}
+    for n, item in enumerate(records):
+        if item.extra:
+            # Private keys are never written to disk (see `store.clean_record`)
+            extra = {k: v for k, v in item.extra.items() if not k.startswith("_")}
+            if extra:
+                extras[n] = extra
+    return (*cols, extras, absent)
+
+
+def write(path, body, stamp):
+    """Store `columns()` output for the JSON file with `stamp`. Returns False on failure.
+
+    The snapshot is only a cache: an error here must never fail the write
+    that triggered it.
+    """
+    header = _HEADER.pack(MAGIC, *sys.version_info[:2], *stamp, len(body[0]))
+
+    def dump(f):
+        f.write(header)
+        marshal.dump(body, f)
+
+    try:
+        atomic.replace(path, dump, binary=True)
+    except (OSError, ValueError):
+        return False
+    return True
+
+
+def read(path, stamp):
+    """The records of a snapshot built from the JSON file with `stamp`, or None."""
+    try:
+        with open(path, "rb") as f:
+            header = _read_header(f)
+            if header is None or header[0] != tuple(stamp):
+                return None
+            data = f.read()
+    except OSError:
+        return None
+    with gc_paused():
+        try:
+            return _decode(marshal.loads(data), header[1])
+        except (EOFError, ValueError, TypeError, IndexError, AttributeError):
+            # Damaged; the caller parses the JSON instead
+            return None
+
+
+def _decode(body, count):
+    """`Record`s from a marshalled snapshot body of `count` records."""
+    if (
+        type(body) is not tuple
+        or len(body) != len(KEYS) + 2
+        or any(type(col) is not list or len(col) != count for col in body[: len(KEYS)])
+    ):
+        raise ValueError("not a snapshot body")
+    commands, software, descriptions, categories, tags, ids, revs, extras, absent = body
+    new = Record.__new__
+    records = []
+    append = records.append
+    for cmd, soft, desc, cat, tag, rid, rev in zip(
+        commands, software, descriptions, categories, tags, ids, revs
+    ):
+        item = new(Record)
+        item.command = cmd
+        item.software = soft
+        item.description = desc
+        item.category = cat
+        item.tags = tag
+        item.id = rid
+        item.rev = rev
+        item.extra = None
+        append(item)
+    for key, positions in absent.items():
+        for n in positions:
+            setattr(records[n], key, MISSING)
+    for n, extra in extras.items():
+        records[n].extra = extra
+    return records
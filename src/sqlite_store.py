@@ -0,0 +1,767 @@
+"""Optional SQLite storage backend with an FTS5 full-text index.
+
+Enable it with `COMMANDDB_STORAGE=sqlite`. Populate it once from JSON and
+export back at any time with:
+
+    python src/sqlite_store.py migrate [path/to/commands.json]
+    python src/sqlite_store.py export [path/to/commands.json]
+
+`SqliteStore` mirrors the `CommandStore` API; record keys are row ids
+instead of list positions, and a record's `id` is its row id.
+"""
+
+import json
+import os
+import sqlite3
+import sys
+import threading
+from bisect import bisect_left
+from functools import partial
+
+import atomic
+import change_feed
+import facets
+import live
+import merge
+import ranking
+import record
+import store
+
+SQLITE_FILE = os.path.join(store.DATA_DIR, "commands.db")
+
+# AUTOINCREMENT: an id is never handed out twice, even after the highest
+# row is deleted, so a stale edit of a deleted record can't land on a new one
+TABLE = """
+CREATE TABLE IF NOT EXISTS commands (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    command TEXT NOT NULL DEFAULT '',
+    software TEXT NOT NULL DEFAULT '',
+    description TEXT NOT NULL DEFAULT '',
+    category TEXT NOT NULL DEFAULT '',
+    tags TEXT NOT NULL DEFAULT '[]',
+    tags_text TEXT NOT NULL DEFAULT '',
+    extra TEXT,
+    sig TEXT NOT NULL,
+    search TEXT NOT NULL,
+    rev INTEGER NOT NULL DEFAULT 0
+);
+"""
+SCHEMA = TABLE + "CREATE INDEX IF NOT EXISTS commands_sig ON commands(sig);\n"
+
+# Databases created when ids were plain row ids (reused after a delete).
+# Renaming carries the FTS triggers over to the old table, which drops them;
+# `_create_fts()` puts them back. Row ids, and so the FTS index, are kept.
+UPGRADE_IDS = (
+    "BEGIN;\n"
+    "ALTER TABLE commands RENAME TO commands_old;\n"
+    "DROP INDEX IF EXISTS commands_sig;\n"
+    + TABLE
+    + "INSERT INTO commands SELECT * FROM commands_old;\n"
+    "DROP TABLE commands_old;\n"
+    "DROP TRIGGER IF EXISTS commands_ai;\n"
+    "DROP TRIGGER IF EXISTS commands_ad;\n"
+    "DROP TRIGGER IF EXISTS commands_au;\n"
+    + SCHEMA
+    + "COMMIT;\n"
+)
+
+# The trigram tokenizer gives case-insensitive substring matching for
+# queries of three or more characters, which is what every UI does today.
+# It indexes the combined search string as one column: FTS5 matches a
+# phrase within a single column, and queries span fields ("git vcs").
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS commands_fts USING fts5(
+    search, content='commands', content_rowid='id', tokenize='trigram'
+);
+CREATE TRIGGER IF NOT EXISTS commands_ai AFTER INSERT ON commands BEGIN
+    INSERT INTO commands_fts(rowid, search) VALUES (new.id, new.search);
+END;
+CREATE TRIGGER IF NOT EXISTS commands_ad AFTER DELETE ON commands BEGIN
+    INSERT INTO commands_fts(commands_fts, rowid, search) VALUES ('delete', old.id, old.search);
+END;
+CREATE TRIGGER IF NOT EXISTS commands_au AFTER UPDATE ON commands BEGIN
+    INSERT INTO commands_fts(commands_fts, rowid, search) VALUES ('delete', old.id, old.search);
+    INSERT INTO commands_fts(rowid, search) VALUES (new.id, new.search);
+END;
+"""
+
+# Databases created before the index had a single column
+DROP_FTS = """
+DROP TRIGGER IF EXISTS commands_ai;
+DROP TRIGGER IF EXISTS commands_ad;
+DROP TRIGGER IF EXISTS commands_au;
+DROP TABLE IF EXISTS commands_fts;
+"""
+
+# A token matching more rows than this is cheaper to check by scanning
+NARROW_LIMIT = 20_000
+
+# Records built for ranking are kept until the next write, up to this many
+CACHE_LIMIT = 50_000
+
+COLUMNS = "id, command, software, description, category, tags, extra, rev"
+
+# Fields a rank filter can test in SQL; any other field needs the full view
+FILTER_COLUMNS = ("command", "software", "description", "category")
+
+
+def _to_row(item):
+    item = store.clean_record(item)
+    tags = item.get("tags") or []
+    extra = {k: v for k, v in item.items() if k not in record.KEYS}
+    return (
+        str(item.get("command", "")),
+        str(item.get("software", "")),
+        str(item.get("description", "")),
+        str(item.get("category", "")),
+        json.dumps(tags),
+        " ".join(str(t) for t in tags),
+        json.dumps(extra) if extra else None,
+        store.signature(item),
+        store.search_string(item),
+    )
+
+
+def _to_item(row):
+    item = {
+        "command": row[1],
+        "software": row[2],
+        "description": row[3],
+        "category": row[4],
+        "tags": json.loads(row[5]),
+    }
+    if row[6]:
+        item.update(json.loads(row[6]))
+    item["id"], item["rev"] = row[0], row[7]
+    return record.Record.from_dict(item)
+
+
+def _lower(value):
+    # SQLite's lower() only folds ASCII; filters compare like `store.matches`
+    return None if value is None else str(value).lower()
+
+
+def _filter_sql(filters):
+    """`(conditions, args)` testing `filters` like `store.matches`, or None if SQL can't."""
+    conditions, args = [], []
+    for field, value in (filters or {}).items():
+        if field == "tags":
+            conditions.append(
+                "EXISTS (SELECT 1 FROM json_each(c.tags) WHERE py_lower(json_each.value) = ?)"
+            )
+        elif field in FILTER_COLUMNS:
+            conditions.append(f"py_lower(c.{field}) = ?")
+        else:
+            return None
+        args.append(str(value).lower())
+    return conditions, args
+
+
+class _Rows:
+    """The records of `keys` by position, each read from the store on first use."""
+
+    def __init__(self, owner, keys):
+        self.owner = owner
+        self.keys = keys
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __getitem__(self, pos):
+        return self.owner._record(self.keys[pos])
+
+
+class SqliteStore(live.LiveStore):
+    """`CommandStore`-compatible backend keeping the database in SQLite."""
+
+    INSERT = (
+        "INSERT INTO commands "
+        "(command, software, description, category, tags, tags_text, extra, sig, search) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+    )
+    # Keeps the row id (the record's `id`) and revision from the source
+    INSERT_AS = (
+        "INSERT INTO commands "
+        "(command, software, description, category, tags, tags_text, extra, sig, search, "
+        "id, rev) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+    )
+    UPDATE = (
+        "UPDATE commands SET command=?, software=?, description=?, category=?, tags=?, "
+        "tags_text=?, extra=?, sig=?, search=?, rev=rev + 1 WHERE id=?"
+    )
+
+    def __init__(self, path=SQLITE_FILE):
+        self.path = path
+        self.loaded = False
+        self.fts = False
+        self._lock = threading.RLock()
+        self._records = None
+        self._keys = None
+        self._texts = None
+        self._facets = None
+        # Records built for ranking, by row id (see `_record`)
+        self._cache = {}
+        self._version = None
+        # Bumped whenever the materialised view is dropped or rebuilt
+        self.version = 0
+        self._refiner = ranking.Refiner()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.create_function("py_lower", 1, _lower, deterministic=True)
+        self.conn.executescript(SCHEMA)
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(commands)")}
+        if "rev" not in columns:
+            # Databases migrated before records had revisions
+            self.conn.execute("ALTER TABLE commands ADD COLUMN rev INTEGER NOT NULL DEFAULT 0")
+        self.conn.commit()
+        (table,) = self.conn.execute(
+            "SELECT sql FROM sqlite_master WHERE type='table' AND name='commands'"
+        ).fetchone()
+        if "AUTOINCREMENT" not in table.upper():
+            self.conn.executescript(UPGRADE_IDS)
+        try:
+            self._create_fts()
+            self.fts = True
+        except sqlite3.OperationalError:
+            # SQLite built without FTS5/trigram: fall back to scanning `search`
+            self.fts = False
+        self.conn.commit()
+
+    def _create_fts(self):
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(commands_fts)")]
+        if columns == ["search"]:
+            self.conn.executescript(FTS_SCHEMA)
+            return
+        self.conn.executescript(DROP_FTS + FTS_SCHEMA)
+        self.conn.execute("INSERT INTO commands_fts(commands_fts) VALUES ('rebuild')")
+
+    # --- READ ---
+    def _data_version(self):
+        return self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def load(self):
+        with self._lock:
+            rows = self.conn.execute(
+                f"SELECT {COLUMNS}, search FROM commands ORDER BY id"
+            ).fetchall()
+            self._keys = [r[0] for r in rows]
+            with record.gc_paused():
+                self._records = [_to_item(r) for r in rows]
+            self._texts = [r[8] for r in rows]
+            self._facets = None
+            self._cache = {}
+            self._version = self._data_version()
+            self.version += 1
+            self.loaded = True
+            return self._records
+
+    @property
+    def records(self):
+        """All records in insertion order (materialised on first use)."""
+        with self._lock:
+            if self._records is None:
+                self.load()
+            return self._records
+
+    def _view(self):
+        """Row ids and search strings only, without building a record per row."""
+        if self._keys is None:
+            rows = self.conn.execute("SELECT id, search FROM commands ORDER BY id").fetchall()
+            self._keys = [r[0] for r in rows]
+            self._texts = [r[1] for r in rows]
+            self._version = self._data_version()
+            self.version += 1
+            self.loaded = True
+
+    def keys(self):
+        with self._lock:
+            self._view()
+            return self._keys
+
+    def search_texts(self):
+        with self._lock:
+            self._view()
+            return self._texts
+
+    def _record(self, key):
+        """The record with row id `key`, shared until the next write."""
+        item = self._cache.get(key)
+        if item is None:
+            if len(self._cache) >= CACHE_LIMIT:
+                self._cache.clear()
+            item = self._cache[key] = self.get(key)
+        return item
+
+    def is_stale(self):
+        return not self.loaded or self._data_version() != self._version
+
+    def refresh(self):
+        """Drop the materialised view if another connection wrote. Returns True if so."""
+        with self._lock:
+            if not self.is_stale():
+                return False
+            self._records = self._keys = self._texts = self._facets = None
+            self._cache = {}
+            self._version = self._data_version()
+            self.version += 1
+            self.loaded = True
+            return True
+
+    def _changed(self, keys=None):
+        self._records = self._keys = self._texts = self._facets = None
+        self._cache = {}
+        self._version = self._data_version()
+        self.version += 1
+        change_feed.publish(self.path, "rows", keys)
+
+    def reload_in_background(self):
+        """Materialise a fresh view if another connection wrote. Returns True if so."""
+        with self._lock:
+            if not self.refresh() and self._records is not None:
+                return False
+            self.load()
+            self.facets()
+            return True
+
+    def watched_paths(self):
+        # Writes from other connections land in the WAL first
+        return [self.path, self.path + "-wal"]
+
+    def apply_change(self, message):
+        """Patch the announced rows into the materialised view. Returns True if it changed.
+
+        Without row ids (bulk writes, gaps) the view is dropped instead and
+        rebuilt on next use.
+        """
+        path = message.get("path")
+        if path is not None and path != os.path.abspath(self.path):
+            return False
+        keys = message.get("keys")
+        with self._lock:
+            if message.get("kind") != "rows" or keys is None or self._keys is None:
+                return self.refresh()
+            if self._data_version() == self._version:
+                return False
+            for key in keys:
+                self._cache.pop(key, None)
+                self._patch(key)
+            self._version = self._data_version()
+            self.version += 1
+            return True
+
+    def _patch(self, key):
+        row = self.conn.execute(
+            f"SELECT {COLUMNS}, search FROM commands WHERE id=?", (key,)
+        ).fetchone()
+        pos = bisect_left(self._keys, key)
+        present = pos < len(self._keys) and self._keys[pos] == key
+        # The view may hold ids and search strings only (see `_view`)
+        records = self._records
+        if row is None:
+            if present:
+                del self._keys[pos], self._texts[pos]
+                if records is not None:
+                    del records[pos]
+                self._facets = None
+        elif present:
+            self._texts[pos] = row[8]
+            if records is not None:
+                old = records[pos]
+                records[pos] = _to_item(row)
+                if self._facets is not None:
+                    self._facets.update(pos, old, records[pos])
+        else:
+            self._facets = None
+            self._keys.insert(pos, key)
+            self._texts.insert(pos, row[8])
+            if records is not None:
+                records.insert(pos, _to_item(row))
+
+    def __len__(self):
+        return self.conn.execute("SELECT count(*) FROM commands").fetchone()[0]
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def search(self, query, limit=None):
+        """Yield `(id, item)` for records whose search string contains `query`."""
+        query = query.lower()
+        limit = limit or -1
+        with self._lock:
+            if not query:
+                sql, args = f"SELECT {COLUMNS} FROM commands ORDER BY id LIMIT ?", (limit,)
+            elif self.fts and len(query) >= 3:
+                phrase = '"' + query.replace('"', '""') + '"'
+                cols = ", ".join(f"c.{c}" for c in COLUMNS.split(", "))
+                sql = (
+                    f"SELECT {cols} FROM commands_fts f JOIN commands c ON c.id = f.rowid "
+                    "WHERE commands_fts MATCH ? AND instr(c.search, ?) ORDER BY c.id LIMIT ?"
+                )
+                args = (phrase, query, limit)
+            else:
+                sql = f"SELECT {COLUMNS} FROM commands WHERE instr(search, ?) ORDER BY id LIMIT ?"
+                args = (query, limit)
+            rows = self.conn.execute(sql, args).fetchall()
+        for row in rows:
+            yield row[0], _to_item(row)
+
+    def _narrow(self, keys, token):
+        """Sorted positions in `keys` whose search string contains `token`, or None to scan."""
+        if not self.fts or len(token) < 3:
+            return None
+        phrase = '"' + token.replace('"', '""') + '"'
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT rowid FROM commands_fts WHERE commands_fts MATCH ? "
+                "ORDER BY rowid LIMIT ?",
+                (phrase, NARROW_LIMIT + 1),
+            ).fetchall()
+        if len(rows) > NARROW_LIMIT:
+            return None
+        return self._positions(keys, [key for (key,) in rows])
+
+    @staticmethod
+    def _positions(keys, wanted):
+        """Sorted positions in `keys` of the sorted row ids `wanted`."""
+        found = []
+        for key in wanted:
+            pos = bisect_left(keys, key)
+            # Rows written since the view was built aren't in it
+            if pos < len(keys) and keys[pos] == key:
+                found.append(pos)
+        return found
+
+    def _verbatim(self, tokens, where, args, limit):
+        """`(id, search)` of the rows containing every token, in id order.
+
+        Tokens of three or more characters are looked up in FTS, the rest
+        checked with `instr`. With a `limit`, only the first
+        `ranking.SCAN_LIMIT` rows are read, as `ranking.rank` bounds its
+        own scan.
+        """
+        where = ["instr(c.search, ?)" for _ in tokens] + where
+        args = list(tokens) + args
+        long = [t for t in tokens if len(t) >= 3] if self.fts else []
+        if long:
+            phrases = " AND ".join('"' + t.replace('"', '""') + '"' for t in long)
+            sql = (
+                "SELECT c.id, c.search FROM commands_fts f JOIN commands c ON c.id = f.rowid "
+                f"WHERE commands_fts MATCH ? AND {' AND '.join(where)} ORDER BY f.rowid LIMIT ?"
+            )
+            args.insert(0, phrases)
+        else:
+            sql = (
+                f"SELECT c.id, c.search FROM commands c WHERE {' AND '.join(where)} "
+                "ORDER BY c.id LIMIT ?"
+            )
+        args.append(ranking.SCAN_LIMIT if limit else -1)
+        return self.conn.execute(sql, args).fetchall()
+
+    def rank(self, query, limit=ranking.LIMIT, cancelled=None, filters=None, fuzzy=True):
+        """Best-first `[(id, item)]`.
+
+        The verbatim tier is a single SQL query (see `_verbatim`), and
+        records are read only for the hits `ranking.rank` fully scores, so
+        `fuzzy=False` never reads the whole table. The fuzzy tiers scan the
+        ids and search strings (refined like `CommandStore.rank`) and read
+        the records they score on demand.
+        """
+        tokens = ranking.tokenize(query)
+        clauses = _filter_sql(filters)
+        with self._lock:
+            if clauses is None:
+                # A filter on a field SQL can't see
+                records, texts, keys = self.records, self.search_texts(), self.keys()
+                picked = store.filter_positions(records, filters, self.facets())
+                return store.rank_filtered(
+                    query, records, texts, picked, limit, keys, cancelled, fuzzy
+                )
+            where, args = clauses
+            if not tokens:
+                cols = ", ".join(f"c.{c}" for c in COLUMNS.split(", "))
+                rows = self.conn.execute(
+                    f"SELECT {cols} FROM commands c WHERE {' AND '.join(where) or 1} "
+                    "ORDER BY c.id LIMIT ?",
+                    (*args, limit or -1),
+                ).fetchall()
+                return [(row[0], _to_item(row)) for row in rows]
+            rows = self._verbatim(tokens, where, args, limit)
+            keys = [key for key, _ in rows]
+            results = ranking.rank(
+                query,
+                _Rows(self, keys),
+                limit,
+                [text for _, text in rows],
+                keys,
+                cancelled=cancelled,
+                fuzzy=False,
+            )
+            if not fuzzy or (len(results) >= limit if limit else results):
+                return results
+            # Held throughout: a change-feed patch edits the view in place
+            self._view()
+            keys, texts = self._keys, self._texts
+            if where:
+                matched = self.conn.execute(
+                    f"SELECT c.id FROM commands c WHERE {' AND '.join(where)} ORDER BY c.id",
+                    args,
+                ).fetchall()
+                picked = self._positions(keys, [key for (key,) in matched])
+                keys = [keys[n] for n in picked]
+                return ranking.rank(
+                    query,
+                    _Rows(self, keys),
+                    limit,
+                    [texts[n] for n in picked],
+                    keys,
+                    cancelled=cancelled,
+                )
+            return ranking.rank(
+                query,
+                _Rows(self, keys),
+                limit,
+                texts,
+                keys,
+                narrow=partial(self._narrow, keys),
+                cancelled=cancelled,
+                scope=partial(self._refiner.candidates, query, texts, self.version),
+            )
+
+    def stream_load(self, on_progress=None, index=False):
+        """Rows come from SQLite, not a JSON parse, so this loads in one go."""
+        changed = self.reload_in_background()
+        if on_progress is not None:
+            on_progress()
+        return changed
+
+    def facets(self):
+        """Same contract as `CommandStore.facets` (positions, not row ids)."""
+        with self._lock:
+            records = self.records
+            if self._facets is None:
+                self._facets = facets.FacetIndex(records)
+            return self._facets
+
+    def values(self, field):
+        with self._lock:
+            return self.facets().values(field)
+
+    def page(self, offset=0, limit=None, filters=None):
+        """Same contract as `CommandStore.page`; read with LIMIT/OFFSET, not the full view."""
+        clauses = _filter_sql(filters)
+        if clauses is None:
+            end = None if limit is None else offset + limit
+            with self._lock:
+                records = self.records
+                picked = store.filter_positions(records, filters, self.facets())
+                return [records[n] for n in picked[offset:end]]
+        where, args = clauses
+        cols = ", ".join(f"c.{c}" for c in COLUMNS.split(", "))
+        with self._lock:
+            rows = self.conn.execute(
+                f"SELECT {cols} FROM commands c WHERE {' AND '.join(where) or 1} "
+                "ORDER BY c.id LIMIT ? OFFSET ?",
+                (*args, -1 if limit is None else limit, offset),
+            ).fetchall()
+        return [_to_item(row) for row in rows]
+
+    def ensure_index(self):
+        """The FTS table is the index; kept for API parity."""
+
+    def get(self, key):
+        row = self.conn.execute(f"SELECT {COLUMNS} FROM commands WHERE id=?", (key,)).fetchone()
+        if row is None:
+            raise KeyError(key)
+        return _to_item(row)
+
+    def key_of(self, record_id):
+        """The key of the record with id `record_id` (its row id), or None if it is gone."""
+        row = self.conn.execute("SELECT id FROM commands WHERE id=?", (record_id,)).fetchone()
+        return row[0] if row else None
+
+    def find(self, item):
+        """Row id of the record sharing `item`'s signature, or None."""
+        row = self.conn.execute(
+            "SELECT id FROM commands WHERE sig=? ORDER BY id LIMIT 1", (store.signature(item),)
+        ).fetchone()
+        return row[0] if row else None
+
+    # --- WRITE ---
+    def add(self, entry):
+        return self.add_many([entry])
+
+    def add_many(self, entries):
+        with self._lock, self.conn:
+            keys = [self.conn.execute(self.INSERT, _to_row(e)).lastrowid for e in entries]
+        self._changed(keys)
+        return len(entries)
+
+    def _check_rev(self, item, rev):
+        if rev is not None and item.get("rev") != rev:
+            raise store.Conflict(f"{item.get('command', '')!r} was changed by another tool")
+
+    def update(self, key, changes, rev=None):
+        """Same contract as `CommandStore.update`, including the conditional `rev`."""
+        with self._lock, self.conn:
+            item = self.get(key)
+            self._check_rev(item, rev)
+            item.update(store.clean_changes(changes))
+            self.conn.execute(self.UPDATE, (*_to_row(item), key))
+            item["rev"] += 1
+        self._changed([key])
+        return item
+
+    def delete(self, key, rev=None):
+        with self._lock, self.conn:
+            item = self.get(key)
+            self._check_rev(item, rev)
+            self.conn.execute("DELETE FROM commands WHERE id=?", (key,))
+        self._changed([key])
+        return item
+
+    def bulk_upsert(self, entries, overwrite=False):
+        """Same contract as `CommandStore.bulk_upsert`; runs in one transaction."""
+        added = matched = 0
+        with self._lock, self.conn:
+            for entry in entries:
+                row = _to_row(entry)
+                hit = self.conn.execute(
+                    "SELECT id FROM commands WHERE sig=? LIMIT 1", (row[7],)
+                ).fetchone()
+                if hit:
+                    matched += 1
+                    if overwrite:
+                        item = self.get(hit[0])
+                        item.update(store.clean_changes(entry))
+                        self.conn.execute(self.UPDATE, (*_to_row(item), hit[0]))
+                    continue
+                self.conn.execute(self.INSERT, row)
+                added += 1
+        self._changed()
+        return added, matched
+
+    def replace_all(self, records):
+        """Positional diff against `records`, like `CommandStore.replace_all`."""
+        records = [store.clean_record(r) for r in records]
+        with self._lock:
+            current, keys = self.records, self.keys()
+            with self.conn:
+                if len(records) == len(current):
+                    for key, old, new in zip(keys, current, records):
+                        if record.content(old) != record.content(new):
+                            self.conn.execute(self.UPDATE, (*_to_row(new), key))
+                else:
+                    self.conn.execute("DELETE FROM commands")
+                    self._insert_as(records)
+            self._changed()
+
+    def _insert_as(self, records):
+        """Insert `records`, keeping each one's `id` and `rev` unless the id is taken."""
+        taken = set()
+        for item in records:
+            rid = item.get("id")
+            if isinstance(rid, int) and rid > 0 and rid not in taken:
+                taken.add(rid)
+                self.conn.execute(self.INSERT_AS, (*_to_row(item), rid, item.get("rev") or 0))
+            else:
+                self.conn.execute(self.INSERT, _to_row(item))
+
+    def merge(self, base, edited):
+        """Same contract as `CommandStore.merge`; applied in one transaction."""
+
+        def current(rid):
+            try:
+                return self.get(rid)
+            except KeyError:
+                return None
+
+        with self._lock, self.conn:
+            plan = merge.plan(base, edited, current)
+            for rid, changes in plan.updates:
+                item = self.get(rid)
+                item.update(store.clean_changes(changes))
+                self.conn.execute(self.UPDATE, (*_to_row(item), rid))
+            self.conn.executemany(
+                "DELETE FROM commands WHERE id=?", [(rid,) for rid in plan.deletes]
+            )
+            self.conn.executemany(self.INSERT, [_to_row(e) for e in plan.adds])
+        self._changed()
+        return plan.summary()
+
+    def save(self):
+        self.conn.commit()
+
+    def compact(self):
+        """Checkpoint the WAL. Returns False: there is no journal to fold in."""
+        self.conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
+        return False
+
+    def start_compactor(self, interval=None):
+        """SQLite checkpoints on its own; kept for API parity."""
+
+    def stop_compactor(self):
+        pass
+
+    def backup(self, prefix="commands_backup", backup_dir=store.BACKUP_DIR):
+        """Snapshot a JSON export into `backup_dir`, so backups restore like the JSON store's."""
+        os.makedirs(backup_dir, exist_ok=True)
+        export = os.path.join(backup_dir, f".{prefix}.export.json")
+        self.export_json(export)
+        try:
+            return store.create_backup(export, prefix, backup_dir)
+        finally:
+            os.remove(export)
+
+    # --- MIGRATION ---
+    def import_json(self, json_path=store.DB_FILE):
+        """Replace the table contents with `json_path` (journal included)."""
+        source = store.CommandStore(json_path)
+        source.load()
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM commands")
+            # Keep the ids, so editors and links survive a switch of storage mode
+            self._insert_as(source.records)
+            if self.fts:
+                self.conn.execute("INSERT INTO commands_fts(commands_fts) VALUES ('optimize')")
+        self._changed()
+        return len(source.records)
+
+    def export_json(self, json_path=store.DB_FILE):
+        """Write every record to `json_path` in the usual `indent=4` layout."""
+        records = self.records
+        # Any journal left next to the old JSON file is ignored from now on,
+        # since its header no longer matches the replaced file
+        with atomic.FileLock(json_path):
+            atomic.replace(
+                json_path, partial(json.dump, records, indent=4, default=record.jsonable)
+            )
+        return len(records)
+
+    def close(self):
+        self.conn.close()
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] not in ("migrate", "export"):
+        print("Usage: sqlite_store.py migrate|export [commands.json] [commands.db]")
+        return 2
+    json_path = argv[1] if len(argv) > 1 else store.DB_FILE
+    db_path = argv[2] if len(argv) > 2 else SQLITE_FILE
+    db = SqliteStore(db_path)
+    try:
+        if argv[0] == "migrate":
+            count = db.import_json(json_path)
+            print(f"Migrated {count} commands into {db_path}")
+        else:
+            count = db.export_json(json_path)
+            print(f"Exported {count} commands to {json_path}")
+    finally:
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,1008 @@
+"""Shared storage engine for `commands.json`.
+
+Every entry point (Quick Add, CLI, dashboard, harvester) goes through a
+`CommandStore` instead of re-reading and re-writing the file on its own.
+"""
+
+import json
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from functools import partial
+
+import atomic
+import change_feed
+import facets
+import json_stream
+import live
+import merge
+import ranking
+import record
+import search_index
+from caches import Caches
+from journal import Journal, journal_path
+from search_index import TrigramIndex
+
+# --- CONFIGURATION ---
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(PROJECT_ROOT, "data")
+DB_FILE = os.path.join(DATA_DIR, "commands.json")
+BACKUP_DIR = os.path.join(DATA_DIR, "backups")
+# Per-session files of the running tools (heartbeats, the query API token)
+RUN_DIR = os.path.join(DATA_DIR, "run")
+
+FIELDS = record.FIELDS
+
+# Records parsed per step by `load()` / `stream_load()`
+STREAM_BATCH = json_stream.BATCH
+
+# Records per `page()` call when a caller walks a whole store (see `walk()`)
+PAGE_SIZE = 5000
+
+# "json" (default) or "sqlite"; see `open_store()`
+STORAGE_MODE = os.environ.get("COMMANDDB_STORAGE", "json").lower()
+
+
+class UnreadableDatabase(RuntimeError):
+    """`commands.json` exists but is not a readable JSON array, so it is left alone."""
+
+
+class Conflict(RuntimeError):
+    """A conditional write found the record changed (or gone) since it was read."""
+
+
+# --- HELPERS ---
+def signature(item):
+    """Identity used for de-duplication: software + normalised command."""
+    return f"{item.get('software','').lower()}|{item.get('command','').lower().strip()}"
+
+
+def search_string(item):
+    return (
+        f"{item.get('command','')} {item.get('description','')} {item.get('software','')} "
+        f"{' '.join(item.get('tags',[]))}"
+    ).lower()
+
+
+def to_record(item):
+    """In-memory form of a loaded JSON item (see `record.Record`)."""
+    return record.Record.from_dict(item) if isinstance(item, dict) else item
+
+
+def clean_record(item):
+    """Drop private (`_`-prefixed) keys such as cached search strings before writing."""
+    return {k: v for k, v in item.items() if not k.startswith("_")}
+
+
+def clean_changes(changes):
+    """`clean_record()` for an update: `id` and `rev` are managed by the store."""
+    return {k: v for k, v in changes.items() if not k.startswith("_") and k not in record.META}
+
+
+def matches(item, filters):
+    """True if `item` has every `field: value` of `filters` (case-insensitive).
+
+    A multi-valued field such as `tags` matches if any of its values does.
+    """
+    for field, value in filters.items():
+        if field in facets.FACETS:
+            got = facets.value_of(item, field)
+        else:
+            got = str(item.get(field, ""))
+        value = str(value).lower()
+        if isinstance(got, list):
+            if not any(v.lower() == value for v in got):
+                return False
+        elif got.lower() != value:
+            return False
+    return True
+
+
+def filter_positions(records, filters, index=None):
+    """Sorted positions of the records passing `filters`, from `index` when it covers them."""
+    picked = index.positions(filters) if index is not None else None
+    if picked is None:
+        picked = [n for n, item in enumerate(records) if matches(item, filters)]
+    return picked
+
+
+def walk(db, filters=None, limit=None, size=None):
+    """Yield `db`'s records passing `filters` in order, fetched `size` at a time via `page()`.
+
+    A write landing between two pages can shift the listing; see `read_all()`.
+    """
+    size = size or PAGE_SIZE
+    offset = 0
+    while limit is None or offset < limit:
+        want = size if limit is None else min(size, limit - offset)
+        page = db.page(offset, want, filters)
+        yield from page
+        if len(page) < want:
+            return
+        offset += want
+
+
+def read_all(db, filters=None, size=None):
+    """Every record passing `filters`, in order, paged like `walk()`.
+
+    Read again if the store's version moved meanwhile, so the list is one
+    consistent state.
+    """
+    while True:
+        version = db.version
+        found = list(walk(db, filters, size=size))
+        if db.version == version:
+            return found
+
+
+def rank_filtered(
+    query, records, texts, picked, limit=ranking.LIMIT, keys=None, cancelled=None, fuzzy=True
+):
+    """Rank only the records at positions `picked`, keeping their original keys."""
+    keys = keys if keys is not None else range(len(records))
+    return ranking.rank(
+        query,
+        [records[n] for n in picked],
+        limit,
+        [texts[n] for n in picked],
+        [keys[n] for n in picked],
+        cancelled=cancelled,
+        fuzzy=fuzzy,
+    )
+
+
+def _substring_hits(query, records, texts, index, limit=None):
+    """`(position, record)` for texts containing `query`, narrowed by `index` if given."""
+    candidates = index.candidates(query) if index is not None else None
+    if candidates is None:
+        candidates = range(len(texts))
+    found = 0
+    for idx in candidates:
+        if query in texts[idx]:
+            yield idx, records[idx]
+            found += 1
+            if limit and found >= limit:
+                return
+
+
+def timestamp():
+    return datetime.now().strftime("%Y%m%d_%H%M%S")
+
+
+def create_backup(path=DB_FILE, prefix="commands_backup", backup_dir=BACKUP_DIR):
+    """Snapshot `path` into the backup store and thin old snapshots.
+
+    Returns the snapshot id (see `backups.py`), or None if there is no file.
+    """
+    import backups  # imports this module for its paths
+
+    snapshots = backups.BackupStore(backup_dir)
+    snapshots.migrate()
+    snap_id = snapshots.snapshot(path, prefix)
+    if snap_id is not None:
+        snapshots.prune()
+    return snap_id
+
+
+# --- ENGINE ---
+class CommandStore(live.LiveStore):
+    """In-memory model of the command database with incremental mutations.
+
+    Mutations are appended to a write-ahead journal (see `journal.py`) and
+    applied by replaying it, so a single add costs one short line plus one
+    fsync. The journal is folded back into `commands.json` by `compact()`,
+    either from the background compactor or before a full rewrite. The
+    watcher, feed and compactor threads come from `live.LiveStore`.
+    """
+
+    def __init__(self, path=DB_FILE):
+        self.path = path
+        self.journal = Journal(journal_path(path))
+        self.records = []
+        self.loaded = False
+        self._stamp = None
+        self._offset = 0
+        self._journal_ok = True
+        self._sigs = None
+        # Record id -> position, built on first use (see `key_of()`)
+        self._by_id = None
+        # Lowercase search strings parallel to `records`, and the optional
+        # trigram index over them (see `ensure_index()`)
+        self._texts = None
+        self.index = None
+        self._index_wanted = False
+        # True while `records` are exactly the main file, with no journal
+        # operation applied on top (see `_save_caches()`)
+        self._pristine = False
+        # The snapshot and shared read-only index next to the main file
+        self._caches = Caches(path)
+        # Dictionary-encoded software/category/tags (see `facets()`)
+        self._facets = None
+        # Bumped whenever positions or search strings may change; keys the
+        # candidate sets remembered by `_refiner`
+        self.version = 0
+        self._refiner = ranking.Refiner()
+        self._lock = threading.RLock()
+        # Held (inside `_lock`) by every write, across processes; see `_writing()`
+        self._file_lock = atomic.FileLock(path)
+        # Why the main file could not be parsed; writes are refused until it can
+        self.load_error = None
+        # Writers wait on this while `stream_load()` is still filling `records`
+        self._cond = threading.Condition(self._lock)
+        self._streaming = False
+
+    # --- READ ---
+    def _file_stamp(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _batches(self, stamp):
+        """Records of the main file, a batch at a time; parsing memory stays bounded.
+
+        A fresh binary snapshot (see `snapshot.py`) is used instead, in one batch.
+        """
+        cached = self._caches.records(stamp)
+        if cached is not None:
+            yield cached
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for batch in json_stream.iter_batches(f, STREAM_BATCH):
+                yield record.from_dicts(batch)
+
+    def load(self):
+        with self._lock:
+            self._settle()
+            stamp = self._file_stamp()
+            records, self.load_error = [], None
+            if stamp is not None:
+                try:
+                    with record.gc_paused():
+                        for batch in self._batches(stamp):
+                            records.extend(batch)
+                except FileNotFoundError:
+                    records = []
+                except Exception as e:
+                    records, self.load_error = [], e
+            self.records = records
+            self._stamp = stamp
+            self._offset = 0
+            self._reset_derived()
+            self.loaded = True
+            self._assign_ids()
+            self._pristine = True
+            self._save_caches(stamp)
+            self._replay()
+            return self.records
+
+    def stream_load(self, on_progress=None, index=False):
+        """First load that is searchable while the file is still being parsed.
+
+        Readers see a growing prefix of the records, with search strings,
+        signatures, facets and (with `index` set) the trigram index kept up
+        to date batch by batch; writers wait until the journal has been
+        replayed on top of the complete file. `on_progress()` runs on this
+        thread after the first batch, whenever the count has doubled since,
+        and at the end unless nothing changed after the last call. A store
+        that is already loaded just refreshes.
+        """
+        with self._lock:
+            self._settle()
+            if self.loaded:
+                return self.refresh()
+            self._index_wanted = self._index_wanted or index
+            stamp = self._file_stamp()
+            self.records, self.load_error = [], None
+            self._stamp, self._offset = stamp, 0
+            self._reset_derived()
+            self._texts = []
+            if self._index_wanted:
+                self.index = TrigramIndex()
+            self.loaded = self._streaming = True
+        # Record count and version at the last `on_progress()`
+        shown, seen = 0, None
+        try:
+            if stamp is not None:
+                with record.gc_paused():
+                    for batch in self._batches(stamp):
+                        with self._lock:
+                            self._extend(batch)
+                        if on_progress is not None and len(self.records) >= 2 * shown:
+                            shown, seen = len(self.records), self.version
+                            on_progress()
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            # Unreadable, as in `load()`
+            with self._lock:
+                self.records, self.load_error = [], e
+                self._reset_derived()
+        finally:
+            with self._lock:
+                if self._file_stamp() != stamp:
+                    # Replaced while we were reading; rebuild here, off the UI thread
+                    self._streaming = False
+                    self.load()
+                    self.search_texts()
+                    if self._index_wanted:
+                        self.ensure_index()
+                else:
+                    self._assign_ids()
+                    self._pristine = True
+                    self._save_caches(stamp)
+                    self._replay()
+        try:
+            if on_progress is not None and seen != self.version:
+                on_progress()
+        finally:
+            # Writers go ahead only once the caller has seen the finished load
+            with self._lock:
+                self._streaming = False
+                self._cond.notify_all()
+        return True
+
+    def _extend(self, items):
+        """Append already loaded records, keeping every derived structure current."""
+        start = len(self.records)
+        self.records.extend(items)
+        self.version += 1
+        # Ids are only complete once the whole file is in (see `_assign_ids()`)
+        self._by_id = None
+        if self._sigs is not None:
+            for n, item in enumerate(items, start):
+                self._sigs.setdefault(signature(item), n)
+        if self._facets is not None:
+            for item in items:
+                self._facets.add(item)
+        if self._texts is not None:
+            texts = [search_string(item) for item in items]
+            self._texts.extend(texts)
+            if self.index is not None:
+                for text in texts:
+                    self.index.add(text)
+
+    def _settle(self):
+        """Block (releasing the lock) while a `stream_load()` is in progress."""
+        while self._streaming:
+            self._cond.wait()
+
+    def _sync(self):
+        """`refresh()` for writers, which must see the complete file."""
+        self._settle()
+        return self.refresh()
+
+    def _check_readable(self):
+        if self.load_error is not None:
+            raise UnreadableDatabase(
+                f"{self.path} could not be parsed ({self.load_error}); not writing to it"
+            )
+
+    @contextmanager
+    def _writing(self):
+        """Exclusive write access: this store's lock, then the cross-process file lock.
+
+        Writers `_sync()` inside it, so the state they base their operations
+        on can't change before those operations are journaled. A running
+        `stream_load()` is waited out first, without holding up other processes.
+        """
+        with self._lock:
+            self._settle()
+            with self._file_lock:
+                yield
+
+    def _reset_derived(self):
+        self.version += 1
+        self._sigs = None
+        self._by_id = None
+        self._texts = None
+        self.index = None
+        self._facets = None
+
+    def _assign_ids(self):
+        """Number records from a file written before ids existed.
+
+        Every process loading the same file computes the same ids; the next
+        rewrite stores them. Records missing only `rev` start at 0.
+        """
+        used = None
+        for pos, item in enumerate(self.records):
+            if type(item) is not record.Record:
+                continue
+            if item.rev is record.MISSING:
+                item.rev = 0
+            if item.id is record.MISSING:
+                if used is None:
+                    used = {r.id for r in self.records if type(r) is record.Record}
+                rid = pos + 1
+                if rid in used:
+                    rid = record.derived_id(pos, signature(item))
+                item.id = rid
+                used.add(rid)
+        self._by_id = None
+
+    def _save_caches(self, stamp):
+        """Refresh the caches of the main file with `stamp` (see `caches.py`).
+
+        Called only while `records` are exactly that file.
+        """
+        if self.load_error is None:
+            self._caches.save(self.records, stamp, self.index, self._texts)
+
+    def _replay(self):
+        ops, self._offset, self._journal_ok = self.journal.read(self._stamp, self._offset)
+        for op in ops:
+            self._apply(op)
+        return len(ops)
+
+    def _apply(self, op):
+        kind, idx = op.get("op"), op.get("i")
+        self.version += 1
+        self._pristine = False
+        if kind == "add":
+            item = to_record(op["record"])
+            if item.id is record.MISSING:
+                # Journaled before ids existed; the same in every process
+                item.id = record.derived_id(len(self.records), signature(item))
+            if item.rev is record.MISSING:
+                item.rev = 0
+            if self._by_id is not None:
+                self._by_id[item.id] = len(self.records)
+            self.records.append(item)
+            if self._sigs is not None:
+                self._sigs.setdefault(signature(item), len(self.records) - 1)
+            if self._facets is not None:
+                self._facets.add(item)
+            if self._texts is not None:
+                text = search_string(item)
+                self._texts.append(text)
+                if self.index is not None:
+                    self.index.add(text)
+            return
+        if not isinstance(idx, int) or not 0 <= idx < len(self.records):
+            return
+        if kind == "update":
+            item = self.records[idx]
+            old = dict(item) if self._facets is not None else None
+            item.update(clean_changes(op.get("changes", {})))
+            if isinstance(item, record.Record):
+                item.rev = item.rev + 1 if type(item.rev) is int else 1
+            self._sigs = None
+            if old is not None:
+                self._facets.update(idx, old, self.records[idx])
+            if self._texts is not None:
+                old, new = self._texts[idx], search_string(self.records[idx])
+                self._texts[idx] = new
+                if self.index is not None:
+                    self.index.update(idx, old, new)
+        elif kind == "delete":
+            self.records.pop(idx)
+            self._sigs = None
+            self._by_id = None
+            # Every later position shifts; rebuilt on next use
+            self._facets = None
+            if self._texts is not None:
+                text = self._texts.pop(idx)
+                if self.index is not None:
+                    self.index.delete(idx, text)
+                    # Many tombstones slow every lookup; rebuild on the next search
+                    if len(self.index.deleted) > search_index.TOMBSTONE_LIMIT:
+                        self.index = None
+            else:
+                self.index = None
+
+    def is_stale(self):
+        if self._streaming:
+            return False
+        if not self.loaded or self._file_stamp() != self._stamp:
+            return True
+        return self.journal.size() != self._offset
+
+    def refresh(self):
+        """Bring the model up to date with disk. Returns True if anything changed.
+
+        A changed main file forces a full reload; new journal lines are
+        replayed incrementally.
+        """
+        with self._lock:
+            if self._streaming:
+                # Still reading the main file; the journal is replayed after it
+                return False
+            if not self.loaded or self._file_stamp() != self._stamp:
+                self.load()
+                return True
+            size = self.journal.size()
+            if size == self._offset:
+                return False
+            if size < self._offset:
+                self.load()
+                return True
+            return self._replay() > 0
+
+    def reload_in_background(self):
+        """`refresh()` that parses a replaced main file without holding the lock.
+
+        A compaction of exactly what we hold (another process's compactor)
+        is adopted from the journal header instead, like `apply_change()`
+        does. Otherwise the new snapshot (records, search strings, index) is
+        built on the calling thread and swapped in atomically, so readers
+        keep using the old one until then. Returns True if anything changed.
+        """
+        for _ in range(3):
+            with self._lock:
+                if self.loaded and self._file_stamp() == self._stamp:
+                    # Only journal lines to replay, which is cheap
+                    return self.refresh()
+                if self._adopt_rebased():
+                    return self._replay() > 0
+                wanted = self._index_wanted
+            fresh = CommandStore(self.path)
+            fresh.load()
+            fresh.search_texts()
+            if wanted:
+                fresh.ensure_index()
+                fresh.facets()
+            with self._lock:
+                self._settle()
+                if fresh._stamp != self._file_stamp():
+                    # Replaced again while we were parsing
+                    continue
+                self.records, self._stamp = fresh.records, fresh._stamp
+                self._offset, self._journal_ok = fresh._offset, fresh._journal_ok
+                self._sigs, self._texts, self.index = fresh._sigs, fresh._texts, fresh.index
+                self._by_id = fresh._by_id
+                self._facets = fresh._facets
+                self._pristine = fresh._pristine
+                self.version += 1
+                self.loaded = True
+                self._replay()
+                return True
+        with self._lock:
+            return self.refresh()
+
+    def watched_paths(self):
+        return [self.path, self.journal.path]
+
+    def _catch_up(self, on_change):
+        if not self.loaded:
+            # First load: usable from the first batch on, and reports itself
+            self.stream_load(on_change)
+            return False
+        return self.reload_in_background()
+
+    def apply_change(self, message):
+        """Apply a change announced by another process. Returns True if anything changed.
+
+        Journal deltas are replayed incrementally by `refresh()`. A compaction
+        we had fully replayed is adopted without parsing the new file; any
+        other rewrite, or a gap in the feed, reloads it.
+        """
+        path = message.get("path")
+        if path is not None and path != os.path.abspath(self.path):
+            return False
+        with self._lock:
+            kind = message.get("kind")
+            if kind == "gap" and self.loaded:
+                self.load()
+                return True
+            if kind == "compact" and self._adopt(
+                message.get("base"),
+                message.get("consumed"),
+                message.get("stamp"),
+                message.get("offset"),
+            ):
+                return self._replay() > 0
+            return self.refresh()
+
+    def _adopt(self, parent, consumed, stamp, offset):
+        """Follow a compaction of exactly our model without parsing the new file.
+
+        `parent` is the stamp of the compacted file, `consumed` how far into
+        its journal the compaction read, and `stamp` and `offset` the new
+        file's stamp and the journal offset after its header. Returns True if
+        adopted; the caller replays whatever the journal holds beyond that.
+        """
+        if not (
+            self.loaded
+            and self._journal_ok
+            and parent
+            and stamp is not None
+            and list(parent) == (list(self._stamp) if self._stamp else None)
+            and consumed == self._offset
+            and self._file_stamp() == tuple(stamp)
+        ):
+            return False
+        self._stamp = tuple(stamp)
+        self._offset = self.journal.header_len = offset
+        self._pristine = True
+        self._save_caches(self._stamp)
+        return True
+
+    def _adopt_rebased(self):
+        """`_adopt()` the compaction the journal header records, for the file watcher."""
+        try:
+            # Not mid-compaction: the main file and the header belong together
+            with self._file_lock:
+                head, length = self.journal.header()
+                if not head or "from" not in head:
+                    return False
+                return self._adopt(head["from"], head.get("consumed"), head.get("base"), length)
+        except atomic.LockTimeout:
+            return False
+
+    def __len__(self):
+        return len(self.records)
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def _signatures(self):
+        if self._sigs is None:
+            self._sigs = {}
+            for idx, item in enumerate(self.records):
+                self._sigs.setdefault(signature(item), idx)
+        return self._sigs
+
+    def _positions(self):
+        if self._by_id is None:
+            self._by_id = {
+                item.get("id"): pos
+                for pos, item in enumerate(self.records)
+                if isinstance(item, record.Record)
+            }
+        return self._by_id
+
+    def key_of(self, record_id):
+        """Current position of the record with id `record_id`, or None if it is gone."""
+        with self._lock:
+            self.refresh()
+            return self._positions().get(record_id)
+
+    def search_texts(self):
+        """Lowercase search strings, parallel to `records`."""
+        if self._texts is None:
+            self._texts = [search_string(item) for item in self.records]
+        return self._texts
+
+    def facets(self):
+        """The `facets.FacetIndex` over `records`, built on first use."""
+        with self._lock:
+            if not self.loaded:
+                self.load()
+            if self._facets is None:
+                self._facets = facets.FacetIndex(self.records)
+            return self._facets
+
+    def values(self, field):
+        """Sorted distinct values of `field` (e.g. the software dropdown)."""
+        with self._lock:
+            return self.facets().values(field)
+
+    def page(self, offset=0, limit=None, filters=None):
+        """Up to `limit` records passing `filters`, in order, skipping the first `offset`."""
+        end = None if limit is None else offset + limit
+        with self._lock:
+            if not self.loaded:
+                self.load()
+            if not filters:
+                return self.records[offset:end]
+            picked = filter_positions(self.records, filters, self.facets())
+            return [self.records[n] for n in picked[offset:end]]
+
+    def ensure_index(self):
+        """Build the trigram index now and keep it updated from here on.
+
+        Long-lived processes (Quick Add) call this once at load; one-shot
+        callers skip it and search with a linear scan.
+        """
+        with self._lock:
+            self._index_wanted = True
+            if not self.loaded:
+                self.load()
+            if self.index is None:
+                self.index = TrigramIndex(self.search_texts())
+            if self._pristine:
+                # Share it with the other processes (see `mapped_index.py`)
+                self._save_caches(self._stamp)
+            return self.index
+
+    def _mapped_index(self):
+        """The shared `mapped_index.MappedIndex` if it is exactly what is on disk, else None."""
+        return self._caches.mapped(self._file_stamp(), self.journal.path)
+
+    def _unloaded_index(self):
+        """`_mapped_index()` for a store nothing has been loaded into yet, else None.
+
+        One-shot readers (the CLI) search the mapped file in place instead of
+        parsing the database; anything else loads as usual.
+        """
+        with self._lock:
+            return None if self.loaded else self._mapped_index()
+
+    def search(self, query, limit=None):
+        """Yield `(index, item)` for records whose search string contains `query`.
+
+        Matches are collected under the lock (writers change the lists and
+        the index in place) and handed out afterwards.
+        """
+        query = query.lower()
+        mapped = self._unloaded_index()
+        if mapped is not None:
+            yield from _substring_hits(query, mapped.records, mapped.texts, mapped, limit)
+            return
+        with self._lock:
+            if not self.loaded:
+                self.load()
+            if self.index is None and self._index_wanted:
+                self.ensure_index()
+            hits = list(
+                _substring_hits(query, self.records, self.search_texts(), self.index, limit)
+            )
+        yield from hits
+
+    def rank(self, query, limit=ranking.LIMIT, cancelled=None, filters=None, fuzzy=True):
+        """Best-first `[(index, item)]` using the shared ranking engine.
+
+        Scans refine from the candidates of a recent shorter query when the
+        new one extends it (see `ranking.Refiner`). `filters` (e.g.
+        `{"software": "Git"}`) restricts the ranking to matching records.
+        Before anything is loaded, an up-to-date mapped index is ranked in
+        place (unfiltered queries only). `fuzzy=False` skips the fuzzy tiers
+        (see `ranking.rank()`).
+        """
+        mapped = None if filters else self._unloaded_index()
+        if mapped is not None:
+            return ranking.rank(
+                query,
+                mapped.records,
+                limit,
+                mapped.texts,
+                narrow=mapped.candidates,
+                cancelled=cancelled,
+                fuzzy=fuzzy,
+            )
+        # Held throughout: writers append, pop and re-index in place, and
+        # a rank must see records, texts and index from the same moment
+        with self._lock:
+            if not self.loaded:
+                self.load()
+            records, texts = self.records, self.search_texts()
+            if filters:
+                picked = filter_positions(records, filters, self.facets())
+                return rank_filtered(
+                    query, records, texts, picked, limit, cancelled=cancelled, fuzzy=fuzzy
+                )
+            if self.index is None and self._index_wanted:
+                self.ensure_index()
+            narrow = self.index.candidates if self.index is not None else None
+            scope = partial(self._refiner.candidates, query, texts, self.version)
+            return ranking.rank(
+                query,
+                records,
+                limit,
+                texts,
+                narrow=narrow,
+                cancelled=cancelled,
+                scope=scope,
+                fuzzy=fuzzy,
+            )
+
+    def find(self, item):
+        """Index of the record sharing `item`'s signature, or None."""
+        with self._lock:
+            self.refresh()
+            return self._signatures().get(signature(item))
+
+    # --- WRITE ---
+    def _commit(self, ops):
+        """Durably journal `ops`, apply them by replaying the journal, and announce them."""
+        if not ops:
+            return
+        with self._writing():
+            self._check_readable()
+            size = len(self.records)
+            self.journal.append(ops, self._stamp, reset=not self._journal_ok)
+            if not self._journal_ok:
+                self._offset, self._journal_ok = 0, True
+            self._replay()
+        keys = []
+        for op in ops:
+            if op["op"] == "add":
+                keys.append(size)
+                size += 1
+            else:
+                keys.append(op["i"])
+                size -= op["op"] == "delete"
+        change_feed.publish(self.path, "journal", keys)
+
+    def add(self, entry):
+        return self.add_many([entry])
+
+    def _new_record(self, entry, taken):
+        """Add-op payload for `entry`: its content plus a fresh id not in `taken`."""
+        rid = record.new_id()
+        while rid in taken:
+            rid = record.new_id()
+        taken.add(rid)
+        return {**clean_changes(entry), "id": rid, "rev": 0}
+
+    def _check_rev(self, index, rev):
+        if rev is not None and self.records[index].get("rev") != rev:
+            raise Conflict(
+                f"{self.records[index].get('command', '')!r} was changed by another tool"
+            )
+
+    def add_many(self, entries):
+        with self._writing():
+            self._sync()
+            taken = set(self._positions())
+            self._commit([{"op": "add", "record": self._new_record(e, taken)} for e in entries])
+            return len(entries)
+
+    def update(self, index, changes, rev=None):
+        """Apply `changes` to the record at `index`.
+
+        With `rev`, only if the record is still at that revision; otherwise
+        `Conflict` is raised and nothing is written.
+        """
+        with self._writing():
+            self._sync()
+            self._check_rev(index, rev)
+            self._commit([{"op": "update", "i": index, "changes": clean_changes(changes)}])
+            return self.records[index]
+
+    def delete(self, index, rev=None):
+        """Delete the record at `index`; with `rev`, conditional like `update()`."""
+        with self._writing():
+            self._sync()
+            item = self.records[index]
+            self._check_rev(index, rev)
+            self._commit([{"op": "delete", "i": index}])
+            return item
+
+    def bulk_upsert(self, entries, overwrite=False):
+        """Add entries whose signature is new; existing ones are skipped or merged.
+
+        Returns `(added, matched)` where `matched` counts entries that already
+        existed (skipped, or updated in place when `overwrite` is set). All
+        resulting operations share a single journal write.
+        """
+        with self._writing():
+            self._sync()
+            sigs = self._signatures()
+            taken = set(self._positions())
+            ops, added, matched = [], 0, 0
+            seen = set()
+            for entry in entries:
+                sig = signature(entry)
+                if sig in sigs or sig in seen:
+                    matched += 1
+                    if overwrite and sig in sigs:
+                        changes = clean_changes(entry)
+                        ops.append({"op": "update", "i": sigs[sig], "changes": changes})
+                    continue
+                seen.add(sig)
+                ops.append({"op": "add", "record": self._new_record(entry, taken)})
+                added += 1
+            self._commit(ops)
+            return added, matched
+
+    def replace_all(self, records):
+        """Swap in a whole new list, discarding anything written since it was read.
+
+        When the row count is unchanged only the edited rows are journaled;
+        otherwise the file is rewritten. Editors should use `merge()`.
+        """
+        records = [clean_record(r) for r in records]
+        with self._writing():
+            self._sync()
+            if len(records) != len(self.records):
+                taken = set()
+                for item in records:
+                    if item.get("id") is None or item["id"] in taken:
+                        item.update(self._new_record(item, taken))
+                    taken.add(item["id"])
+                    item.setdefault("rev", 0)
+                self.records = record.from_dicts(records)
+                self._reset_derived()
+                self.save()
+                return
+            ops = [
+                {"op": "update", "i": idx, "changes": clean_changes(new)}
+                for idx, (old, new) in enumerate(zip(self.records, records))
+                if record.content(clean_record(old)) != record.content(new)
+            ]
+            self._commit(ops)
+
+    def merge(self, base, edited):
+        """Save an editor's work: `base` is what it loaded, `edited` what it has now.
+
+        Non-conflicting changes are journaled in one write; records changed
+        on both sides, or deleted on one and edited on the other, are left
+        as they are and reported (see `merge.plan()`). Returns
+        `{"updated", "deleted", "added", "conflicts"}`.
+        """
+        with self._writing():
+            self._sync()
+            positions = self._positions()
+
+            def current(rid):
+                pos = positions.get(rid)
+                return None if pos is None else self.records[pos]
+
+            plan = merge.plan(base, edited, current)
+            taken = set(positions)
+            ops = [
+                {"op": "update", "i": positions[rid], "changes": clean_changes(changes)}
+                for rid, changes in plan.updates
+            ]
+            # Highest position first, so no delete shifts a later one
+            for pos in sorted((positions[rid] for rid in plan.deletes), reverse=True):
+                ops.append({"op": "delete", "i": pos})
+            ops += [{"op": "add", "record": self._new_record(e, taken)} for e in plan.adds]
+            self._commit(ops)
+            return plan.summary()
+
+    def save(self):
+        """Write the in-memory model to `commands.json` and restart the journal."""
+        self._write("rewrite")
+
+    def _write(self, kind):
+        with self._writing():
+            self._settle()
+            self._check_readable()
+            records = [clean_record(r) for r in self.records]
+            atomic.replace(self.path, partial(json.dump, records, indent=4))
+            base, stamp = self._stamp, self._file_stamp()
+            self._stamp = stamp
+            self._pristine = True
+            self._save_caches(stamp)
+            consumed = self._offset if self._journal_ok else self.journal.size()
+            parent = base if kind == "compact" and self._journal_ok else None
+            self._offset = self.journal.rebase(self._stamp, consumed, parent)
+            offset = self._offset
+            self._journal_ok = True
+            # Pick up anything another process appended while we were writing
+            self._replay()
+        # A compaction only moved journal lines into the file: readers that had
+        # replayed up to `consumed` can adopt the new file without parsing it
+        change_feed.publish(
+            self.path,
+            kind,
+            base=list(base) if base else None,
+            consumed=consumed,
+            stamp=list(stamp) if stamp else None,
+            offset=offset,
+        )
+
+    def compact(self):
+        """Fold pending journal operations into the main file. Returns True if it did."""
+        with self._writing():
+            self._sync()
+            if self._journal_ok and self.journal.size() <= self.journal.header_len:
+                return False
+            self._write("compact")
+            return True
+
+    def backup(self, prefix="commands_backup", backup_dir=BACKUP_DIR):
+        """Compact, then snapshot the now complete `commands.json` into `backup_dir`."""
+        with self._writing():
+            self.compact()
+            return create_backup(self.path, prefix, backup_dir)
+
+
+def open_store(path=None, mode=None):
+    """Return the configured storage backend.
+
+    JSON (`commands.json` + journal) is the default. Setting
+    `COMMANDDB_STORAGE=sqlite` switches every tool to `data/commands.db`;
+    run `python src/sqlite_store.py migrate` once to populate it.
+    """
+    mode = (mode or STORAGE_MODE).lower()
+    if mode == "sqlite":
+        import sqlite_store
+
+        return sqlite_store.SqliteStore(path or sqlite_store.SQLITE_FILE)
+    return CommandStore(path or DB_FILE)
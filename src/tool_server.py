@@ -0,0 +1,276 @@
+"""Warm Streamlit servers for the dashboard and harvester hotkeys.
+
+The first Ctrl+Alt+V / Ctrl+Alt+H starts `streamlit run` for the script in
+the background and opens the browser once it answers; later presses only
+open the browser again. Each script gets at most one server, so a second
+press (or a server left over from an earlier service run) is reused
+instead of duplicated. The launcher records the pid and port of every
+server it spawns in `run_dir`; a listener on the port is only reused when
+that record shows it is ours, and a reused server is stopped through its
+recorded pid like one spawned by this run. Anything else on the port
+(another app's Streamlit) is left alone and ours starts on a free port
+instead.
+
+A server that has been idle for `COMMANDDB_TOOL_IDLE_MINUTES` (default 30,
+0 keeps it forever) is shut down. The scripts call `heartbeat()` on every
+rerun, i.e. on every interaction, so a page in use never counts as idle.
+"""
+
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+import webbrowser
+
+import store
+
+HOST = "127.0.0.1"
+
+# Script -> preferred port of its server; clear of Streamlit's default
+# 8501, which other apps on the machine are likely to hold
+PORTS = {"visual_db.py": 49211, "importer.py": 49212}
+
+IDLE_TIMEOUT = float(os.environ.get("COMMANDDB_TOOL_IDLE_MINUTES", "30")) * 60
+RUN_DIR = store.RUN_DIR
+
+# How long a cold start may take before the browser is opened anyway
+STARTUP_TIMEOUT = 60
+REAP_INTERVAL = 60
+
+
+def heartbeat_path(script, run_dir=RUN_DIR):
+    return os.path.join(run_dir, os.path.basename(script) + ".alive")
+
+
+def heartbeat(script, run_dir=RUN_DIR):
+    """Mark `script`'s server as in use. Never raises."""
+    path = heartbeat_path(script, run_dir)
+    try:
+        os.makedirs(run_dir, exist_ok=True)
+        with open(path, "a"):
+            pass
+        os.utime(path)
+    except OSError:
+        pass
+
+
+def server_path(script, run_dir=RUN_DIR):
+    return os.path.join(run_dir, os.path.basename(script) + ".server")
+
+
+def listening(port, timeout=0.2):
+    try:
+        with socket.create_connection((HOST, port), timeout):
+            return True
+    except OSError:
+        return False
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind((HOST, 0))
+        return sock.getsockname()[1]
+
+
+def alive(pid):
+    """True if a process with `pid` is running."""
+    if sys.platform == "win32":
+        import ctypes
+
+        kernel32 = ctypes.windll.kernel32
+        # PROCESS_QUERY_LIMITED_INFORMATION; os.kill(pid, 0) would terminate it
+        handle = kernel32.OpenProcess(0x1000, False, pid)
+        if not handle:
+            return False
+        code = ctypes.c_ulong()
+        try:
+            ok = kernel32.GetExitCodeProcess(handle, ctypes.byref(code))
+        finally:
+            kernel32.CloseHandle(handle)
+        return bool(ok) and code.value == 259  # STILL_ACTIVE
+    try:
+        os.kill(pid, 0)
+    except PermissionError:
+        return True
+    except OSError:
+        return False
+    return True
+
+
+def terminate(pid, timeout=5):
+    """Stop process `pid`, which need not be our child; killed if it outlives `timeout`."""
+    try:
+        # TerminateProcess on Windows
+        os.kill(pid, signal.SIGTERM)
+    except OSError:
+        return
+    deadline = time.monotonic() + timeout
+    while alive(pid):
+        if time.monotonic() >= deadline:
+            try:
+                os.kill(pid, getattr(signal, "SIGKILL", signal.SIGTERM))
+            except OSError:
+                pass
+            return
+        time.sleep(0.05)
+
+
+class ToolServer:
+    """One Streamlit server for `path`, started on demand and stopped when idle."""
+
+    def __init__(self, path, port, idle=IDLE_TIMEOUT, run_dir=RUN_DIR, open_url=None):
+        self.path = path
+        self.port = port
+        self.idle = idle
+        self.run_dir = run_dir
+        self.open_url = open_url or webbrowser.open
+        self.process = None
+        # A server from an earlier service run that `start()` adopted
+        self.pid = None
+        self.used = time.time()
+        self._lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"http://localhost:{self.port}"
+
+    def command(self):
+        return [
+            sys.executable,
+            "-m",
+            "streamlit",
+            "run",
+            self.path,
+            "--server.port",
+            str(self.port),
+            "--server.headless",
+            "true",
+        ]
+
+    def running(self):
+        if self.process is not None:
+            return self.process.poll() is None
+        return self.pid is not None and alive(self.pid)
+
+    def start(self):
+        """Start the server unless one already runs. Returns True if this call spawned it."""
+        with self._lock:
+            self.used = time.time()
+            if self.running():
+                return False
+            recorded = self._recorded()
+            if recorded is not None and listening(recorded[1]):
+                # Ours, left over from an earlier service run
+                self.pid, self.port = recorded
+                return False
+            if listening(self.port):
+                # Someone else's server; never hand the user their page
+                self.port = free_port()
+            self.process = subprocess.Popen(self.command(), cwd=os.path.dirname(self.path))
+            self._record()
+            return True
+
+    def _recorded(self):
+        """`(pid, port)` of the server recorded for this script if it still runs, else None."""
+        try:
+            with open(server_path(self.path, self.run_dir), encoding="utf-8") as f:
+                info = json.load(f)
+            pid, port = info["pid"], info["port"]
+        except (OSError, ValueError, TypeError, KeyError):
+            return None
+        if not isinstance(pid, int) or not isinstance(port, int) or not alive(pid):
+            return None
+        return pid, port
+
+    def _record(self):
+        try:
+            os.makedirs(self.run_dir, exist_ok=True)
+            with open(server_path(self.path, self.run_dir), "w", encoding="utf-8") as f:
+                json.dump({"pid": self.process.pid, "port": self.port}, f)
+        except OSError:
+            pass
+
+    def open(self):
+        """Show the page, starting the server first if needed (the wait runs off-thread)."""
+        if not self.start():
+            self.open_url(self.url)
+            return
+        threading.Thread(target=self._open_when_ready, daemon=True).start()
+
+    def _open_when_ready(self):
+        deadline = time.monotonic() + STARTUP_TIMEOUT
+        while time.monotonic() < deadline and self.running() and not listening(self.port):
+            time.sleep(0.2)
+        if self.running():
+            self.open_url(self.url)
+
+    def last_used(self):
+        try:
+            return max(self.used, os.path.getmtime(heartbeat_path(self.path, self.run_dir)))
+        except OSError:
+            return self.used
+
+    def reap(self, now=None):
+        """Stop the server if it has been idle too long. Returns True if it was stopped."""
+        if not self.idle or not self.running():
+            return False
+        if (now or time.time()) - self.last_used() < self.idle:
+            return False
+        self.stop()
+        return True
+
+    def stop(self):
+        with self._lock:
+            if self.running():
+                if self.process is not None:
+                    self.process.terminate()
+                    try:
+                        self.process.wait(5)
+                    except subprocess.TimeoutExpired:
+                        self.process.kill()
+                else:
+                    terminate(self.pid)
+                try:
+                    os.remove(server_path(self.path, self.run_dir))
+                except OSError:
+                    pass
+            self.process = None
+            self.pid = None
+
+
+class ToolServers:
+    """The servers for every script in `ports`, plus a thread reaping idle ones."""
+
+    def __init__(self, src_dir, ports=None, **options):
+        self.servers = {
+            script: ToolServer(os.path.join(src_dir, script), port, **options)
+            for script, port in (ports or PORTS).items()
+        }
+        self._reaper = None
+        self._stop = threading.Event()
+
+    def __getitem__(self, script):
+        return self.servers[script]
+
+    def open(self, script):
+        self.servers[script].open()
+
+    def start_reaper(self, interval=REAP_INTERVAL):
+        if self._reaper is None:
+            self._reaper = threading.Thread(target=self._reap, args=(interval,), daemon=True)
+            self._reaper.start()
+        return self
+
+    def _reap(self, interval):
+        while not self._stop.wait(interval):
+            for server in self.servers.values():
+                server.reap()
+
+    def stop(self):
+        self._stop.set()
+        for server in self.servers.values():
+            server.stop()
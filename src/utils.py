@@ -3,11 +3,6 @@ import time
 
 import keyboard
 
-try:
-    import pygetwindow as gw
-except ImportError:
-    gw = None
-
 PLACEHOLDERS = ["{1}", "{arg}", "%1%", "%arg%"]
 
 
@@ -96,12 +91,22 @@ def run_workflow(workflow_str):
     return True
 
 
+def window_manager():
+    """`pygetwindow`, imported on first use since only `run_hotkey` needs it. None if absent."""
+    try:
+        import pygetwindow
+    except ImportError:
+        return None
+    return pygetwindow
+
+
 def run_hotkey(keys, software="General"):
     # Give time for the QuickAdd window to close and focus to return
     time.sleep(0.3)
 
     # Try to focus the window if software is specified (skip Windows OS)
-    if software and software not in ["General", "Windows"] and gw:
+    gw = window_manager() if software and software not in ["General", "Windows"] else None
+    if gw:
         try:
             windows = gw.getWindowsWithTitle(software)
             if windows:
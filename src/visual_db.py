@@ -9,21 +9,25 @@ try:
     import pandas as pd
 except Exception:
     pd = None
-import os
-import shutil
 import time
-from datetime import datetime
 
 # --- IMPORT SHARED BRAIN ---
+import query_api
+import ranking
+import record
+import store
+import tool_server
 import utils
 
 # --- CONFIGURATION ---
-PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-DB_FILE = os.path.join(PROJECT_ROOT, "data", "commands.json")
-BACKUP_DIR = os.path.join(PROJECT_ROOT, "data", "backups")
+PROJECT_ROOT = store.PROJECT_ROOT
+DB_FILE = store.DB_FILE
+BACKUP_DIR = store.BACKUP_DIR
 
 # --- PAGE CONFIG ---
 st.set_page_config(page_title="CommandDB", layout="wide", page_icon="💻")
+# Every rerun is an interaction; keeps Quick Add from idling the server out
+tool_server.heartbeat(__file__)
 
 
 # --- HELPERS ---
@@ -46,44 +50,72 @@ def execute_command_wrapper(cmd):
 
 
 def create_backup():
-    if not os.path.exists(BACKUP_DIR):
-        os.makedirs(BACKUP_DIR)
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     try:
-        shutil.copy(DB_FILE, os.path.join(BACKUP_DIR, f"commands_backup_{timestamp}.json"))
-        return True
+        return get_store().backup("commands_backup", BACKUP_DIR) is not None
     except Exception:
         return False
 
 
-@st.cache_data(ttl=60)
-def load_data():
-    if not os.path.exists(DB_FILE):
-        return []
-    with open(DB_FILE, "r") as f:
-        data = json.load(f)
+@st.cache_resource
+def get_store():
+    # The resident Quick Add daemon already holds the data warm
+    db = query_api.connect() or store.open_store()
+    db.start_compactor()
+    # Apply other tools' writes as they are announced (see change_feed.py)
+    db.follow()
+    return db
+
+
+def data_version():
+    db = get_store()
+    # Cheap when nothing changed; replays only new journal lines otherwise
+    db.refresh()
+    return db.version
+
+
+@st.cache_data
+def load_data(version):
+    """`version` keys the cache, so it is only rebuilt after a change."""
+    # Paged (see `store.walk`), so the daemon never sends the table in one reply
+    data = [dict(item) for item in store.read_all(get_store())]
     for item in data:
         if "software" not in item:
             item["software"] = "General"
     return data
 
 
-def save_data(df_to_save):
+def table_rows(frame):
+    """`frame` as plain records; ids stay exact integers (added rows make the column float)."""
+    frame = frame.astype({col: "Int64" for col in record.META if col in frame})
+    return json.loads(frame.to_json(orient="records"))
+
+
+def save_data(df_to_save, base_df):
+    """Merge the edits (`base_df` is the table as loaded) into the live database.
+
+    Changes other tools made meanwhile are kept; rows both sides changed
+    are left alone and listed.
+    """
     create_backup()
     try:
-        json_str = df_to_save.to_json(orient="records", indent=4)
-        parsed = json.loads(json_str)
-        with open(DB_FILE, "w") as f:
-            json.dump(parsed, f, indent=4)
+        result = get_store().merge(table_rows(base_df), table_rows(df_to_save))
         st.cache_data.clear()
-        st.success("✅ Saved! (Backup created)")
+        conflicts = result["conflicts"]
+        if conflicts:
+            st.warning(
+                f"⚠️ Saved, except {len(conflicts)} command(s) another tool changed meanwhile: "
+                + ", ".join(f"`{c['command']}` ({c['reason']})" for c in conflicts)
+                + ". Reload to see their version."
+            )
+        else:
+            st.success("✅ Saved! (Backup created)")
     except Exception as e:
         st.error(f"Error: {e}")
 
 
 # --- APP START ---
 st.title("💻 Command Manager")
-raw_data = load_data()
+raw_data = load_data(data_version())
 if not raw_data:
     st.warning("No commands found.")
     st.stop()
@@ -113,12 +145,11 @@ search_term = st.text_input("Search (Command, Desc, or Tags)...", "")
 mask = (df["software"].isin(selected_software)) & (df["category"].isin(selected_category))
 filtered_df = df[mask]
 if search_term:
-    search_mask = (
-        filtered_df.astype(str)
-        .apply(lambda x: x.str.contains(search_term, case=False, na=False))
-        .any(axis=1)
+    # Best matches first; fuzzy and typo-tolerant like the other tools
+    ranked = ranking.rank(
+        search_term, filtered_df.to_dict("records"), None, keys=list(filtered_df.index)
     )
-    filtered_df = filtered_df[search_mask]
+    filtered_df = filtered_df.loc[[key for key, _ in ranked]]
 
 # --- TABS ---
 tab1, tab2, tab3 = st.tabs(["📝 Edit Database", "🃏 Card View", "🏷️ Auto-Tagger"])
@@ -157,14 +188,15 @@ with tab1:
                 required=True,
             ),
             "tags": st.column_config.ListColumn("Tags", width="large"),
+            # Used to match rows on save; not editable
+            "id": None,
+            "rev": None,
         },
         key="editor",
     )
     if st.button("💾 Save Changes", type="primary"):
-        if len(filtered_df) != len(df):
-            st.error("⚠️ Clear filters before saving.")
-        else:
-            save_data(edited_df)
+        # Rows are matched by id, so a filtered view saves only what it shows
+        save_data(edited_df, filtered_df)
 
 # --- TAB 2: CARDS ---
 with tab2:
@@ -708,13 +740,14 @@ with tab3:
 
             if st.button("✅ Confirm & Apply Changes"):
                 updates_count = 0
+                tagged = df.copy()
                 for change in changes:
                     idx = change["Index"]
                     new_tag_list = change["New Tag Set"]
-                    df.at[idx, "tags"] = new_tag_list
+                    tagged.at[idx, "tags"] = new_tag_list
                     updates_count += 1
 
-                save_data(df)
+                save_data(tagged, df)
                 st.success(f"Successfully updated {updates_count} commands!")
                 st.session_state.preview_data = None  # Reset
                 time.sleep(1.5)
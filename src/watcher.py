@@ -0,0 +1,154 @@
+"""Background change notifications for the database files.
+
+`FileWatcher` calls `on_change()` from its own thread shortly after any of
+the watched files is written, replaced or removed. On Linux it listens to
+inotify events on the parent directories (renames included, so temp file +
+`os.replace` saves are seen); elsewhere, or if inotify is unavailable, it
+falls back to polling `os.stat`.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+
+# Seconds between stat polls in the fallback backend
+POLL_INTERVAL = 0.5
+
+# Quiet period that coalesces a burst of events into one callback
+SETTLE = 0.05
+
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+_EVENT = struct.Struct("iIII")
+
+
+def _stamp(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _inotify():
+    """`(libc, fd)` for a fresh inotify instance, or None if unsupported."""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+    except (OSError, AttributeError):
+        return None
+    return (libc, fd) if fd >= 0 else None
+
+
+class FileWatcher:
+    """Watch `paths` and call `on_change()` on a daemon thread when they change.
+
+    With `prime` set, `on_change()` also runs once as soon as the thread
+    starts, which lets callers do their first load off the UI thread too.
+    """
+
+    def __init__(self, paths, on_change, interval=POLL_INTERVAL, prime=False, backend=None):
+        self.paths = [os.path.abspath(p) for p in paths]
+        self.on_change = on_change
+        self.interval = interval
+        self.prime = prime
+        self._stop = threading.Event()
+        self._thread = None
+        self._inotify = _inotify() if backend in (None, "inotify") else None
+        self.backend = "inotify" if self._inotify else "poll"
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _notify(self):
+        try:
+            self.on_change()
+        except Exception:
+            # A failed reload is retried on the next change
+            pass
+
+    def _run(self):
+        # Each backend primes only once it is watching, so nothing slips in between
+        if self._inotify:
+            self._watch_inotify()
+        else:
+            self._poll()
+
+    # --- BACKENDS ---
+    def _poll(self):
+        seen = [_stamp(p) for p in self.paths]
+        if self.prime:
+            self._notify()
+        while not self._stop.wait(self.interval):
+            now = [_stamp(p) for p in self.paths]
+            if now != seen:
+                seen = now
+                self._notify()
+
+    def _watch_inotify(self):
+        libc, fd = self._inotify
+        folders, wanted = set(), set()
+        try:
+            for path in self.paths:
+                folder, name = os.path.split(path)
+                wanted.add(name)
+                if folder in folders:
+                    continue
+                folders.add(folder)
+                os.makedirs(folder, exist_ok=True)
+                if libc.inotify_add_watch(fd, os.fsencode(folder), WATCH_MASK) < 0:
+                    self.backend = "poll"
+                    return self._poll()
+            if self.prime:
+                self._notify()
+            while not self._stop.is_set():
+                if not self._wait(fd, self.interval):
+                    continue
+                hit = self._drain(fd, wanted)
+                # Let a burst (write + rename, several journal lines) finish first
+                while self._wait(fd, SETTLE):
+                    hit = self._drain(fd, wanted) or hit
+                if hit:
+                    self._notify()
+        finally:
+            os.close(fd)
+
+    @staticmethod
+    def _wait(fd, timeout):
+        return bool(select.select([fd], [], [], timeout)[0])
+
+    @staticmethod
+    def _drain(fd, wanted):
+        """Read pending events. Returns True if any concerned a watched file."""
+        hit = False
+        try:
+            data = os.read(fd, 64 * 1024)
+        except BlockingIOError:
+            return False
+        pos = 0
+        while pos + _EVENT.size <= len(data):
+            _, _, _, length = _EVENT.unpack_from(data, pos)
+            pos += _EVENT.size
+            name = data[pos : pos + length].rstrip(b"\0").decode(errors="replace")
+            pos += length
+            hit = hit or name in wanted
+        return hit
@@ -0,0 +1,124 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+
+import atomic
+import store
+from store import CommandStore
+
+SRC_DIR = os.path.dirname(os.path.abspath(store.__file__))
+
+
+def run_python(code, *args):
+    return subprocess.run(
+        [sys.executable, "-c", code, *args],
+        cwd=SRC_DIR,
+        capture_output=True,
+        text=True,
+        timeout=60,
+    )
+
+
+def test_replace_is_all_or_nothing(tmp_path):
+    path = tmp_path / "commands.json"
+    path.write_text("old")
+    os.chmod(path, 0o640)
+
+    def fail(f):
+        f.write("partial")
+        raise RuntimeError("disk full")
+
+    with pytest.raises(RuntimeError):
+        atomic.replace(str(path), fail)
+    assert path.read_text() == "old"
+    assert os.listdir(tmp_path) == ["commands.json"]
+
+    atomic.replace(str(path), lambda f: f.write("new"))
+    assert path.read_text() == "new"
+    assert os.listdir(tmp_path) == ["commands.json"]
+    if os.name == "posix":
+        assert os.stat(path).st_mode & 0o777 == 0o640
+
+
+def test_file_lock_is_reentrant_and_excludes_other_processes(tmp_path):
+    path = str(tmp_path / "commands.json")
+    probe = (
+        "import sys, atomic\n"
+        "try:\n"
+        "    with atomic.FileLock(sys.argv[1], timeout=0.2):\n"
+        "        print('acquired')\n"
+        "except atomic.LockTimeout:\n"
+        "    print('busy')\n"
+    )
+    lock = atomic.FileLock(path)
+    with lock:
+        with lock:
+            assert run_python(probe, path).stdout.strip() == "busy"
+        assert run_python(probe, path).stdout.strip() == "busy"
+    assert run_python(probe, path).stdout.strip() == "acquired"
+
+
+def test_file_lock_serialises_threads(tmp_path):
+    lock = atomic.FileLock(str(tmp_path / "x"))
+    inside, overlaps = [], []
+
+    def work():
+        for _ in range(50):
+            with lock:
+                inside.append(1)
+                overlaps.append(len(inside))
+                inside.pop()
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert max(overlaps) == 1
+
+
+def test_concurrent_writers_do_not_lose_adds(tmp_path):
+    db_file = tmp_path / "commands.json"
+    db_file.write_text("[]")
+    writer = (
+        "import sys\n"
+        "from store import CommandStore\n"
+        "db = CommandStore(sys.argv[1])\n"
+        "db.load()\n"
+        "for n in range(40):\n"
+        "    db.add({'command': f'{sys.argv[2]} {n}', 'software': 'Git'})\n"
+        "    if n % 10 == 9:\n"
+        "        db.compact()\n"
+    )
+    procs = [
+        subprocess.Popen([sys.executable, "-c", writer, str(db_file), name], cwd=SRC_DIR)
+        for name in ("a", "b", "c")
+    ]
+    assert [p.wait(60) for p in procs] == [0, 0, 0]
+
+    commands = [item["command"] for item in CommandStore(str(db_file)).load()]
+    assert sorted(commands) == sorted(f"{name} {n}" for name in "abc" for n in range(40))
+
+
+def test_unreadable_database_is_never_overwritten(tmp_path):
+    db_file = tmp_path / "commands.json"
+    db_file.write_text('[{"command": "git status"}, {"command": ')
+    db = CommandStore(str(db_file))
+    assert db.load() == []
+    assert db.load_error is not None
+
+    with pytest.raises(store.UnreadableDatabase):
+        db.add({"command": "git push"})
+    with pytest.raises(store.UnreadableDatabase):
+        db.save()
+    assert db_file.read_text() == '[{"command": "git status"}, {"command": '
+
+    # Once the file is repaired the store reads and writes it again
+    db_file.write_text(json.dumps([{"command": "git status"}]))
+    db.add({"command": "git push"})
+    assert db.load_error is None
+    assert [i["command"] for i in db.records] == ["git status", "git push"]
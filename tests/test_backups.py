@@ -0,0 +1,195 @@
+import json
+import os
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+import backups
+from store import CommandStore
+
+
+def make_items(n, desc="desc"):
+    return [
+        {
+            "command": f"cmd {i}",
+            "software": "Git",
+            "description": f"{desc} {i}",
+            "category": "CMD",
+            "tags": ["a", "b"],
+        }
+        for i in range(n)
+    ]
+
+
+def write_db(path, items):
+    with open(path, "w") as f:
+        json.dump(items, f, indent=4)
+
+
+def object_count(root):
+    return sum(len(files) for _, _, files in os.walk(root / "objects"))
+
+
+def test_split_covers_data_and_resyncs_after_an_edit():
+    data = json.dumps(make_items(20_000), indent=4).encode()
+    spans = backups.split(data)
+    assert spans[0][0] == 0 and spans[-1][1] == len(data)
+    assert all(a[1] == b[0] for a, b in zip(spans, spans[1:]))
+    assert all(end - start <= backups.MAX_CHUNK for start, end in spans)
+
+    items = make_items(20_000)
+    items.insert(10, {"command": "inserted"})
+    edited = json.dumps(items, indent=4).encode()
+    before = {data[s:e] for s, e in spans}
+    after = [edited[s:e] for s, e in backups.split(edited)]
+    # Only the chunk holding the insert is new
+    assert sum(chunk not in before for chunk in after) == 1
+
+
+def test_snapshot_restore_round_trip(tmp_path):
+    db_file = tmp_path / "commands.json"
+    write_db(db_file, make_items(5000))
+    original = db_file.read_bytes()
+    store = backups.BackupStore(str(tmp_path / "backups"))
+
+    snap_id = store.snapshot(str(db_file), "commands_backup")
+    write_db(db_file, [])
+    assert store.restore(snap_id, str(db_file)) == len(original)
+    assert db_file.read_bytes() == original
+    assert store.snapshot(str(tmp_path / "missing.json")) is None
+
+
+def test_unchanged_chunks_are_stored_once(tmp_path):
+    db_file = tmp_path / "commands.json"
+    items = make_items(20_000)
+    write_db(db_file, items)
+    root = tmp_path / "backups"
+    store = backups.BackupStore(str(root))
+
+    first = store.snapshot(str(db_file))
+    stored = object_count(root)
+    assert store.snapshot(str(db_file)) == first  # identical file: no new snapshot
+
+    items[15_000]["description"] = "changed"
+    write_db(db_file, items)
+    second = store.snapshot(str(db_file))
+    assert second != first
+    assert object_count(root) - stored <= 2
+    assert [s["id"] for s in store.list()] == [first, second]
+    assert json.loads(store.read(first))[15_000]["description"] == "desc 15000"
+    assert json.loads(store.read(second))[15_000]["description"] == "changed"
+
+
+def test_same_second_backups_do_not_overwrite(tmp_path):
+    db_file = tmp_path / "commands.json"
+    store = backups.BackupStore(str(tmp_path / "backups"))
+    ids = []
+    for n in range(3):
+        write_db(db_file, make_items(n + 1))
+        ids.append(store.snapshot(str(db_file)))
+    assert len(set(ids)) == 3
+    assert [len(json.loads(store.read(i))) for i in ids] == [1, 2, 3]
+
+
+def test_damaged_chunk_is_detected(tmp_path):
+    db_file = tmp_path / "commands.json"
+    write_db(db_file, make_items(100))
+    root = tmp_path / "backups"
+    store = backups.BackupStore(str(root))
+    snap_id = store.snapshot(str(db_file))
+    digest = store.manifest(snap_id)["chunks"][0]
+    with open(store._object_path(digest), "wb") as f:
+        f.write(b"garbage")
+    with pytest.raises(backups.BackupError):
+        store.restore(snap_id, str(tmp_path / "restored.json"))
+    assert not (tmp_path / "restored.json").exists()
+    with pytest.raises(backups.BackupError):
+        store.read("no-such-snapshot")
+
+
+def test_keep_thins_by_hour_day_and_week():
+    now = datetime(2026, 10, 17, 12, 0)
+    # One snapshot every 10 minutes for 60 days
+    snaps = [
+        {"id": n, "created": (now - timedelta(minutes=10 * n)).timestamp()}
+        for n in range(6 * 24 * 60)
+    ]
+    policy = {"last": 3, "hourly": 5, "daily": 4, "weekly": 2}
+    kept = sorted(s["id"] for s in backups.keep(snaps, policy))
+    # Newest 3, newest of the latest 5 hours / 4 days / 2 weeks (overlapping)
+    assert kept[:3] == [0, 1, 2]
+    assert len(kept) <= 3 + 5 + 4 + 2
+    hours = {datetime.fromtimestamp(snaps[i]["created"]).strftime("%d %H") for i in kept}
+    assert len(hours) >= 5
+    assert backups.keep(snaps, {}) == []
+
+
+def test_prune_collects_unreferenced_chunks(tmp_path):
+    db_file = tmp_path / "commands.json"
+    root = tmp_path / "backups"
+    store = backups.BackupStore(str(root))
+    for n in range(4):
+        write_db(db_file, make_items(200, desc=f"version {n}"))
+        store.snapshot(str(db_file))
+    survivor = store.list()[-1]["id"]
+
+    # Recently written chunks are protected...
+    assert store.prune({"last": 1}) != []
+    assert [s["id"] for s in store.list()] == [survivor]
+    assert object_count(root) > len(store.manifest(survivor)["chunks"])
+
+    # ...until they are older than the grace period
+    old = time.time() - 2 * backups.GRACE
+    for folder, _, files in os.walk(root / "objects"):
+        for name in files:
+            os.utime(os.path.join(folder, name), (old, old))
+    store.collect()
+    assert object_count(root) == len(set(store.manifest(survivor)["chunks"]))
+    assert json.loads(store.read(survivor))[0]["description"] == "version 3 0"
+
+
+def test_store_backup_writes_a_snapshot(tmp_path):
+    db_file = tmp_path / "commands.json"
+    write_db(db_file, make_items(3))
+    db = CommandStore(str(db_file))
+    db.load()
+    db.add({"command": "git push", "software": "Git"})
+
+    snap_id = db.backup("commands_backup", str(tmp_path / "backups"))
+    restored = backups.BackupStore(str(tmp_path / "backups")).read(snap_id)
+    assert [i["command"] for i in json.loads(restored)][-1] == "git push"
+
+
+def test_legacy_copies_become_dated_snapshots(tmp_path):
+    root = tmp_path / "backups"
+    root.mkdir()
+    write_db(root / "commands_backup_20240101_120000.json", make_items(3))
+    write_db(root / "backup_quick_20240301_080000.json", make_items(4))
+    write_db(root / "notes.json", make_items(5))
+    store = backups.BackupStore(str(root))
+
+    assert len(store.legacy()) == 3
+    assert len(store.migrate()) == 3
+    assert store.legacy() == [] and not (root / "notes.json").exists()
+    snaps = store.list()
+    assert [s["label"] for s in snaps] == ["commands_backup", "backup_quick", "notes"]
+    assert snaps[0]["created"] == datetime(2024, 1, 1, 12).timestamp()
+    assert json.loads(store.read(snaps[1]["id"])) == make_items(4)
+
+
+def test_restore_keeps_journaled_edits_in_the_before_snapshot(tmp_path, monkeypatch):
+    monkeypatch.setattr(backups.store, "BACKUP_DIR", str(tmp_path / "backups"))
+    db_file = tmp_path / "commands.json"
+    write_db(db_file, make_items(3))
+    old = backups.BackupStore(str(tmp_path / "backups")).snapshot(str(db_file))
+    db = CommandStore(str(db_file))
+    db.load()
+    db.add({"command": "git push", "software": "Git"})  # journaled, not yet compacted
+
+    assert backups.main(["restore", old, str(db_file)]) == 0
+    snaps = backups.BackupStore(str(tmp_path / "backups")).list()
+    before = backups.BackupStore(str(tmp_path / "backups")).read(snaps[-1]["id"])
+    assert snaps[-1]["label"] == "before_restore"
+    assert json.loads(before)[-1]["command"] == "git push"
+    assert json.loads(db_file.read_bytes()) == make_items(3)
@@ -0,0 +1,24 @@
+from card_grid import HEADER_HEIGHT, ROW_HEIGHT, layout, visible
+
+
+def test_layout_flattens_groups_into_rows():
+    rows, tops, height = layout([("Git", ["a", "b", "c"]), ("Docker", ["d"])], columns=2)
+    assert rows == [
+        ("Git", None),
+        (None, ["a", "b"]),
+        (None, ["c"]),
+        ("Docker", None),
+        (None, ["d"]),
+    ]
+    assert tops[:3] == [0, HEADER_HEIGHT, HEADER_HEIGHT + ROW_HEIGHT]
+    assert height == 2 * HEADER_HEIGHT + 3 * ROW_HEIGHT
+
+
+def test_visible_rows_do_not_grow_with_the_data():
+    rows, tops, height = layout([("All", list(range(10_000)))])
+    assert len(rows) == 5001
+    band = visible(tops, 0, 400, overscan=0)
+    assert band == range(0, 5)
+    middle = visible(tops, height / 2, height / 2 + 400, overscan=1)
+    assert len(middle) <= 7 and middle.start > 2000
+    assert visible(tops, height - 10, height + 400, overscan=0) == range(5000, 5001)
@@ -0,0 +1,76 @@
+import json
+import socket
+import threading
+import time
+
+import pytest
+
+import change_feed
+from store import CommandStore
+
+
+@pytest.fixture
+def hub(monkeypatch):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(("127.0.0.1", 0))
+    monkeypatch.setattr(change_feed, "PORT", sock.getsockname()[1])
+    hub = change_feed.Hub(sock).start()
+    yield hub
+    sock.close()
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def make_item(cmd):
+    return {"command": cmd, "software": "Git", "description": "", "category": "CMD", "tags": []}
+
+
+def test_follower_applies_deltas_and_adopts_compaction(tmp_path, hub):
+    db_file = tmp_path / "commands.json"
+    db_file.write_text(json.dumps([make_item("git status")]))
+    writer, reader = CommandStore(str(db_file)), CommandStore(str(db_file))
+    writer.load()
+    reader.load()
+
+    applied = threading.Event()
+    reader.follow(applied.set)
+    assert wait_for(lambda: hub.subscribers)
+
+    writer.add(make_item("git log"))
+    assert applied.wait(5)
+    assert [i["command"] for i in reader.records] == ["git status", "git log"]
+
+    # The compacted file holds exactly what the reader has: no re-parse
+    loads = []
+    reader.load = lambda: loads.append(1)
+    stamp = reader._stamp
+    writer.compact()
+    assert wait_for(lambda: reader._stamp != stamp)
+    assert loads == []
+    assert reader.is_stale() is False
+
+    applied.clear()
+    writer.add(make_item("git push"))
+    assert applied.wait(5)
+    assert [i["command"] for i in reader.records] == ["git status", "git log", "git push"]
+
+
+def test_subscriber_reports_gaps():
+    seen = []
+    sub = change_feed.Subscriber(seen.append)
+    try:
+        sub.handle({"op": "hello", "seq": 3})
+        sub.handle({"op": "change", "seq": 4, "kind": "journal"})
+        sub.handle({"op": "change", "seq": 6, "kind": "journal"})
+        # A restarted hub starts counting again
+        sub.handle({"op": "hello", "seq": 0})
+    finally:
+        sub.sock.close()
+    assert [m["kind"] for m in seen] == ["journal", "gap", "journal", "gap"]
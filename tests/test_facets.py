@@ -0,0 +1,72 @@
+import json
+
+from facets import FacetIndex
+from store import CommandStore, filter_positions, matches
+
+
+def make_item(cmd, software="Git", category="CMD", tags=()):
+    return {
+        "command": cmd,
+        "software": software,
+        "description": "",
+        "category": category,
+        "tags": list(tags),
+    }
+
+
+ITEMS = [
+    make_item("git status", tags=["state"]),
+    make_item("Ctrl+Shift+P", software="VS Code", category="Hotkey", tags=["palette"]),
+    make_item("git push", tags=["remote", "state"]),
+    {"command": "dir", "category": "CMD"},
+]
+
+
+def scan(items, filters):
+    return [n for n, item in enumerate(items) if matches(item, filters)]
+
+
+def test_postings_answer_filters_like_a_scan():
+    index = FacetIndex(ITEMS)
+    for filters in [
+        {"software": "git"},
+        {"software": "GIT", "category": "cmd"},
+        {"tags": "state"},
+        {"software": "General"},
+        {"category": "Hotkey", "tags": "state"},
+        {"software": "nope"},
+        {},
+    ]:
+        assert index.positions(filters) == scan(ITEMS, filters), filters
+    assert index.positions({"description": ""}) is None
+    assert index.values("software") == ["General", "Git", "VS Code"]
+
+
+def test_updates_refile_the_record():
+    items = [dict(i) for i in ITEMS]
+    index = FacetIndex(items)
+    old = dict(items[0])
+    items[0].update(software="Docker", tags=["remote"])
+    index.update(0, old, items[0])
+    assert index.positions({"software": "docker"}) == [0]
+    assert index.positions({"tags": "remote"}) == [0, 2]
+    assert index.positions({"tags": "state"}) == [2]
+    assert index.values("software") == ["Docker", "General", "Git", "VS Code"]
+
+
+def test_store_keeps_facets_in_step_with_writes(tmp_path):
+    db_file = tmp_path / "commands.json"
+    db_file.write_text(json.dumps(ITEMS))
+    db = CommandStore(str(db_file))
+    assert db.values("category") == ["CMD", "Hotkey"]
+
+    db.add(make_item("docker ps", software="Docker"))
+    db.update(1, {"software": "Git"})
+    db.delete(0)
+    for filters in [{"software": "git"}, {"software": "docker"}, {"tags": "state"}]:
+        assert filter_positions(db.records, filters, db.facets()) == scan(db.records, filters)
+    assert db.values("software") == ["Docker", "General", "Git"]
+    assert [i["command"] for _, i in db.rank("", None, filters={"software": "git"})] == [
+        "Ctrl+Shift+P",
+        "git push",
+    ]
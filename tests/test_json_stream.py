@@ -0,0 +1,56 @@
+import io
+import json
+import threading
+
+import pytest
+
+import json_stream
+import store
+from store import CommandStore
+
+
+@pytest.mark.parametrize(
+    "text",
+    ["[]", " [ 1 , 22,333 ]\n", '[{"a": [1, {"b": "]"}]}, "x,y", null, true]', "[\n]"],
+)
+@pytest.mark.parametrize("chunk", [1, 2, 7, 4096])
+def test_iter_array_matches_json_loads(text, chunk):
+    assert list(json_stream.iter_array(io.StringIO(text), chunk)) == json.loads(text)
+
+
+@pytest.mark.parametrize("text", ['{"a": 1}', "[1, 2", "[1 2]", '[{"a": ]', ""])
+def test_iter_array_rejects_bad_input(text):
+    with pytest.raises(json_stream.StreamError):
+        list(json_stream.iter_array(io.StringIO(text), 3))
+
+
+def test_iter_batches():
+    batches = list(json_stream.iter_batches(io.StringIO(json.dumps(list(range(5)))), 2))
+    assert batches == [[0, 1], [2, 3], [4]]
+
+
+def test_stream_load_serves_a_growing_prefix(tmp_path, monkeypatch):
+    monkeypatch.setattr(store, "STREAM_BATCH", 2)
+    db_file = tmp_path / "commands.json"
+    db_file.write_text(json.dumps([{"command": f"cmd {n}"} for n in range(7)]))
+    # A journaled write is replayed once the whole file is in
+    CommandStore(str(db_file)).add({"command": "cmd journaled"})
+
+    db = CommandStore(str(db_file))
+    seen, writer = [], []
+
+    def progress():
+        seen.append(len(db.rank("cmd", None)))
+        if not writer:
+            thread = threading.Thread(target=db.add, args=({"command": "cmd late"},))
+            thread.start()
+            writer.append(thread)
+            thread.join(0.2)
+            # Writers wait for the complete file and journal
+            assert thread.is_alive()
+
+    assert db.stream_load(progress, index=True)
+    writer[0].join(5)
+    assert seen == [2, 4, 8]
+    assert [i["command"] for i in db.records][-2:] == ["cmd journaled", "cmd late"]
+    assert db.index is not None and len(db.search_texts()) == 9
@@ -0,0 +1,26 @@
+import time
+
+import latency
+
+
+def test_trace_logs_checkpoints_and_flags_budget(tmp_path):
+    path = str(tmp_path / "logs" / "latency.log")
+    logger = latency.get_logger(path)
+
+    trace = latency.LatencyTrace(logger, budget_ms=10_000)
+    trace.begin()
+    trace.mark("visible")
+    trace.mark("first paint")
+    assert trace.finish() < 10_000
+    assert trace.finish() is None
+
+    slow = latency.LatencyTrace(logger, budget_ms=0)
+    slow.begin(time.perf_counter() - 0.2)
+    slow.mark("visible")
+    assert slow.finish() >= 200
+
+    for handler in logger.handlers:
+        handler.flush()
+    lines = open(path, encoding="utf-8").read().splitlines()
+    assert "INFO visible" in lines[0] and "first paint" in lines[0]
+    assert "WARNING visible" in lines[1] and "over 0 ms budget" in lines[1]
@@ -0,0 +1,115 @@
+import json
+import threading
+
+import pytest
+
+import json_stream
+import mapped_index
+import snapshot
+from search_index import TrigramIndex
+from store import CommandStore
+
+
+def make_item(cmd, soft="Git", desc="", cat="CMD", tags=None):
+    return {
+        "command": cmd,
+        "software": soft,
+        "description": desc,
+        "category": cat,
+        "tags": tags or [],
+    }
+
+
+ITEMS = [
+    make_item("git status", desc="Show the working tree", tags=["vcs"]),
+    make_item("git log", desc="Show history"),
+    make_item("docker ps", soft="Docker", desc="List containers"),
+    make_item("ls"),
+    dict(make_item("git push", desc="Upload"), url="https://git-scm.com"),
+]
+QUERIES = ["git", "show", "docker", "xyz", "ls", "git s", "upload", "vcs", "stat"]
+
+
+@pytest.fixture(autouse=True)
+def small_files(monkeypatch):
+    monkeypatch.setattr(snapshot, "ENABLED", True)
+    monkeypatch.setattr(snapshot, "MIN_SIZE", 0)
+
+
+def wait_for_caches():
+    for thread in threading.enumerate():
+        if thread.name == "snapshot":
+            thread.join()
+
+
+def same_candidates(mapped, index, query):
+    found = mapped.candidates(query)
+    if len(query) < 3:
+        # Short queries scan (the file keeps no 1- and 2-character lookup)
+        return found is None
+    return list(found) == list(index.candidates(query))
+
+
+def no_json(monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("parsed the JSON file")
+
+    monkeypatch.setattr(json_stream, "iter_batches", fail)
+
+
+@pytest.fixture
+def published(tmp_path):
+    """A database and the store (standing in for Quick Add) that published its index."""
+    db_file = tmp_path / "commands.json"
+    db_file.write_text(json.dumps(ITEMS))
+    db = CommandStore(str(db_file))
+    db.ensure_index()
+    wait_for_caches()
+    return str(db_file), db
+
+
+def test_index_file_matches_the_store(published):
+    path, db = published
+    mapped = mapped_index.open_index(mapped_index.index_path(path), db._stamp)
+    assert list(mapped.texts) == db.search_texts()
+    assert list(mapped.records) == db.records
+    assert mapped.records[4]["url"] == "https://git-scm.com"
+    assert all(same_candidates(mapped, db.index, query) for query in QUERIES)
+    # Posting lists are views into the mapping, not copies
+    assert isinstance(mapped.postings("git"), memoryview)
+    assert mapped_index.open_index(mapped_index.index_path(path), (1, 2)) is None
+
+
+def test_unloaded_store_searches_the_mapped_index(published, monkeypatch):
+    path, db = published
+    no_json(monkeypatch)
+    reader = CommandStore(path)
+    for query in QUERIES:
+        assert reader.rank(query) == db.rank(query)
+        assert list(reader.search(query)) == list(db.search(query))
+    assert not reader.loaded
+
+
+def test_pending_journal_falls_back_to_loading(published):
+    path, db = published
+    db.add(make_item("git stash"))
+    reader = CommandStore(path)
+    assert [item["command"] for _, item in reader.search("stash")] == ["git stash"]
+    assert reader.loaded
+
+
+def test_compaction_republishes_with_deletes_applied(published, monkeypatch):
+    path, db = published
+    db.delete(1)
+    db.add(make_item("git fetch", desc="Download"))
+    db.compact()
+    wait_for_caches()
+    assert len(db.index.deleted) == 1
+
+    mapped = mapped_index.open_index(mapped_index.index_path(path), db._stamp)
+    fresh = TrigramIndex(db.search_texts())
+    assert list(mapped.records) == db.records
+    assert all(same_candidates(mapped, fresh, query) for query in QUERIES + ["fetch", "history"])
+
+    no_json(monkeypatch)
+    assert CommandStore(path).rank("download") == db.rank("download")
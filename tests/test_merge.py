@@ -0,0 +1,174 @@
+import json
+
+import pytest
+
+import merge
+import store
+from sqlite_store import SqliteStore
+from store import CommandStore
+
+
+def make_item(cmd, soft="Git", desc="", tags=None):
+    return {
+        "command": cmd,
+        "software": soft,
+        "description": desc,
+        "category": "CMD",
+        "tags": tags or [],
+    }
+
+
+ITEMS = [make_item("git status"), make_item("git log"), make_item("git push")]
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def stores(tmp_path, request):
+    """Two handles on one database, standing in for two processes."""
+    if request.param == "json":
+        db_file = tmp_path / "commands.json"
+        db_file.write_text(json.dumps(ITEMS))
+        yield CommandStore(str(db_file)), CommandStore(str(db_file))
+    else:
+        path = str(tmp_path / "commands.db")
+        first = SqliteStore(path)
+        first.replace_all(ITEMS)
+        second = SqliteStore(path)
+        yield first, second
+        first.close()
+        second.close()
+
+
+def snapshot(db):
+    db.refresh()
+    return [dict(item) for item in db.records]
+
+
+def by_command(db):
+    db.refresh()
+    return {item["command"]: item for item in db.records}
+
+
+def test_plan_merges_disjoint_fields_and_reports_clashes():
+    base = [
+        dict(make_item("a"), id=1, rev=0),
+        dict(make_item("b"), id=2, rev=0),
+        dict(make_item("c"), id=3, rev=0),
+    ]
+    live = {
+        1: dict(make_item("a", desc="theirs"), id=1, rev=1),
+        2: dict(make_item("b", soft="Docker"), id=2, rev=1),
+        3: dict(make_item("c", desc="theirs"), id=3, rev=1),
+    }
+    edited = [
+        dict(make_item("a", soft="Docker"), id=1, rev=0),  # other field than theirs
+        dict(make_item("b", soft="Git"), id=2, rev=0),  # unchanged here
+        dict(make_item("c", desc="ours"), id=3, rev=0),  # same field, other value
+        make_item("new"),
+    ]
+    plan = merge.plan(base, edited, live.get)
+    assert plan.updates == [(1, {"software": "Docker"})]
+    assert plan.adds == [make_item("new")]
+    assert plan.deletes == []
+    [conflict] = plan.conflicts
+    assert (conflict["id"], conflict["fields"]) == (3, ["description"])
+    assert conflict["ours"] == {"description": "ours"}
+    assert conflict["theirs"] == {"description": "theirs"}
+
+
+def test_plan_delete_against_edit():
+    base = [dict(make_item("a"), id=1, rev=0), dict(make_item("b"), id=2, rev=0)]
+    live = {1: dict(make_item("a", desc="theirs"), id=1, rev=1)}
+    # We delete a record they edited, and edit one they deleted
+    plan = merge.plan(base, [dict(make_item("b", desc="ours"), id=2, rev=0)], live.get)
+    assert plan.updates == plan.deletes == []
+    assert sorted(c["reason"] for c in plan.conflicts) == [
+        "deleted elsewhere",
+        "edited elsewhere, deleted here",
+    ]
+
+
+def test_legacy_records_get_the_same_ids_everywhere(tmp_path):
+    db_file = tmp_path / "commands.json"
+    db_file.write_text(json.dumps(ITEMS + [dict(make_item("git pull"), id=2)]))
+    first, second = CommandStore(str(db_file)), CommandStore(str(db_file))
+    ids = [item["id"] for item in first.load()]
+    assert [item["id"] for item in second.load()] == ids
+    # Position-based numbering, except where that id is already taken
+    assert ids[0] == 1 and ids[2] == 3 and ids[3] == 2 and ids[1] not in (1, 2, 3)
+    assert {item["rev"] for item in first.records} == {0}
+
+    first.add(make_item("git fetch"))
+    first.delete(0)
+    first.compact()
+    assert [item["id"] for item in CommandStore(str(db_file)).load()] == ids[1:] + [
+        first.records[-1]["id"]
+    ]
+
+
+def test_conditional_update_and_delete(stores):
+    first, second = stores
+    item = snapshot(first)[1]
+    key = first.key_of(item["id"])
+    assert item["rev"] == 0
+
+    second.update(second.key_of(item["id"]), {"description": "History"})
+    with pytest.raises(store.Conflict):
+        first.update(key, {"description": "Log"}, rev=0)
+    with pytest.raises(store.Conflict):
+        first.delete(key, rev=0)
+    assert first.update(key, {"description": "Log"}, rev=1)["rev"] == 2
+    first.delete(first.key_of(item["id"]), rev=2)
+    assert second.key_of(item["id"]) is None
+
+
+def test_editor_save_keeps_concurrent_writes(stores):
+    dashboard, quick_add = stores
+    base = snapshot(dashboard)
+
+    # While the dashboard table is open, another tool adds one record and edits two
+    quick_add.add(make_item("git fetch"))
+    log, push = by_command(quick_add)["git log"], by_command(quick_add)["git push"]
+    quick_add.update(quick_add.key_of(log["id"]), {"tags": ["history"]})
+    quick_add.update(quick_add.key_of(push["id"]), {"description": "Upload"})
+
+    edited = [dict(item) for item in base]
+    edited[0]["description"] = "Show status"  # untouched elsewhere
+    edited[1]["description"] = "Show history"  # other field than theirs
+    edited[2]["description"] = "Send"  # same field: conflict
+    edited.append(make_item("git stash"))
+    result = dashboard.merge(base, edited)
+
+    assert (result["updated"], result["added"], result["deleted"]) == (2, 1, 0)
+    assert [c["command"] for c in result["conflicts"]] == ["git push"]
+    now = by_command(quick_add)
+    assert set(now) == {"git status", "git log", "git push", "git fetch", "git stash"}
+    assert now["git status"]["description"] == "Show status"
+    assert (now["git log"]["description"], now["git log"]["tags"]) == ("Show history", ["history"])
+    assert now["git push"]["description"] == "Upload"
+
+
+def test_editor_save_deletes_only_rows_it_showed(stores):
+    dashboard, other = stores
+    base = [item for item in snapshot(dashboard) if item["command"] != "git push"]
+    other.add(make_item("git fetch"))
+
+    # A filtered view without "git push"; the user deleted "git log"
+    result = dashboard.merge(base, [item for item in base if item["command"] != "git log"])
+    assert result["deleted"] == 1 and not result["conflicts"]
+    assert set(by_command(other)) == {"git status", "git push", "git fetch"}
+
+
+def test_deleted_id_is_never_reused_for_a_new_record(stores):
+    dashboard, other = stores
+    base = snapshot(dashboard)
+    last = base[-1]
+    other.delete(other.key_of(last["id"]), rev=last["rev"])
+    other.add(make_item("git fetch"))
+    assert by_command(other)["git fetch"]["id"] != last["id"]
+
+    # A stale edit of the deleted record must not land on the new one
+    edited = [dict(item) for item in base]
+    edited[-1]["description"] = "Send"
+    result = dashboard.merge(base, edited)
+    assert result["updated"] == 0
+    assert by_command(other)["git fetch"]["description"] == ""
@@ -0,0 +1,171 @@
+import json
+import os
+import socket
+import time
+
+import pytest
+
+import query_api
+import store
+from store import CommandStore
+
+
+def make_item(cmd, desc=""):
+    return {"command": cmd, "software": "Git", "description": desc, "category": "CMD", "tags": []}
+
+
+@pytest.fixture
+def daemon(tmp_path):
+    db_file = tmp_path / "commands.json"
+    db_file.write_text(json.dumps([make_item("git status"), make_item("git log", "History")]))
+    db = CommandStore(str(db_file))
+    db.ensure_index()
+    token_file = str(tmp_path / "run" / "query_api.token")
+    server = query_api.serve(db, port=0, token_file=token_file)
+    yield db, server.server_address[1], token_file
+    server.shutdown()
+    server.server_close()
+
+
+def exchange(port, *lines):
+    """Send raw `lines` on one connection; the reply lines until the daemon hangs up."""
+    with socket.create_connection(("127.0.0.1", port), 2) as sock:
+        sock.sendall(b"".join(lines))
+        sock.shutdown(socket.SHUT_WR)
+        data = b""
+        while chunk := sock.recv(65536):
+            data += chunk
+    return [json.loads(line) for line in data.splitlines()]
+
+
+def test_remote_store_queries_and_writes_the_warm_store(daemon):
+    db, port, token_file = daemon
+    remote = query_api.connect(port, token_file)
+    assert remote is not None
+    assert remote.rank("history") == [(1, dict(make_item("git log", "History"), id=2, rev=0))]
+    assert len(remote) == 2
+
+    remote.add(make_item("git push"))
+    assert [i["command"] for i in db.records] == ["git status", "git log", "git push"]
+    assert remote.find(make_item("git push")) == 2
+    assert remote.bulk_upsert([make_item("git push"), make_item("git pull")]) == (1, 1)
+    assert remote.version == db.version
+
+    with pytest.raises(query_api.RemoteError):
+        remote.delete(99)
+    # The connection survives a failed call
+    assert remote.delete(0)["command"] == "git status"
+    remote.close()
+
+
+def test_remote_conflicts_raise_the_store_exception(daemon):
+    db, port, token_file = daemon
+    remote = query_api.connect(port, token_file)
+    key = remote.key_of(2)
+    remote.update(key, {"description": "Log"}, rev=0)
+    with pytest.raises(store.Conflict):
+        remote.update(key, {"description": "Again"}, rev=0)
+    base = [dict(i) for i in remote.records]
+    result = remote.merge(base, base + [make_item("git push")])
+    assert (result["added"], result["conflicts"]) == (1, [])
+    assert [i["command"] for i in db.records][-1] == "git push"
+    remote.close()
+
+
+def test_round_trip_is_fast_and_fallback_is_none(daemon):
+    _, port, token_file = daemon
+    remote = query_api.connect(port, token_file)
+    start = time.perf_counter()
+    for _ in range(100):
+        remote.rank("git")
+    assert (time.perf_counter() - start) / 100 < 0.05
+    remote.close()
+
+    # Nothing listening, or no daemon ever wrote a token: callers fall back to the file
+    assert query_api.connect(1, token_file) is None
+    assert query_api.connect(port, token_file + ".missing") is None
+
+
+def test_token_file_is_private(daemon):
+    _, _, token_file = daemon
+    if os.name == "posix":
+        assert os.stat(token_file).st_mode & 0o777 == 0o600
+
+
+def test_browser_post_cannot_reach_mutations(daemon):
+    db, port, token_file = daemon
+    wipe = b'{"op":"replace_all","args":[[]]}\n'
+    # A cross-site text/plain POST: HTTP request and header lines, then the body
+    replies = exchange(
+        port,
+        b"POST / HTTP/1.1\r\n",
+        b"Host: 127.0.0.1:49203\r\n",
+        b"Content-Type: text/plain\r\n\r\n",
+        wipe,
+    )
+    assert [r["ok"] for r in replies] == [False]
+    # Well-formed, but without the token
+    assert [r["ok"] for r in exchange(port, wipe, wipe)] == [False]
+    assert [r["ok"] for r in exchange(port, b'{"token": "guess"}\n', wipe)] == [False]
+    assert len(db.records) == 2
+
+
+def test_invalid_line_after_login_closes_the_connection(daemon):
+    db, port, token_file = daemon
+    login = json.dumps({"token": query_api.read_token(token_file)}).encode() + b"\n"
+    replies = exchange(
+        port, login, b"GET / HTTP/1.1\r\n", b'{"op":"replace_all","args":[[]]}\n'
+    )
+    assert [r["ok"] for r in replies] == [True, False]
+    assert replies[1]["kind"] == "ProtocolError"
+    assert len(db.records) == 2
+
+
+def test_backup_folder_and_label_are_not_taken_from_the_wire(daemon, tmp_path):
+    _, port, token_file = daemon
+    remote = query_api.connect(port, token_file)
+    with pytest.raises(ValueError):
+        remote.backup("x", str(tmp_path / "elsewhere"))
+    with pytest.raises(query_api.RemoteError):
+        remote.call("backup", "../../escape")
+    with pytest.raises(query_api.RemoteError):
+        remote.call("backup", "x", str(tmp_path / "elsewhere"))
+    assert not (tmp_path / "elsewhere").exists()
+    remote.close()
+
+
+def test_records_come_in_pages_and_filters_run_in_the_daemon(daemon, monkeypatch):
+    db, port, token_file = daemon
+    db.add_many([make_item(f"git cmd {n}") for n in range(5)])
+    remote = query_api.connect(port, token_file)
+    monkeypatch.setattr(store, "PAGE_SIZE", 2)
+    pages = []
+    call = remote.call
+
+    def spy(op, *args, **kwargs):
+        pages.append(op)
+        return call(op, *args, **kwargs)
+
+    monkeypatch.setattr(remote, "call", spy)
+    assert [i["command"] for i in remote.records] == [i["command"] for i in db.records]
+    assert pages.count("page") == 4
+    assert remote.page(1, 2, {"description": "history"}) == []
+    assert [i["command"] for i in remote.page(0, 2, {"description": "HISTORY"})] == ["git log"]
+    # The whole-database op is gone
+    with pytest.raises(query_api.RemoteError):
+        call("records")
+    remote.close()
+
+
+def test_remote_rank_can_skip_the_fuzzy_tiers(daemon):
+    _, port, token_file = daemon
+    remote = query_api.connect(port, token_file)
+    assert [i["command"] for _, i in remote.rank("gitstatus")] == ["git status"]
+    assert remote.rank("gitstatus", fuzzy=False) == []
+    remote.close()
+
+
+def test_non_ascii_token_is_refused_not_crashed(daemon):
+    _, port, _ = daemon
+    replies = exchange(port, json.dumps({"token": "pässwort"}).encode() + b"\n")
+    assert [r["ok"] for r in replies] == [False]
@@ -0,0 +1,109 @@
+import ranking
+import store
+
+
+def make_item(cmd, desc="", soft="Git", tags=None):
+    return {"command": cmd, "description": desc, "software": soft, "tags": tags or []}
+
+
+def ranked(query, items, limit=ranking.LIMIT):
+    texts = [store.search_string(i) for i in items]
+    return [i["command"] for _, i in ranking.rank(query, items, limit, texts)]
+
+
+def test_fuzzy_subsequence_surfaces_best_hit():
+    items = [
+        make_item("docker compose up", "Start containers"),
+        make_item("ctrl + o", "Open file", soft="VS Code"),
+        make_item("git commit -m {1}", "Record changes"),
+        make_item("git checkout {1}", "Switch branch"),
+        make_item("gcc {1}", "Compile C", soft="GCC"),
+    ]
+    # "co" spread over checkout reads as its abbreviation; commit merely starts with it
+    assert ranked("gco", items)[:2] == ["git checkout {1}", "git commit -m {1}"]
+
+
+def test_field_weights_and_prefix_bonus():
+    items = [
+        make_item("ctrl + shift + p", "Run git command"),
+        make_item("win + g", "Game bar", soft="Windows", tags=["git"]),
+        make_item("git log", "Show history"),
+    ]
+    # Command prefix beats description, which beats tags
+    assert ranked("git", items) == ["git log", "ctrl + shift + p", "win + g"]
+
+
+def test_typo_tolerance_is_a_fallback():
+    items = [make_item("git checkout {1}", "Switch branch"), make_item("git status")]
+    assert ranked("chekcout", items) == ["git checkout {1}"]
+    assert ranked("stauts", items) == ["git status"]
+    assert ranked("zzzz", items) == []
+
+
+def test_top_k_limit_and_stable_ties():
+    items = [make_item(f"git cmd {n}") for n in range(100)]
+    assert ranked("git cmd", items, limit=3) == ["git cmd 0", "git cmd 1", "git cmd 2"]
+    assert ranked("", items, limit=2) == ["git cmd 0", "git cmd 1"]
+    assert len(ranked("git", items, limit=None)) == 100
+
+
+def test_refined_scans_match_full_scans():
+    items = [
+        make_item("git status", "Show working tree status"),
+        make_item("git stash", "Stash changes"),
+        make_item("git checkout {1}", "Switch branch"),
+        make_item("docker ps", "List containers", soft="Docker"),
+        make_item("ctrl + s", "Save file", soft="VS Code"),
+    ]
+    texts = [store.search_string(i) for i in items]
+    refiner = ranking.Refiner()
+    queries = ["g", "gi", "git", "git ", "git s", "git st", "git stz", "chek", "chekc"]
+    queries += ["do", "dock"]
+    for query in queries:
+        scope = lambda q=query: refiner.candidates(q, texts)  # noqa: E731
+        refined = ranking.rank(query, items, ranking.LIMIT, texts, scope=scope)
+        assert refined == ranking.rank(query, items, ranking.LIMIT, texts), query
+    # "dock" was filtered from the positions remembered for "do"
+    assert list(refiner.candidates("dock", texts)) == [3]
+
+
+def test_refiner_is_bounded_and_tied_to_the_stamp():
+    texts = ["alpha one", "beta two", "gamma three"]
+    refiner = ranking.Refiner(slots=2)
+    for query in ["al", "alp", "alph"]:
+        refiner.candidates(query, texts, stamp=1)
+    assert list(refiner.sets) == ["alp", "alph"]
+    assert list(refiner.candidates("alph", texts + ["alpine"], stamp=2)) == [0, 3]
+    assert list(refiner.sets) == ["alph"]
+
+
+def test_verbatim_only_skips_fuzzy_tiers():
+    items = [make_item("git checkout {1}", "Switch branch"), make_item("gcc main.c")]
+    texts = [store.search_string(i) for i in items]
+    assert ranking.rank("gco", items, ranking.LIMIT, texts, fuzzy=False) == []
+    assert [i["command"] for _, i in ranking.rank("gcc", items, fuzzy=False)] == ["gcc main.c"]
+
+
+def test_large_pool_is_trimmed_like_a_stable_nsmallest():
+    texts = [f"{'x' * (n % 7)}git {n}" for n in range(400)]
+    kept = ranking._earliest(range(400), texts, ["git"], 100)
+    expected = sorted(range(400), key=lambda n: ranking._placement(texts[n], ["git"]))[:100]
+    assert sorted(kept) == sorted(expected)
+
+
+def test_verbatim_tier_scores_a_small_multiple_of_limit(monkeypatch):
+    items = [make_item(f"vs toggle-file {n}") for n in range(300)]
+    items.append(make_item("git toggle-sidebar"))
+    texts = [store.search_string(i) for i in items]
+    scored = []
+    score_item = ranking.score_item
+
+    def counting(tokens, item, typos=0, fields=None):
+        scored.append(item)
+        return score_item(tokens, item, typos, fields)
+
+    monkeypatch.setattr(ranking, "score_item", counting)
+    found = ranking.rank("toggle s", items, 5, texts, fuzzy=False)
+    assert len(scored) == ranking.pool_cap(5)
+    # Picked by where the tokens start words, not by the longest token alone
+    assert found[0][1]["command"] == "git toggle-sidebar"
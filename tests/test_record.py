@@ -0,0 +1,49 @@
+import json
+import pickle
+
+import pytest
+
+from record import Record, jsonable
+
+ITEM = {
+    "command": "git status",
+    "software": "Git",
+    "description": "Show the working tree status",
+    "category": "CMD",
+    "tags": ["git", "state"],
+}
+
+
+def test_behaves_like_the_json_object():
+    rec = Record.from_dict(ITEM)
+    assert rec == ITEM and ITEM == rec
+    assert dict(rec) == ITEM and list(rec) == list(ITEM)
+    assert rec["tags"] == ["git", "state"] and isinstance(rec["tags"], list)
+    assert rec.get("missing", "x") == "x"
+    assert json.loads(json.dumps(rec, default=jsonable)) == ITEM
+    assert not hasattr(rec, "__dict__")
+
+
+def test_missing_fields_and_extra_keys_round_trip():
+    rec = Record.from_dict({"command": "ls", "software": None, "source": "web"})
+    assert rec.to_dict() == {"command": "ls", "software": None, "source": "web"}
+    assert "description" not in rec and rec.get("description", "-") == "-"
+    assert len(rec) == 3
+
+    rec.update({"tags": ["a"], "source": "manual"})
+    del rec["software"]
+    assert rec == {"command": "ls", "tags": ["a"], "source": "manual"}
+    with pytest.raises(KeyError):
+        del rec["software"]
+
+
+def test_repeated_values_share_one_string():
+    a = Record.from_dict(json.loads(json.dumps(ITEM)))
+    b = Record.from_dict(json.loads(json.dumps(ITEM)))
+    assert a.software is b.software and a.category is b.category
+    assert a.tags[0] is b.tags[0]
+
+
+def test_pickles():
+    rec = Record({"command": "ls", "x": 1})
+    assert pickle.loads(pickle.dumps(rec)) == {"command": "ls", "x": 1}
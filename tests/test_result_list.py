@@ -0,0 +1,33 @@
+import result_list
+
+
+class FakeListbox:
+    def __init__(self, rows):
+        self.rows = list(rows)
+
+    def delete(self, first, last):
+        del self.rows[first : last + 1]
+
+    def insert(self, index, *rows):
+        self.rows[index:index] = rows
+
+
+def test_sync_reproduces_new_rows():
+    cases = [
+        ([], ["a", "b"]),
+        (["a", "b", "c", "d"], ["a", "c"]),
+        (["a", "b", "c"], ["c", "a", "x"]),
+        (["a", "b"], []),
+    ]
+    for old, new in cases:
+        box = FakeListbox(old)
+        result_list.sync(box, old, new)
+        assert box.rows == new
+
+
+def test_narrowing_query_touches_only_dropped_rows():
+    old = [f"row {n}" for n in range(50)]
+    new = [r for r in old if not r.endswith("7")]
+    box = FakeListbox(old)
+    assert result_list.sync(box, old, new) == 5
+    assert result_list.sync(box, new, new) == 0
@@ -0,0 +1,101 @@
+import queue
+import threading
+import time
+
+import pytest
+
+from ranking import Cancelled
+from scheduler import SearchScheduler
+
+
+def make_scheduler(search, delay=0.05):
+    delivered = queue.Queue()
+    pending = queue.Queue()
+    sched = SearchScheduler(search, lambda q, r: delivered.put((q, r)), pending.put, delay)
+    return sched, pending, delivered
+
+
+def drain(pending, delivered, timeout=1.0):
+    """Run marshalled callbacks like the Tk loop would, until one is delivered."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            pending.get(timeout=0.01)()
+        except queue.Empty:
+            pass
+        if not delivered.empty():
+            return delivered.get()
+    return None
+
+
+def test_burst_of_keystrokes_runs_one_search():
+    calls = []
+
+    def search(query, cancelled):
+        calls.append(query)
+        return query.upper()
+
+    sched, pending, delivered = make_scheduler(search)
+    for prefix in ["g", "gi", "git"]:
+        sched.submit(prefix)
+    assert drain(pending, delivered) == ("git", "GIT")
+    assert calls == ["git"]
+    sched.stop()
+
+
+def test_stale_search_is_cancelled_and_never_delivered():
+    started = threading.Event()
+
+    def search(query, cancelled):
+        if query == "slow":
+            started.set()
+            while not cancelled():
+                time.sleep(0.001)
+            raise Cancelled
+        return query
+
+    sched, pending, delivered = make_scheduler(search, delay=0)
+    sched.submit("slow")
+    assert started.wait(1.0)
+    sched.submit("fast")
+    assert drain(pending, delivered) == ("fast", "fast")
+    assert delivered.empty()
+    sched.stop()
+
+
+def test_settle_runs_once_typing_pauses():
+    settled = []
+
+    def settle(query, result, cancelled):
+        settled.append(query)
+        return result + "+"
+
+    delivered = queue.Queue()
+    pending = queue.Queue()
+    sched = SearchScheduler(
+        lambda q, c: q, lambda q, r: delivered.put((q, r)), pending.put, 0, settle, pause=0.3
+    )
+    sched.submit("gi")
+    assert drain(pending, delivered) == ("gi", "gi")
+    sched.submit("gco")
+    assert drain(pending, delivered) == ("gco", "gco")
+    assert drain(pending, delivered) == ("gco", "gco+")
+    # The earlier query was overtaken before it settled
+    assert settled == ["gco"]
+    sched.stop()
+
+
+def test_search_errors_surface_on_the_ui_thread():
+    def search(query, cancelled):
+        if query == "bad":
+            raise ValueError(query)
+        return query
+
+    sched, pending, delivered = make_scheduler(search, delay=0)
+    sched.submit("bad")
+    with pytest.raises(ValueError):
+        pending.get(timeout=1.0)()
+    # The worker is still there for the next query
+    sched.submit("good")
+    assert drain(pending, delivered) == ("good", "good")
+    sched.stop()
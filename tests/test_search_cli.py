@@ -0,0 +1,96 @@
+import io
+import json
+
+import pytest
+
+import search
+from sqlite_store import SqliteStore
+from store import CommandStore
+
+
+def make_item(cmd, software="Git", category="CMD", tags=()):
+    return {
+        "command": cmd,
+        "description": "",
+        "software": software,
+        "category": category,
+        "tags": list(tags),
+    }
+
+
+ITEMS = [
+    make_item("git status", tags=["state"]),
+    make_item("git push", tags=["remote", "upload"]),
+    make_item("docker push", software="Docker"),
+    make_item("Ctrl+Shift+P", software="VS Code", category="Hotkey"),
+]
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def cli(tmp_path, monkeypatch, request):
+    if request.param == "json":
+        db_file = tmp_path / "commands.json"
+        db_file.write_text(json.dumps(ITEMS))
+        db = CommandStore(str(db_file))
+    else:
+        db = SqliteStore(str(tmp_path / "commands.db"))
+        db.replace_all(ITEMS)
+    monkeypatch.setattr(search, "STORE", db)
+
+    def run(*argv):
+        out = io.StringIO()
+        return search.main(list(argv), out), out.getvalue()
+
+    return run
+
+
+def test_ndjson_streams_one_record_per_line(cli):
+    code, out = cli("query", "push")
+    assert code == search.EXIT_MATCH
+    assert sorted(json.loads(line)["command"] for line in out.splitlines()) == [
+        "docker push",
+        "git push",
+    ]
+
+
+def test_filters_and_limit(cli):
+    code, out = cli("query", "push", "--software", "docker")
+    assert [json.loads(line)["command"] for line in out.splitlines()] == ["docker push"]
+
+    code, out = cli("query", "--category", "HOTKEY", "--format", "json")
+    assert code == search.EXIT_MATCH
+    assert json.loads(out) == [dict(ITEMS[3], id=4, rev=0)]
+
+    code, out = cli("query", "--software", "Git", "--limit", "1")
+    assert json.loads(out) == dict(ITEMS[0], id=1, rev=0)
+
+
+def test_tsv_flattens_tags_and_whitespace(cli):
+    code, out = cli("query", "upload", "--format", "tsv")
+    assert out == "git push\t\tGit\tCMD\tremote,upload\n"
+
+
+def test_no_match_and_usage_exit_codes(cli, capsys):
+    assert cli("query", "zzzz", "--format", "json") == (search.EXIT_NO_MATCH, "[]\n")
+    assert cli("query", "--limit", "-1")[0] == search.EXIT_USAGE
+    assert cli("query", "--format", "xml")[0] == search.EXIT_USAGE
+    assert cli("frobnicate")[0] == search.EXIT_USAGE
+
+
+def test_unlimited_listing_is_lazy(cli):
+    items = search.find_matches("", limit=None, filters={"software": "git"})
+    assert next(items) == dict(ITEMS[0], id=1, rev=0)
+    assert [i["command"] for i in items] == ["git push"]
+
+
+def test_import_resolves_no_store(monkeypatch):
+    import importlib
+
+    import query_api
+
+    def fail(*args, **kwargs):
+        raise AssertionError("resolved the store at import time")
+
+    monkeypatch.setattr(query_api, "connect", fail)
+    monkeypatch.setattr(search.store, "open_store", fail)
+    assert importlib.reload(search).STORE is None
@@ -0,0 +1,81 @@
+import json
+import random
+
+from search_index import TrigramIndex
+from store import CommandStore
+
+
+def linear(texts, query):
+    return [i for i, text in enumerate(texts) if query in text]
+
+
+def indexed(index, texts, query):
+    candidates = index.candidates(query)
+    if candidates is None:
+        candidates = range(len(texts))
+    return [i for i in candidates if query in texts[i]]
+
+
+def test_index_matches_linear_scan():
+    rng = random.Random(7)
+    words = ["git", "status", "ctrl", "alt", "open", "panel", "zx", "a", "q"]
+    texts = [" ".join(rng.choices(words, k=rng.randint(0, 5))) for _ in range(300)]
+    texts += ["", "zx", "q"]
+    index = TrigramIndex(texts)
+
+    # Incremental updates must keep the postings in step with the texts
+    for doc in rng.sample(range(len(texts)), 40):
+        new = " ".join(rng.choices(words, k=rng.randint(0, 4)))
+        index.update(doc, texts[doc], new)
+        texts[doc] = new
+
+    for query in ["", "a", "zx", "q", "gi", "git", "git st", "l o", "trl alt", "nomatch", "s"]:
+        assert indexed(index, texts, query) == linear(texts, query), query
+
+
+def test_deletes_keep_positions_in_step():
+    rng = random.Random(11)
+    words = ["git", "status", "ctrl", "alt", "open", "zx", "q"]
+    texts = [" ".join(rng.choices(words, k=rng.randint(0, 4))) for _ in range(200)]
+    index = TrigramIndex(texts)
+
+    # Deletes, adds and updates interleaved, addressed by current position
+    for _ in range(120):
+        roll = rng.random()
+        if roll < 0.5 and texts:
+            pos = rng.randrange(len(texts))
+            index.delete(pos, texts.pop(pos))
+        elif roll < 0.75:
+            texts.append(" ".join(rng.choices(words, k=rng.randint(0, 4))))
+            index.add(texts[-1])
+        elif texts:
+            pos = rng.randrange(len(texts))
+            new = " ".join(rng.choices(words, k=rng.randint(0, 4)))
+            index.update(pos, texts[pos], new)
+            texts[pos] = new
+
+    assert len(index) == len(texts)
+    for query in ["zx", "q", "gi", "git", "git st", "trl alt", "nomatch"]:
+        assert indexed(index, texts, query) == linear(texts, query), query
+
+
+def test_store_keeps_index_current(tmp_path):
+    db_file = tmp_path / "commands.json"
+    items = [
+        {"command": "git status", "software": "Git", "description": "", "tags": []},
+        {"command": "win + .", "software": "Windows", "description": "Emoji", "tags": []},
+    ]
+    db_file.write_text(json.dumps(items))
+
+    db = CommandStore(str(db_file))
+    db.load()
+    db.ensure_index()
+    db.add({"command": "git stash", "software": "Git", "description": "", "tags": []})
+    assert [i["command"] for _, i in db.search("git st")] == ["git status", "git stash"]
+
+    db.update(0, {"command": "git log"})
+    assert [i["command"] for _, i in db.search("git st")] == ["git stash"]
+
+    db.delete(0)
+    assert [i["command"] for _, i in db.search("emoji")] == ["win + ."]
+    assert db.index is not None
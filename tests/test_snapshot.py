@@ -0,0 +1,137 @@
+import json
+import os
+import threading
+
+import pytest
+
+import json_stream
+import record
+import snapshot
+from store import CommandStore
+
+
+def make_item(cmd, soft="Git", desc="", cat="CMD", tags=None):
+    return {
+        "command": cmd,
+        "software": soft,
+        "description": desc,
+        "category": cat,
+        "tags": tags or [],
+    }
+
+
+ITEMS = [make_item("git status", tags=["vcs"]), make_item("git log"), make_item("git push")]
+
+
+@pytest.fixture(autouse=True)
+def small_files(monkeypatch):
+    monkeypatch.setattr(snapshot, "ENABLED", True)
+    monkeypatch.setattr(snapshot, "MIN_SIZE", 0)
+
+
+def wait_for_snapshots():
+    for thread in threading.enumerate():
+        if thread.name == "snapshot":
+            thread.join()
+
+
+def no_json(monkeypatch):
+    """Make parsing `commands.json` fail, so a load must come from the snapshot."""
+
+    def fail(*args, **kwargs):
+        raise AssertionError("parsed the JSON file")
+
+    monkeypatch.setattr(json_stream, "iter_batches", fail)
+
+
+def test_round_trip_keeps_missing_fields_extras_and_interning(tmp_path):
+    items = [
+        dict(make_item("git status", tags=["vcs", "status"]), id=1, rev=0),
+        {"command": "bare", "id": 2, "rev": 3},
+        dict(make_item("git log", desc=None), id=3, rev=1, url="https://x", _cached="skip"),
+    ]
+    records = record.from_dicts(items)
+    path = str(tmp_path / "commands.json.snap")
+    assert snapshot.write(path, snapshot.columns(records), (123, 456)) is True
+    assert snapshot.stamp_of(path) == (123, 456)
+
+    loaded = snapshot.read(path, (123, 456))
+    assert [dict(r) for r in loaded] == [
+        items[0],
+        items[1],
+        dict(make_item("git log", desc=None), id=3, rev=1, url="https://x"),
+    ]
+    assert "software" not in loaded[1] and loaded[2]["description"] is None
+    assert loaded[0].software is loaded[2].software
+    assert loaded[0].tags == ("vcs", "status")
+
+    # Built from another version of the JSON file, or damaged: not used
+    assert snapshot.read(path, (123, 457)) is None
+    with open(path, "r+b") as f:
+        f.truncate(os.path.getsize(path) - 10)
+    assert snapshot.read(path, (123, 456)) is None
+
+
+def test_rewrite_leaves_a_snapshot_the_next_load_uses(tmp_path, monkeypatch):
+    db_file = tmp_path / "commands.json"
+    db_file.write_text(json.dumps(ITEMS))
+    db = CommandStore(str(db_file))
+    db.load()
+    db.add(make_item("git fetch"))
+    db.compact()
+    wait_for_snapshots()
+    db.add(make_item("git stash"))
+
+    no_json(monkeypatch)
+    fresh = CommandStore(str(db_file))
+    assert fresh.load() == db.records
+    assert [item["command"] for item in fresh.records][-2:] == ["git fetch", "git stash"]
+
+    fresh_stream = CommandStore(str(db_file))
+    assert fresh_stream.stream_load() is True
+    assert fresh_stream.records == db.records
+
+
+def test_snapshot_threads_do_not_hold_up_exit(tmp_path, monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(snapshot, "write", lambda *args: release.wait(5))
+    db_file = tmp_path / "commands.json"
+    db_file.write_text(json.dumps(ITEMS))
+    CommandStore(str(db_file)).load()
+
+    writers = [t for t in threading.enumerate() if t.name == "snapshot"]
+    release.set()
+    assert writers and all(t.daemon for t in writers)
+    wait_for_snapshots()
+
+
+def test_stale_snapshot_is_ignored_and_rebuilt(tmp_path, monkeypatch):
+    db_file = tmp_path / "commands.json"
+    db_file.write_text(json.dumps(ITEMS))
+    db = CommandStore(str(db_file))
+    db.load()
+    db.save()
+    wait_for_snapshots()
+
+    # Edited by hand: the snapshot no longer matches the file
+    db_file.write_text(json.dumps(ITEMS[:1]))
+    assert [item["command"] for item in CommandStore(str(db_file)).load()] == ["git status"]
+    wait_for_snapshots()
+
+    no_json(monkeypatch)
+    assert [item["command"] for item in CommandStore(str(db_file)).load()] == ["git status"]
+
+
+def test_small_files_and_disabled_snapshots_write_nothing(tmp_path, monkeypatch):
+    db_file = tmp_path / "commands.json"
+    db_file.write_text(json.dumps(ITEMS))
+    monkeypatch.setattr(snapshot, "MIN_SIZE", 1 << 20)
+    db = CommandStore(str(db_file))
+    db.load()
+    db.save()
+    monkeypatch.setattr(snapshot, "MIN_SIZE", 0)
+    monkeypatch.setattr(snapshot, "ENABLED", False)
+    db.load()
+    db.save()
+    wait_for_snapshots()
+    assert not os.path.exists(snapshot.snapshot_path(str(db_file)))
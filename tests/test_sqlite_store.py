@@ -0,0 +1,190 @@
+import json
+import sqlite3
+
+import sqlite_store
+import store
+from sqlite_store import SqliteStore
+from store import CommandStore, clean_record
+
+
+def make_item(cmd, soft="Git", desc="", cat="CMD", tags=None):
+    return {
+        "command": cmd,
+        "software": soft,
+        "description": desc,
+        "category": cat,
+        "tags": tags or [],
+    }
+
+
+def test_migrate_search_and_export_roundtrip(tmp_path):
+    json_file = tmp_path / "commands.json"
+    items = [
+        make_item("git status", desc="Show working tree status", tags=["status"]),
+        make_item("win + .", soft="Windows", desc="Open Emoji Panel", cat="Hotkey"),
+        make_item("git checkout {1}", desc="Switch branch", tags=["branch"]),
+    ]
+    json_file.write_text(json.dumps(items, indent=4))
+
+    db = SqliteStore(str(tmp_path / "commands.db"))
+    assert db.import_json(str(json_file)) == 3
+
+    # FTS path (3+ chars), short-query fallback, and tags are all searchable
+    assert [i["command"] for _, i in db.search("STATUS")] == ["git status"]
+    assert [i["command"] for _, i in db.search("gi")] == ["git status", "git checkout {1}"]
+    assert [i["command"] for _, i in db.search("branch")] == ["git checkout {1}"]
+    assert [i["command"] for _, i in db.search("git", limit=1)] == ["git status"]
+
+    out = tmp_path / "export.json"
+    db.export_json(str(out))
+    # Records keep the ids they were numbered with in commands.json
+    assert json.loads(out.read_text()) == [
+        dict(item, id=n, rev=0) for n, item in enumerate(items, 1)
+    ]
+
+
+def test_mutations_keep_index_in_sync(tmp_path):
+    db = SqliteStore(str(tmp_path / "commands.db"))
+    db.add(make_item("git status"))
+    added, matched = db.bulk_upsert([make_item("GIT STATUS"), make_item("git stash")])
+    assert (added, matched) == (1, 1)
+
+    key = db.find(make_item("git stash"))
+    db.update(key, {"description": "Shelve changes"})
+    assert [i["command"] for _, i in db.search("shelve")] == ["git stash"]
+
+    db.delete(key)
+    assert list(db.search("stash")) == []
+    assert len(db) == 1
+
+
+def test_sqlite_matches_json_backend(tmp_path):
+    json_file = tmp_path / "commands.json"
+    items = [make_item(f"cmd {n}", desc=f"desc {n % 7}", tags=[f"t{n % 3}"]) for n in range(50)]
+    json_file.write_text(json.dumps(items))
+
+    db = SqliteStore(str(tmp_path / "commands.db"))
+    db.import_json(str(json_file))
+    ref = CommandStore(str(json_file))
+    for query in ("desc 3", "t1", "cmd 4", "git", "d"):
+        assert [i for _, i in db.search(query)] == [clean_record(i) for _, i in ref.search(query)]
+
+
+def test_announced_rows_are_patched_into_the_view(tmp_path):
+    path = str(tmp_path / "commands.db")
+    writer, reader = SqliteStore(path), SqliteStore(path)
+    writer.add_many([make_item("git status"), make_item("git log")])
+    assert [i["command"] for i in reader.records] == ["git status", "git log"]
+    rows = reader.records
+
+    key = writer.find(make_item("git log"))
+    writer.update(key, {"description": "Show history"})
+    writer.add(make_item("git push"))
+    message = {"path": path, "kind": "rows", "keys": [key, key + 1]}
+    assert reader.apply_change(message) is True
+    # Patched in place rather than re-read
+    assert reader.records is rows
+    assert [i["command"] for i in rows] == ["git status", "git log", "git push"]
+    assert rows[1]["description"] == "Show history"
+    assert reader.apply_change(message) is False
+
+
+def test_queries_spanning_fields_match_like_the_json_backend(tmp_path):
+    json_file = tmp_path / "commands.json"
+    items = [
+        make_item("git checkout {1}", desc="Switch branches", tags=["vcs"]),
+        make_item("git status", desc="Show status", tags=["vcs"]),
+        make_item("docker ps", soft="Docker", desc="List containers"),
+    ]
+    json_file.write_text(json.dumps(items))
+    path = str(tmp_path / "commands.db")
+
+    # A database from before the index had one column is re-indexed on open
+    conn = sqlite3.connect(path)
+    conn.executescript(sqlite_store.SCHEMA)
+    conn.execute(
+        "CREATE VIRTUAL TABLE commands_fts USING fts5(command, description, software, "
+        "tags_text, content='commands', content_rowid='id', tokenize='trigram')"
+    )
+    conn.close()
+
+    db = SqliteStore(path)
+    db.import_json(str(json_file))
+    ref = CommandStore(str(json_file))
+    for query in ("checkout switch", "switch branches git", "status git vcs", "containers docker"):
+        assert [i for _, i in db.search(query)] == [clean_record(i) for _, i in ref.search(query)]
+        assert [i for _, i in db.rank(query)] == [i for _, i in ref.rank(query)]
+    assert db.search_texts()[0] == "git checkout {1} switch branches git vcs"
+    # Verbatim candidates come from FTS, as positions in the view
+    assert db._narrow(db.keys(), "vcs") == [0, 1]
+    assert db._narrow(db.keys(), "zzz") == []
+    assert [i["command"] for _, i in db.rank("git vcs")] == ["git status", "git checkout {1}"]
+
+
+def test_databases_with_reusable_row_ids_are_upgraded(tmp_path):
+    path = str(tmp_path / "commands.db")
+    conn = sqlite3.connect(path)
+    conn.executescript(sqlite_store.SCHEMA.replace(" AUTOINCREMENT", ""))
+    with conn:
+        rows = [sqlite_store._to_row(make_item(c)) for c in ("git status", "git log")]
+        conn.executemany(SqliteStore.INSERT, rows)
+    conn.close()
+
+    db = SqliteStore(path)
+    db.delete(2)
+    db.add(make_item("git push"))
+    assert db.keys() == [1, 3]
+    assert [i["command"] for _, i in db.search("push")] == ["git push"]
+    assert [i["command"] for _, i in db.search("status")] == ["git status"]
+
+
+def test_rank_reads_only_the_rows_it_ranks(tmp_path):
+    json_file = tmp_path / "commands.json"
+    items = [make_item(f"tool {n} run", soft="Tool", tags=[f"t{n % 3}"]) for n in range(40)]
+    items += [
+        make_item("git checkout {1}", desc="Switch branches", tags=["vcs"]),
+        make_item("git status", desc="Show status", tags=["VCS"]),
+        make_item("docker ps", soft="Docker", desc="List containers"),
+    ]
+    json_file.write_text(json.dumps(items))
+    db = SqliteStore(str(tmp_path / "commands.db"))
+    db.import_json(str(json_file))
+    ref = CommandStore(str(json_file))
+
+    cases = [
+        ("git", None),
+        ("gi st", None),
+        ("tool 1", {"tags": "t1"}),
+        ("git", {"software": "GIT", "tags": "vcs"}),
+        ("", {"software": "docker"}),
+    ]
+    for query, filters in cases:
+        got = db.rank(query, 5, filters=filters, fuzzy=False)
+        want = ref.rank(query, 5, filters=filters, fuzzy=False)
+        assert [i for _, i in got] == [i for _, i in want]
+    # The verbatim tier never builds the view of every row
+    assert db._keys is None and db._records is None
+
+    # Fuzzy tiers scan ids and search strings, not records
+    assert [i["command"] for _, i in db.rank("chekout")] == ["git checkout {1}"]
+    assert db._keys is not None and db._records is None
+    assert [i["command"] for _, i in db.rank("stauts", filters={"tags": "vcs"})] == [
+        "git status"
+    ]
+
+
+def test_pages_are_read_with_sql(tmp_path):
+    db = SqliteStore(str(tmp_path / "commands.db"))
+    db.add_many([make_item(f"git cmd {n}", soft="Git" if n % 2 else "Docker") for n in range(7)])
+    assert [i["command"] for i in db.page(2, 2)] == ["git cmd 2", "git cmd 3"]
+    assert [i["command"] for i in db.page(1, None, {"software": "docker"})] == [
+        "git cmd 2",
+        "git cmd 4",
+        "git cmd 6",
+    ]
+    assert [i["command"] for i in store.walk(db, {"software": "GIT"}, size=2)] == [
+        "git cmd 1",
+        "git cmd 3",
+        "git cmd 5",
+    ]
+    assert db._records is None
@@ -0,0 +1,210 @@
+import json
+import threading
+
+from store import CommandStore, search_string
+
+
+def make_item(cmd, soft="Git", desc="", cat="CMD", tags=None):
+    return {
+        "command": cmd,
+        "software": soft,
+        "description": desc,
+        "category": cat,
+        "tags": tags or [],
+    }
+
+
+def write_db(path, items):
+    with open(path, "w") as f:
+        json.dump(items, f, indent=4)
+
+
+def test_add_is_journaled_then_compacted(tmp_path):
+    db_file = tmp_path / "commands.json"
+    items = [make_item("git status"), make_item("git log")]
+    write_db(db_file, items)
+    before = db_file.read_text()
+
+    db = CommandStore(str(db_file))
+    db.load()
+    db.add(make_item("git push"))
+
+    # The main file is untouched; the add lives in the journal
+    assert db_file.read_text() == before
+    fresh = CommandStore(str(db_file))
+    assert [i["command"] for i in fresh.load()] == ["git status", "git log", "git push"]
+
+    assert db.compact() is True
+    pushed = dict(make_item("git push"), id=db.records[2]["id"], rev=0)
+    expected = [dict(item, id=n, rev=0) for n, item in enumerate(items, 1)] + [pushed]
+    assert db_file.read_text() == json.dumps(expected, indent=4)
+    assert db.compact() is False
+    assert fresh.refresh() is True
+    assert [i["command"] for i in fresh.records] == ["git status", "git log", "git push"]
+
+
+def test_torn_journal_line_is_ignored(tmp_path):
+    db_file = tmp_path / "commands.json"
+    write_db(db_file, [make_item("git status")])
+
+    db = CommandStore(str(db_file))
+    db.load()
+    db.add(make_item("git log"))
+    # Simulate a crash halfway through the next append
+    with open(db.journal.path, "ab") as f:
+        f.write(b'{"op":"add","record":{"comm')
+
+    reader = CommandStore(str(db_file))
+    assert [i["command"] for i in reader.load()] == ["git status", "git log"]
+
+    reader.add(make_item("git push"))
+    assert [i["command"] for i in CommandStore(str(db_file)).load()] == [
+        "git status",
+        "git log",
+        "git push",
+    ]
+
+
+def test_journal_for_replaced_database_is_ignored(tmp_path):
+    db_file = tmp_path / "commands.json"
+    write_db(db_file, [make_item("git status")])
+
+    db = CommandStore(str(db_file))
+    db.load()
+    db.add(make_item("git log"))
+
+    # Someone replaces commands.json wholesale (e.g. restoring a backup)
+    write_db(db_file, [make_item("git diff"), make_item("git init")])
+    assert [i["command"] for i in CommandStore(str(db_file)).load()] == ["git diff", "git init"]
+
+
+def test_private_keys_are_not_written(tmp_path):
+    db_file = tmp_path / "commands.json"
+    write_db(db_file, [])
+
+    db = CommandStore(str(db_file))
+    db.load()
+    db.add(dict(make_item("git status"), _search_str="git status"))
+    db.records[0]["_search_str"] = "cached"
+    db.update(0, {"description": "Show status"})
+    db.compact()
+
+    on_disk = json.loads(db_file.read_text())
+    rid = db.records[0]["id"]
+    assert on_disk == [dict(make_item("git status", desc="Show status"), id=rid, rev=1)]
+
+
+def test_bulk_upsert_skips_duplicates(tmp_path):
+    db_file = tmp_path / "commands.json"
+    write_db(db_file, [make_item("git status")])
+
+    db = CommandStore(str(db_file))
+    added, matched = db.bulk_upsert(
+        [make_item("GIT STATUS "), make_item("git log"), make_item("git log")]
+    )
+
+    assert (added, matched) == (1, 2)
+    db.compact()
+    assert [i["command"] for i in json.loads(db_file.read_text())] == ["git status", "git log"]
+
+
+def test_refresh_picks_up_external_writes(tmp_path):
+    db_file = tmp_path / "commands.json"
+    write_db(db_file, [make_item("git status")])
+
+    db = CommandStore(str(db_file))
+    db.load()
+    assert db.refresh() is False
+
+    write_db(db_file, [make_item("git status"), make_item("git diff", desc="external")])
+    assert db.refresh() is True
+    db.delete(0)
+    db.compact()
+
+    assert [i["command"] for i in json.loads(db_file.read_text())] == ["git diff"]
+
+
+def test_session_parses_once_and_applies_own_edits(tmp_path):
+    db_file = tmp_path / "commands.json"
+    write_db(db_file, [make_item("git status"), make_item("git log"), make_item("git push")])
+    db = CommandStore(str(db_file))
+    db.ensure_index()
+
+    loads = []
+    original = db.load
+    db.load = lambda: loads.append(1) or original()
+
+    for query in ["git", "log", "push"]:
+        db.refresh()
+        assert db.rank(query)
+    db.add(make_item("git stash"))
+    db.delete(db.find(make_item("git log")))
+    db.refresh()
+    assert [i["command"] for _, i in db.search("git")] == ["git status", "git push", "git stash"]
+    # The index followed the delete instead of being rebuilt
+    assert db.index.deleted == [1]
+    assert loads == []
+
+    # Another tool replacing the file is picked up by its mtime/size
+    write_db(db_file, [make_item("git init")])
+    assert db.refresh() is True
+    assert loads == [1]
+
+
+def test_rank_sees_a_consistent_store_while_others_write(tmp_path):
+    db_file = tmp_path / "commands.json"
+    db_file.write_text(json.dumps([make_item(f"git cmd {n}") for n in range(3000)]))
+    db = CommandStore(str(db_file))
+    db.ensure_index()
+    errors, done = [], threading.Event()
+
+    def write():
+        try:
+            for n in range(150):
+                db.add(make_item(f"docker cmd {n}"))
+                db.delete(0)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            done.set()
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    while not done.is_set():
+        for query in ("git cmd 1", "cmd 2", "docker"):
+            try:
+                results = db.rank(query, limit=None)
+                hits = list(db.search(query))
+            except Exception as e:
+                errors.append(e)
+                break
+            # Every result really matches: no text paired with another record
+            for _, item in results + hits:
+                assert all(t in search_string(item) for t in query.split()), query
+    writer.join()
+    assert errors == []
+
+
+def test_compactor_can_be_restarted(tmp_path):
+    db_file = tmp_path / "commands.json"
+    write_db(db_file, [make_item("git status")])
+    db = CommandStore(str(db_file))
+    db.load()
+
+    db.start_compactor(interval=60)
+    first = db._compactor
+    db.stop_compactor()
+    first.join(1)
+    assert not first.is_alive() and db._compactor is None
+
+    db.add(make_item("git log"))
+    db.start_compactor(interval=0.01)
+    try:
+        assert db._compactor is not first and db._compactor.is_alive()
+        for _ in range(200):
+            if db.journal.size() <= db.journal.header_len:
+                break
+            threading.Event().wait(0.01)
+        assert db.journal.size() <= db.journal.header_len
+    finally:
+        db.stop_compactor()
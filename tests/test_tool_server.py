@@ -0,0 +1,97 @@
+import socket
+import sys
+import threading
+import time
+
+import pytest
+
+import tool_server
+
+
+class FakeServer(tool_server.ToolServer):
+    def command(self):
+        return [sys.executable, "-m", "http.server", str(self.port), "--bind", "127.0.0.1"]
+
+
+@pytest.fixture
+def server(tmp_path):
+    opened = []
+    srv = FakeServer(
+        str(tmp_path / "visual_db.py"),
+        tool_server.free_port(),
+        idle=60,
+        run_dir=str(tmp_path / "run"),
+        open_url=opened.append,
+    )
+    yield srv, opened
+    srv.stop()
+
+
+def wait_for(cond, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not cond():
+        assert time.monotonic() < deadline
+        time.sleep(0.05)
+
+
+def test_second_open_reuses_the_warm_server(server):
+    srv, opened = server
+    srv.open()
+    wait_for(lambda: opened)
+    process = srv.process
+    assert tool_server.listening(srv.port)
+
+    srv.open()
+    assert srv.process is process
+    assert opened == [srv.url, srv.url]
+
+
+def test_idle_server_is_reaped_unless_the_page_is_in_use(server):
+    srv, _ = server
+    srv.start()
+    assert not srv.reap()
+
+    later = time.time() + 120
+    tool_server.heartbeat(srv.path, srv.run_dir)
+    assert not srv.reap(now=time.time() + 30)
+    assert srv.reap(now=later)
+    assert not srv.running()
+
+
+def test_zero_idle_timeout_keeps_the_server(server):
+    srv, _ = server
+    srv.idle = 0
+    srv.start()
+    assert not srv.reap(now=time.time() + 10**6)
+    assert srv.running()
+
+
+def test_foreign_listener_is_not_mistaken_for_ours(server):
+    srv, opened = server
+    with socket.socket() as other:
+        # Another app's server on our preferred port
+        other.bind(("127.0.0.1", srv.port))
+        other.listen()
+        srv.open()
+        wait_for(lambda: opened)
+        assert srv.running() and srv.port != other.getsockname()[1]
+        assert opened == [srv.url]
+
+
+def test_server_from_an_earlier_run_is_reused(server, tmp_path):
+    srv, _ = server
+    srv.start()
+    wait_for(lambda: tool_server.listening(srv.port))
+
+    # A restarted service: no process handle, a different preferred port
+    again = FakeServer(srv.path, tool_server.free_port(), idle=60, run_dir=srv.run_dir)
+    assert again.start() is False
+    assert again.port == srv.port and again.process is None
+    assert again.running() and again.pid == srv.process.pid
+
+    # It is still ours to stop once idle (the earlier run is its parent here)
+    threading.Thread(target=srv.process.wait, daemon=True).start()
+    assert again.reap(now=time.time() + 120)
+    wait_for(lambda: srv.process.poll() is not None)
+    assert not again.running() and not tool_server.listening(srv.port)
+    assert not (tmp_path / "run" / "visual_db.py.server").exists()
@@ -0,0 +1,89 @@
+import json
+import os
+import threading
+import time
+
+import pytest
+
+from store import CommandStore
+from watcher import FileWatcher
+
+
+def write_db(path, commands):
+    items = [{"command": c, "software": "Git", "description": "", "tags": []} for c in commands]
+    tmp = str(path) + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(items, f)
+    os.replace(tmp, path)
+
+
+@pytest.mark.parametrize("backend", ["inotify", "poll"])
+def test_watcher_sees_replaced_file(tmp_path, backend):
+    db_file = tmp_path / "commands.json"
+    write_db(db_file, ["git status"])
+    fired = threading.Event()
+    watcher = FileWatcher([str(db_file)], fired.set, interval=0.05, backend=backend).start()
+    try:
+        (tmp_path / "unrelated.txt").write_text("x")
+        assert not fired.wait(0.3)
+        write_db(db_file, ["git status", "git log"])
+        assert fired.wait(5)
+    finally:
+        watcher.stop()
+
+
+def test_store_reloads_off_thread_and_swaps(tmp_path):
+    db_file = tmp_path / "commands.json"
+    write_db(db_file, ["git status"])
+    db = CommandStore(str(db_file))
+    swapped = threading.Event()
+    db.watch(swapped.set)
+    try:
+        # The first load also happens on the watcher thread
+        assert swapped.wait(5)
+        assert [i["command"] for i in db.records] == ["git status"]
+        db.ensure_index()
+
+        swapped.clear()
+        version = db.version
+        write_db(db_file, ["git status", "git log"])
+        assert swapped.wait(5)
+        assert db.version > version
+        assert [i["command"] for i in db.records] == ["git status", "git log"]
+        # Derived state arrived with the snapshot
+        assert db.index is not None and db.index.size == 2
+        assert [i["command"] for _, i in db.rank("log")] == ["git log"]
+    finally:
+        db.stop_watching()
+
+
+def test_watcher_adopts_another_process_compaction(tmp_path, monkeypatch):
+    db_file = tmp_path / "commands.json"
+    write_db(db_file, ["git status"])
+    writer, db = CommandStore(str(db_file)), CommandStore(str(db_file))
+    writer.load()
+    swapped = threading.Event()
+    db.watch(swapped.set)
+    try:
+        assert swapped.wait(5)
+        db.ensure_index()
+        writer.add({"command": "git log", "software": "Git", "description": "", "tags": []})
+        deadline = time.monotonic() + 5
+        while len(db.records) < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert [i["command"] for i in db.records] == ["git status", "git log"]
+
+        # The compacted file holds exactly what we replayed: no re-parse
+        loads = []
+        load = CommandStore.load
+        monkeypatch.setattr(CommandStore, "load", lambda self: loads.append(1) or load(self))
+        index, stamp = db.index, db._stamp
+        writer.compact()
+        deadline = time.monotonic() + 5
+        while db._stamp == stamp and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert db._stamp == writer._stamp
+        assert loads == [] and db.index is index
+        assert db.is_stale() is False
+    finally:
+        db.stop_watching()